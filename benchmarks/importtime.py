@@ -0,0 +1,79 @@
+"""Startup budget measured with `python -X importtime`.
+
+Each module in startup_budget.json is imported in a fresh interpreter a few
+times; the best cumulative import time is compared against its budget, and
+modules listed under "forbidden" (e.g. matplotlib for the GUI) must not be
+imported at all. Every run is appended to startup_history.jsonl so the
+numbers can be tracked over time.
+
+Usage:
+    python benchmarks/importtime.py [--runs 5] [--no-record]
+
+Exits with status 1 when a module is over budget or imports something it
+should not.
+"""
+import argparse, json, os, platform, subprocess, sys, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+BUDGET_FILE = os.path.join(HERE, "startup_budget.json")
+HISTORY_FILE = os.path.join(HERE, "startup_history.jsonl")
+
+
+def measure(module):
+    """Import `module` once in a fresh interpreter -> (cumulative ms, imported module names)."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    cumulative, imported = None, set()
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line.split("|")
+        name = name.strip()
+        imported.add(name.split(".")[0])
+        if name == module:
+            cumulative = int(total) / 1000
+    return cumulative, imported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="imports per module, the best one counts")
+    parser.add_argument("--no-record", action="store_true", help="don't append to the history file")
+    args = parser.parse_args(argv)
+
+    with open(BUDGET_FILE) as f:
+        config = json.load(f)
+
+    results, failures = {}, []
+    for module, budget in config["budget_ms"].items():
+        best, imported = None, set()
+        for _ in range(args.runs):
+            ms, imported = measure(module)
+            best = ms if best is None else min(best, ms)
+        results[module] = round(best, 2)
+        status = "ok"
+        if best > budget:
+            status = "OVER BUDGET"
+            failures.append(f"{module}: {best:.1f} ms > {budget} ms")
+        leaked = sorted(imported & set(config.get("forbidden", {}).get(module, [])))
+        if leaked:
+            status = "IMPORTS " + ", ".join(leaked)
+            failures.append(f"{module} imports {', '.join(leaked)}")
+        print(f"{module:<20} {best:8.1f} ms  (budget {budget} ms)  {status}")
+
+    if not args.no_record:
+        entry = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "machine": platform.machine(), "import_ms": results}
+        with open(HISTORY_FILE, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    if failures:
+        print("\n".join(["", "Startup budget exceeded:"] + failures))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
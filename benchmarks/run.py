@@ -0,0 +1,174 @@
+"""Benchmark the tracker's core operations on synthetic ledgers.
+
+For every ledger size this times, headlessly: loading the ledger, a single
+add, a single delete, the dashboard aggregates, the Analytics chart data
+and trend series, a filtered history query, and rendering the history view into a hidden Tk root (skipped when there is
+no display). Results are written as JSON and compared against a stored
+baseline; an operation slower than baseline * (1 + tolerance) fails the run.
+
+Usage:
+    python benchmarks/run.py [--sizes 1k,10k,100k,1m,10m] [--update-baseline]
+"""
+import argparse, json, os, platform, random, shutil, statistics, sys, tempfile, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+import expense_tracker
+from dates import date_ordinal
+from ledger import Filter, Ledger
+from synthetic import write_ledger
+
+DEFAULT_SIZES = "1k,10k,100k"
+# Differences below this are timer noise, never report them as regressions
+MIN_DELTA = 0.0005
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    scale = {"k": 1000, "m": 1000000}.get(text[-1], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def median_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def dashboard(ledger):
+    # What update_dashboard reads for the cards: month to date in the busiest month
+    month = max(ledger.months(), key=ledger.month_count)
+    through = date_ordinal(f"15-{month[5:]}-{month[:4]}")
+    return ledger.month_total(month, through), ledger.month_count(month, through), ledger.months()
+
+
+def chart_data(ledger):
+    expense_tracker.ledger = ledger
+    expense_tracker.chart_cache = None
+    return expense_tracker.chart_data()
+
+
+def trend_series(ledger):
+    from trends import RESOLUTIONS, ledger_columns, series
+    ordinals, _, paise = ledger_columns(ledger)
+    return [series(ordinals, paise, resolution) for resolution in RESOLUTIONS]
+
+
+def history_render(ledger):
+    """Time HistoryView.reload() and a scroll to the middle in a hidden Tk root, or None."""
+    import tkinter as tk
+    from tkinter import ttk
+    from history_view import HistoryView
+
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None
+    root.withdraw()
+    try:
+        tree = ttk.Treeview(root, columns=("Date", "Category", "Amount"), show="headings", height=20)
+        scrollbar = ttk.Scrollbar(root, orient="vertical")
+        history = HistoryView(tree, scrollbar, ledger)
+        reload_time = median_time(history.reload, 3)
+        scroll_time = median_time(lambda: history.scroll("moveto", random.random()), 20)
+        return reload_time, scroll_time
+    finally:
+        root.destroy()
+
+
+def bench_size(path, rows, seed):
+    rng = random.Random(seed)
+    results = {}
+    repeat = 3 if rows <= 100000 else 1
+    with tempfile.TemporaryDirectory() as tmp:
+        # Work on a copy, the cached ledger must stay pristine
+        copy = os.path.join(tmp, "expenses.csv")
+        shutil.copy(path, copy)
+        results["load"] = median_time(lambda: Ledger(copy), repeat)
+
+        ledger = Ledger(copy)
+        results["add"] = median_time(lambda: ledger.add("15-06-2025", "Food & Dining", 250.0), 50)
+        ids = rng.sample(ledger.ids(), min(50, len(ledger)))
+        results["delete"] = median_time(lambda: ledger.delete(ids.pop()), len(ids))
+        results["dashboard"] = median_time(lambda: dashboard(ledger), 200)
+        results["category_sums"] = median_time(lambda: chart_data(ledger), 50)
+        results["trends"] = median_time(lambda: trend_series(ledger), 10)
+        ledger.query(Filter())  # builds the search indexes
+        where = Filter(category="Travel", min_amount=1000.0, start=date_ordinal("01-01-2025"))
+        results["filter"] = median_time(lambda: ledger.query(where), 20)
+        rendered = history_render(ledger)
+        if rendered is not None:
+            results["history_reload"], results["history_scroll"] = rendered
+        ledger.close()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    failures = []
+    for size, ops in results.items():
+        for op, seconds in ops.items():
+            before = baseline.get(size, {}).get(op)
+            if before is None:
+                continue
+            if seconds > before * (1 + tolerance) and seconds - before > MIN_DELTA:
+                failures.append(f"{op} @ {size} rows: {seconds * 1000:.3f} ms, "
+                                f"baseline {before * 1000:.3f} ms")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark core ledger operations")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"comma separated row counts (default {DEFAULT_SIZES})")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--data-dir", default=os.path.join(HERE, ".data"), help="cache for generated ledgers")
+    parser.add_argument("--output", default=os.path.join(HERE, "results.json"))
+    parser.add_argument("--baseline", default=os.path.join(HERE, "baseline.json"))
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown, 0.5 = 50%%")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = {}
+    for rows in map(parse_size, args.sizes.split(",")):
+        path = os.path.join(args.data_dir, f"ledger_{rows}_{args.seed}.csv")
+        if not os.path.exists(path):
+            print(f"Generating {rows} rows -> {path}")
+            write_ledger(path, rows, args.seed)
+        results[str(rows)] = bench_size(path, rows, args.seed)
+        print(f"{rows:>10} rows  " + "  ".join(f"{op} {seconds * 1000:.3f}ms"
+                                                for op, seconds in results[str(rows)].items()))
+
+    report = {"meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                       "machine": platform.machine(), "seed": args.seed},
+              "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.setdefault("results", {}).update(results)
+        baseline["meta"] = report["meta"]
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --update-baseline to store one")
+        return 0
+    with open(args.baseline) as f:
+        failures = compare(results, json.load(f)["results"], args.tolerance)
+    if failures:
+        print("\n".join(["", "Regressions:"] + failures))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
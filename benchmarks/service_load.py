@@ -0,0 +1,95 @@
+"""Load test of the ledger service on localhost.
+
+Starts service.py on a free port over an empty ledger in a temp directory,
+then has many concurrent clients, each on its own kept-alive connection,
+add expenses one request at a time. Reports writes per second and request
+latency percentiles, and checks that the service counted every write.
+
+Usage:
+    python benchmarks/service_load.py [--clients 50] [--writes 200] [--ledger expenses]
+"""
+import argparse, asyncio, json, os, random, statistics, subprocess, sys, tempfile, time
+from datetime import date, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVICE = os.path.join(os.path.dirname(HERE), "service.py")
+CATEGORIES = ["Food & Dining", "Travel", "Shopping", "Bills", "Health"]
+
+
+async def request(reader, writer, method, path, payload=None):
+    body = b"" if payload is None else json.dumps(payload).encode()
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+                 + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        header = await reader.readline()
+        if header == b"\r\n":
+            break
+        name, _, value = header.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    reply = json.loads(await reader.readexactly(length))
+    if status != 200:
+        raise RuntimeError(f"{method} {path}: {status} {reply}")
+    return reply
+
+
+async def client(port, writes, seed, latencies):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for _ in range(writes):
+            # Most of what gets added is recent
+            day = date.today() - timedelta(days=rng.randint(0, 27))
+            expense = {"date": day.strftime("%d-%m-%Y"),
+                       "category": rng.choice(CATEGORIES), "amount": rng.randint(100, 500000) / 100}
+            start = time.perf_counter()
+            await request(reader, writer, "POST", "/expenses", expense)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def load(port, clients, writes):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, writes, seed, latencies) for seed in range(clients)))
+    elapsed = time.perf_counter() - start
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    summary = await request(reader, writer, "GET", "/summary")
+    writer.close()
+    return elapsed, latencies, summary["count"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the ledger service on localhost")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--writes", type=int, default=200, help="adds per client")
+    parser.add_argument("--ledger", default="expenses", help="ledger name in the temp directory, e.g. expenses.db")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service = subprocess.Popen([sys.executable, SERVICE, os.path.join(tmp, args.ledger), "--port", "0"],
+                                   stdout=subprocess.PIPE, text=True)
+        try:
+            port = int(service.stdout.readline().rsplit(":", 1)[1])
+            elapsed, latencies, count = asyncio.run(load(port, args.clients, args.writes))
+        finally:
+            service.terminate()
+            service.wait()
+
+    total = args.clients * args.writes
+    latencies.sort()
+    print(f"{total} writes from {args.clients} clients in {elapsed:.2f}s: {total / elapsed:.0f} writes/s")
+    print(f"latency p50 {statistics.median(latencies) * 1000:.2f}ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f}ms  max {latencies[-1] * 1000:.2f}ms")
+    if count != total:
+        print(f"Service counted {count} records, expected {total}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Reproducible synthetic ledgers for benchmarking.
+
+Categories follow a skewed distribution over the GUI's common_categories,
+amounts are log-normal around a typical value per category, and dates are
+spread over a few years with busier weekends, written in date order the way
+a real ledger grows.
+
+Usage:
+    python benchmarks/synthetic.py 100000 ledger.csv [--seed 7]
+"""
+import csv, os, sys
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dates import DATE_FORMAT
+from expense_tracker import common_categories
+from storage import HEADER
+
+# Share of transactions and typical amount (₹) per category, in common_categories order
+CATEGORY_WEIGHTS = [0.30, 0.18, 0.14, 0.10, 0.09, 0.06, 0.05, 0.04, 0.04]
+TYPICAL_AMOUNTS = [350, 120, 1200, 500, 2500, 800, 3000, 6000, 300]
+AMOUNT_SPREAD = 0.8
+WEEKEND_FACTOR = 1.4
+END_DATE = date(2025, 12, 31)
+YEARS = 3
+CHUNK = 200000
+
+
+def generate(rows, seed=7):
+    """-> (date ordinals, category codes, amounts), sorted by date."""
+    rng = np.random.default_rng(seed)
+    start = END_DATE - timedelta(days=365 * YEARS)
+    days = np.arange(start.toordinal(), END_DATE.toordinal() + 1)
+    # date.weekday() of an ordinal is (ordinal + 6) % 7, Saturday and Sunday are 5 and 6
+    day_weights = np.where((days + 6) % 7 >= 5, WEEKEND_FACTOR, 1.0)
+    ordinals = np.sort(rng.choice(days, size=rows, p=day_weights / day_weights.sum()))
+    codes = rng.choice(len(common_categories), size=rows, p=CATEGORY_WEIGHTS)
+    typical = np.asarray(TYPICAL_AMOUNTS, dtype=float)[codes]
+    amounts = np.round(typical * rng.lognormal(0.0, AMOUNT_SPREAD, size=rows), 2)
+    return ordinals, codes, np.maximum(amounts, 1.0)
+
+
+def write_ledger(path, rows, seed=7):
+    """Write a synthetic ledger in the app's CSV format."""
+    ordinals, codes, amounts = generate(rows, seed)
+    first = int(ordinals[0]) if rows else 0
+    dates = [date.fromordinal(first + i).strftime(DATE_FORMAT)
+             for i in range(int(ordinals[-1]) - first + 1 if rows else 0)]
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for begin in range(0, rows, CHUNK):
+            end = min(rows, begin + CHUNK)
+            writer.writerows(
+                (dates[o - first], common_categories[c], a, rid)
+                for rid, o, c, a in zip(range(begin, end), ordinals[begin:end].tolist(),
+                                        codes[begin:end].tolist(), amounts[begin:end].tolist()))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write a synthetic expenses CSV")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("path")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    write_ledger(args.path, args.rows, args.seed)
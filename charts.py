@@ -0,0 +1,74 @@
+"""The Analytics charts, drawn on a matplotlib Figure.
+
+Shared by the Analytics window and render.py. Nothing here imports
+matplotlib: the functions only draw on the figure they are handed, whether
+that is embedded in Tk or an Agg figure being saved to a file. Both redraw
+from scratch, so the same figure can be drawn again and again.
+"""
+from trends import PERIODS, RESOLUTIONS
+
+# The GUI theme's colors, categories take them in order
+PALETTE = ["#3b82f6", "#6366f1", "#10b981", "#f59e0b", "#ef4444", "#8b5cf6", "#06b6d4"]
+BACKGROUND = "#f8fafc"
+TEXT_COLOR = "#1e293b"
+TEXT_SECONDARY = "#64748b"
+
+
+def draw_categories(fig, categories, sums, title=None):
+    """Bar and pie chart of the spending per category on a figure with two axes."""
+    ax1, ax2 = fig.axes
+    ax1.clear()
+    ax2.clear()
+    colors = PALETTE[:len(categories)]
+
+    # Bar Chart
+    bars = ax1.bar(categories, sums, color=colors, alpha=0.8, edgecolor='white', linewidth=1)
+    ax1.set_title("Expenses by Category", fontsize=14, fontweight='bold', pad=20, color=TEXT_COLOR)
+    ax1.set_xlabel("Category", fontweight='bold', color=TEXT_SECONDARY)
+    ax1.set_ylabel("Amount (₹)", fontweight='bold', color=TEXT_SECONDARY)
+    ax1.tick_params(axis='x', rotation=45, colors=TEXT_SECONDARY)
+    ax1.tick_params(axis='y', colors=TEXT_SECONDARY)
+    ax1.grid(True, alpha=0.3)
+    ax1.set_facecolor(BACKGROUND)
+
+    # Add value labels on bars
+    for bar in bars:
+        height = bar.get_height()
+        ax1.text(bar.get_x() + bar.get_width()/2., height + max(sums)*0.01,
+                 f'₹{height:,.0f}', ha='center', va='bottom', fontweight='bold', fontsize=9)
+
+    # Pie Chart
+    wedges, texts, autotexts = ax2.pie(sums, labels=categories, autopct='%1.1f%%',
+                                       startangle=90, colors=colors,
+                                       textprops={'fontsize': 10, 'color': TEXT_COLOR})
+
+    for autotext in autotexts:
+        autotext.set_color('white')
+        autotext.set_fontweight('bold')
+
+    ax2.set_title("Expense Distribution", fontsize=14, fontweight='bold', pad=20, color=TEXT_COLOR)
+    _finish(fig, title)
+
+
+def draw_trend(fig, resolution, starts, spent, average, title=None):
+    """Spending per period and its rolling average, as trends.series() returns them."""
+    ax = fig.axes[0]
+    ax.clear()
+    ax.fill_between(starts, spent, step="post", color=PALETTE[0], alpha=0.3,
+                    label=f"Spent per {PERIODS[resolution]}")
+    ax.plot(starts, average, color=PALETTE[1], linewidth=2,
+            label=f"{RESOLUTIONS[resolution]}-{PERIODS[resolution]} average")
+    ax.set_title("Spending Over Time", fontsize=14, fontweight='bold', pad=20, color=TEXT_COLOR)
+    ax.set_ylabel("Amount (₹)", fontweight='bold', color=TEXT_SECONDARY)
+    ax.tick_params(colors=TEXT_SECONDARY)
+    ax.grid(True, alpha=0.3)
+    ax.set_facecolor(BACKGROUND)
+    ax.legend(loc="upper left")
+    fig.autofmt_xdate()
+    _finish(fig, title)
+
+
+def _finish(fig, title):
+    if title is not None:
+        fig.suptitle(title, fontsize=16, fontweight='bold', color=TEXT_COLOR)
+    fig.tight_layout(pad=3.0)
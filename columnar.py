@@ -0,0 +1,149 @@
+"""Columnar, memory-mappable copy of an expenses ledger.
+
+A columnar ledger is a directory with one .npy file per column and the
+category dictionary:
+
+    ids.npy          int64   record IDs
+    dates.npy        int32   date ordinals
+    categories.npy   uint16  index into categories.json
+    amounts.npy      int64   amount in paise
+    categories.json  category names
+
+Usage:
+    python columnar.py to-columnar expenses expenses.col
+    python columnar.py from-columnar expenses.col expenses.csv
+    python columnar.py summary expenses.col
+"""
+import argparse, csv, json, os
+from array import array
+
+import numpy as np
+
+from dates import date_ordinal, ordinal_date
+from storage import HEADER, ledger_path, read_ledger, to_paise
+
+COLUMNS = {"ids": np.int64, "dates": np.int32, "categories": np.uint16, "amounts": np.int64}
+MAX_CATEGORIES = np.iinfo(np.uint16).max + 1
+
+
+def exact_paise(amount):
+    paise = to_paise(amount)
+    if paise / 100 != amount:
+        raise ValueError(f"{amount!r} has more precision than paise")
+    return paise
+
+
+# ------------------ Conversion ------------------
+def csv_to_columnar(path, out_dir):
+    """Convert the live records of a ledger (see read_ledger); returns the row count.
+
+    Records that would not survive the trip back to CSV unchanged
+    (unparseable dates, sub-paise amounts) raise ValueError instead of being
+    rounded. Deleted records are left out, so the result round-trips to the
+    compacted CSV. The ledger is only read: a legacy file without an ID
+    column is not upgraded, its records are numbered in file order.
+    """
+    ids, dates, codes, amounts = array('q'), array('i'), array('H'), array('q')
+    ordinals, category_codes = {}, {}
+    for rid, day, category, amount in read_ledger(path):
+        try:
+            # Ledgers repeat the same few dates, parse each one once
+            if day not in ordinals:
+                ordinals[day] = date_ordinal(day)
+                if ordinal_date(ordinals[day]) != day:
+                    raise ValueError(f"date {day!r} is not in DD-MM-YYYY form")
+            paise = exact_paise(amount)
+        except ValueError as e:
+            raise ValueError(f"{path}: record {rid}: {e}") from None
+        if category not in category_codes:
+            if len(category_codes) == MAX_CATEGORIES:
+                raise ValueError(f"{path}: more than {MAX_CATEGORIES} categories")
+            category_codes[category] = len(category_codes)
+        ids.append(rid)
+        dates.append(ordinals[day])
+        codes.append(category_codes[category])
+        amounts.append(paise)
+
+    os.makedirs(out_dir, exist_ok=True)
+    for name, column in (("ids", ids), ("dates", dates), ("categories", codes), ("amounts", amounts)):
+        np.save(os.path.join(out_dir, name + ".npy"), np.frombuffer(column, dtype=COLUMNS[name]))
+    with open(os.path.join(out_dir, "categories.json"), 'w') as f:
+        json.dump(list(category_codes), f)
+    return len(dates)
+
+
+def columnar_to_csv(col_dir, csv_path):
+    ledger = ColumnarLedger(col_dir)
+    dates = {}
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for rid, ordinal, code, paise in zip(ledger.ids.tolist(), ledger.dates.tolist(),
+                                             ledger.categories.tolist(), ledger.amounts.tolist()):
+            if ordinal not in dates:
+                dates[ordinal] = ordinal_date(ordinal)
+            writer.writerow([dates[ordinal], ledger.names[code], paise / 100, rid])
+    return len(ledger)
+
+
+# ------------------ Reading ------------------
+class ColumnarLedger:
+    """Read-only view of a columnar ledger, backed by memory-mapped arrays."""
+
+    def __init__(self, path):
+        self.path = path
+        for name, dtype in COLUMNS.items():
+            column = np.load(os.path.join(path, name + ".npy"), mmap_mode='r')
+            if column.dtype != dtype:
+                raise ValueError(f"{path}: {name}.npy is {column.dtype}, expected {np.dtype(dtype)}")
+            setattr(self, name, column)
+        with open(os.path.join(path, "categories.json"), 'r') as f:
+            self.names = json.load(f)
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def total(self):
+        return int(self.amounts.sum()) / 100
+
+    def category_sums(self):
+        sums = np.bincount(self.categories, weights=self.amounts, minlength=len(self.names))
+        return {name: paise / 100 for name, paise in zip(self.names, sums.tolist()) if paise}
+
+    def category_counts(self):
+        counts = np.bincount(self.categories, minlength=len(self.names))
+        return {name: count for name, count in zip(self.names, counts.tolist()) if count}
+
+
+# ------------------ Command line ------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert between expenses.csv and the columnar format")
+    commands = parser.add_subparsers(dest="command", required=True)
+    to_col = commands.add_parser("to-columnar", help="convert a ledger to columnar")
+    to_col.add_argument("ledger", help="partition directory or .csv file, e.g. expenses")
+    to_col.add_argument("directory")
+    from_col = commands.add_parser("from-columnar", help="convert a columnar ledger back to CSV")
+    from_col.add_argument("directory")
+    from_col.add_argument("csv")
+    summary = commands.add_parser("summary", help="print totals computed on the mapped arrays")
+    summary.add_argument("directory")
+    args = parser.parse_args(argv)
+    # read_ledger() would report a missing ledger as a missing expenses.csv
+    if args.command == "to-columnar" and not os.path.exists(ledger_path(args.ledger)):
+        parser.error(f"no such ledger: {args.ledger}")
+
+    if args.command == "to-columnar":
+        print(f"Wrote {csv_to_columnar(args.ledger, args.directory)} rows to {args.directory}")
+    elif args.command == "from-columnar":
+        print(f"Wrote {columnar_to_csv(args.directory, args.csv)} rows to {args.csv}")
+    else:
+        ledger = ColumnarLedger(args.directory)
+        counts = ledger.category_counts()
+        print(f"Transactions: {len(ledger)}")
+        print(f"Total: ₹{ledger.total():,.2f}")
+        for category, amount in sorted(ledger.category_sums().items()):
+            print(f"  {category}: ₹{amount:,.2f} ({counts[category]})")
+
+
+if __name__ == "__main__":
+    main()
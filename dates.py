@@ -0,0 +1,62 @@
+from datetime import date, datetime
+from functools import lru_cache
+
+# Format dates are stored in, e.g. 25-12-2024
+DATE_FORMAT = "%d-%m-%Y"
+
+
+@lru_cache(maxsize=65536)
+def date_ordinal(text):
+    """DD-MM-YYYY as stored in the ledger -> proleptic Gregorian ordinal."""
+    return datetime.strptime(text, DATE_FORMAT).toordinal()
+
+
+@lru_cache(maxsize=65536)
+def ordinal_date(ordinal):
+    return date.fromordinal(ordinal).strftime(DATE_FORMAT)
+
+
+# Monthly rollups and income are keyed by month, e.g. 2024-12
+def month_of(text):
+    """DD-MM-YYYY -> YYYY-MM."""
+    return text[6:] + "-" + text[3:5]
+
+
+@lru_cache(maxsize=4096)
+def ordinal_month(ordinal):
+    """Date ordinal -> YYYY-MM."""
+    return date.fromordinal(ordinal).strftime("%Y-%m")
+
+
+def month_range(month):
+    """YYYY-MM -> (ordinal of its first day, ordinal of the next month's first day)."""
+    year, mon = int(month[:4]), int(month[5:])
+    return date(year, mon, 1).toordinal(), date(year + mon // 12, mon % 12 + 1, 1).toordinal()
+
+
+def month_label(month):
+    """YYYY-MM -> e.g. December 2024."""
+    return datetime.strptime(month, "%Y-%m").strftime("%B %Y")
+
+
+def current_month():
+    return date.today().strftime("%Y-%m")
+
+
+# Formats accepted from the entry form
+INPUT_FORMATS = ("%Y-%m-%d", "%Y/%m/%d")
+
+
+@lru_cache(maxsize=4096)
+def normalize_date(text, formats=INPUT_FORMATS):
+    """Date typed or imported in one of `formats` -> DD-MM-YYYY.
+
+    Raises ValueError when no format matches. Results are memoized, since
+    statements repeat the same few dates over and over.
+    """
+    for fmt in formats:
+        try:
+            return datetime.strptime(text, fmt).strftime(DATE_FORMAT)
+        except ValueError:
+            pass
+    raise ValueError(f"unrecognised date {text!r}")
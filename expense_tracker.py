@@ -1,32 +1,34 @@
+"""Tk front end of the expense tracker.
+
+Importing this module has no side effects; main() opens the ledger and
+builds the window. Storage, parsing and aggregation live in the headless
+modules (ledger, storage, dates, importer, income), and matplotlib, the
+charts (charts.py) and the numpy trend series (trends.py) are only imported
+when the Analytics window is first opened.
+"""
 import tkinter as tk
-from tkinter import messagebox, ttk, Toplevel
-import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import csv, os
-from datetime import datetime
+from tkinter import filedialog, messagebox, ttk, Toplevel
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from dates import current_month, date_ordinal, month_label, normalize_date
+from importer import read_statement, write_rejects
+from income import income_for, load_income, save_income
+import perf
+from perf import timed
+from ledger import Filter, Ledger, to_paise
+from history_view import HistoryView
 
 # ------------------ File Setup ------------------
-filename = "expenses.csv"
-income_file = "income.txt"
-
-if not os.path.exists(filename):
-    with open(filename, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(["Date", "Category", "Amount"])
-
-def load_income():
-    if os.path.exists(income_file):
-        with open(income_file, "r") as f:
-            try:
-                return float(f.read().strip())
-            except:
-                return 0.0
-    return 0.0
-
-def save_income(amount):
-    with open(income_file, "w") as f:
-        f.write(str(amount))
+income_file = "income.json"
+legacy_income_file = "income.txt"  # single value, read once when income.json doesn't exist
+
+# Set up by main()
+filename = None
+io_executor = None
+ledger = None
+incomes = {}  # YYYY-MM -> monthly income
+selected_month = None  # month the dashboard shows, YYYY-MM
 
 # ------------------ Modern Theme Colors ------------------
 BG_COLOR = "#f8fafc"
@@ -39,17 +41,152 @@ DANGER_COLOR = "#ef4444"
 TEXT_COLOR = "#1e293b"
 TEXT_SECONDARY = "#64748b"
 BORDER_COLOR = "#e2e8f0"
+
+common_categories = ["Food & Dining", "Transportation", "Shopping", "Entertainment", 
+                    "Bills & Utilities", "Healthcare", "Education", "Travel", "Other"]
+
+# ------------------ Background Work ------------------
+POLL_MS = 50
+pending_work = []  # (future, on_done, on_error) waiting to be delivered on the Tk thread
+polling = False
+refresh_pending = False
+reload_pending = False
+swap_pending = False  # a spare ledger is being filled on the I/O thread
+
+def run_in_background(work, on_done=None, *args, on_error=None):
+    """Run work(*args) on the I/O thread; on_done(result) is called back on the Tk thread.
+
+    If work raises, the error is shown and on_error(), if given, is called instead.
+    """
+    global polling
+    future = io_executor.submit(work, *args)
+    pending_work.append((future, on_done, on_error))
+    if not polling:
+        polling = True
+        busy_label.config(text="⏳ Working…")
+        root.config(cursor="watch")
+        root.after(POLL_MS, poll_background)
+    return future
+
+def poll_background():
+    global polling
+    while pending_work and pending_work[0][0].done():
+        future, on_done, on_error = pending_work.pop(0)
+        if future.exception() is not None:
+            messagebox.showerror("Error", str(future.exception()))
+            if on_error is not None:
+                on_error()
+        elif on_done is not None:
+            on_done(future.result())
+    if pending_work:
+        root.after(POLL_MS, poll_background)
+    else:
+        polling = False
+        busy_label.config(text="")
+        root.config(cursor="")
+
+def request_refresh(reload_history=False):
+    """Coalesce refresh requests into a single repaint once Tk is idle."""
+    global refresh_pending, reload_pending
+    reload_pending = reload_pending or reload_history
+    if not refresh_pending:
+        refresh_pending = True
+        root.after_idle(refresh)
+
+@timed("gui.refresh")
+def refresh():
+    global refresh_pending, reload_pending
+    if reload_pending:
+        show_expenses()
+    update_dashboard()
+    # Keep an open analytics window in step with the ledger
+    if graph_win is not None and graph_win.winfo_viewable() and graph_version != ledger.version:
+        if len(ledger):
+            draw_graph()
+        else:
+            graph_win.withdraw()
+    refresh_pending = reload_pending = False
+
+def set_actions_state(state):
+    # Filtering and sorting read the ledger, so they wait for it to load too
+    for widget in [add_btn] + action_widgets + filter_widgets:
+        widget.config(state=state)
+    filter_combobox.config(state="readonly" if state == "normal" else state)
+    history.set_sortable(state == "normal")
+    file_menu.entryconfig(0, state=state)
+
+# Loading and big imports run on a spare Ledger on the I/O thread, the Tk
+# thread only swaps it in. Actions stay disabled meanwhile, since a change
+# made to the ledger before the swap would be lost.
+def load_spare():
+    """On the I/O thread: the stored records, read into a Ledger of their own."""
+    return Ledger(filename, storage=ledger.storage)
+
+def ledger_loaded(spare):
+    ledger.swap_in(spare)
+    set_actions_state("normal")
+    request_refresh(reload_history=True)
+    root.after(SYNC_MS, sync_file)
+
+# ------------------ File Sync ------------------
+# Other instances, or scripts, may append to the same ledger file. Their rows
+# are read from the end of the file twice a second. Writers take the ledger's
+# lock file, and a record whose ID another instance took first is stored under
+# a new one; the next sync then reloads so the history shows the stored IDs.
+# As a client of a ledger service the same polling picks up what other clients
+# changed, and the service settles ID clashes.
+SYNC_MS = 500
+HISTORY_BATCH = 50  # more changes than this at once reload the history instead
+
+def sync_file():
+    # Queued behind our own writes, and collected without the busy indicator
+    future = io_executor.submit(ledger.storage.read_tail)
+    root.after(POLL_MS, sync_done, future)
+
+def sync_done(future):
+    # Changes read after a spare ledger was taken belong in it, not in the one it replaces
+    if not future.done() or swap_pending:
+        root.after(POLL_MS, sync_done, future)
+        return
+    # A failed read is retried on the next round
+    if future.exception() is None:
+        changes = future.result()
+        if changes is None:
+            # Cleared or compacted elsewhere: read it again, ledger_loaded resumes syncing
+            set_actions_state("disabled")
+            run_in_background(load_spare, ledger_loaded)
+            return
+        apply_changes(changes)
+    root.after(SYNC_MS, sync_file)
+
+@timed("gui.apply_changes")
+def apply_changes(changes):
+    """Bring records other programs added or deleted into the ledger and the history."""
+    if not changes:
+        return
+    incremental = len(changes) <= HISTORY_BATCH
+    for rid, record in changes:
+        if rid in ledger:
+            if incremental:
+                history.remove(rid)
+            ledger.forget(rid)
+        if record is None:
+            continue
+        try:
+            ledger.adopt(*record)
+        except ValueError:
+            continue  # unreadable date, or an ID out of range
+        if incremental:
+            history.insert(rid)
+    request_refresh(reload_history=not incremental)
+
 # ------------------ Functions ------------------
 def format_date(date_str):
     try:
-        date_obj = datetime.strptime(date_str, "%Y-%m-%d")
+        return normalize_date(date_str)
     except ValueError:
-        try:
-            date_obj = datetime.strptime(date_str, "%Y/%m/%d")
-        except ValueError:
-            messagebox.showerror("Invalid Date", "Please enter date in YYYY-MM-DD format.")
-            return None
-    return date_obj.strftime("%d-%m-%Y")
+        messagebox.showerror("Invalid Date", "Please enter date in YYYY-MM-DD format.")
+        return None
 
 def add_expense():
     date = date_entry.get().strip()
@@ -69,31 +206,26 @@ def add_expense():
     except ValueError:
         messagebox.showerror("Error", "Amount must be a number")
         return
+    try:
+        # NaN, infinity and amounts too large for the ledger to store
+        to_paise(amount)
+    except ValueError:
+        messagebox.showerror("Error", "Amount is not a finite number, or too large to store")
+        return
 
-    with open(filename, 'a', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([formatted_date, category, amount])
+    # Timed without the dialogs, which would measure the user
+    with perf.span("gui.add_expense"):
+        rid = ledger.add(formatted_date, category, amount)
+        history.insert(rid)
 
     messagebox.showinfo("Success", f"✅ Expense Added!\nDate: {formatted_date}\nAmount: ₹{amount:.2f}")
     date_entry.delete(0, tk.END)
     category_combobox.set('')
     amount_entry.delete(0, tk.END)
-    show_expenses()
-    update_dashboard()
+    request_refresh()
+@timed("gui.show_expenses")
 def show_expenses():
-    for row in tree.get_children():
-        tree.delete(row)
-    total = 0.0
-    with open(filename, 'r') as f:
-        reader = csv.reader(f)
-        next(reader)
-        for row in reader:
-            tree.insert("", tk.END, values=row)
-            try:
-                total += float(row[2])
-            except ValueError:
-                pass
-    total_expenses_label.config(text=f"₹{total:,.2f}")
+    history.reload()
 
 def delete_selected_record():
     selected = tree.selection()
@@ -101,38 +233,28 @@ def delete_selected_record():
         messagebox.showwarning("No Selection", "Please select a record to delete!")
         return
 
-    record = tree.item(selected[0])['values']
-    date, category, amount = record
+    rid = int(selected[0])
+    date, category, amount = ledger.get(rid)
 
     confirm = messagebox.askyesno("Confirm Delete", f"Delete record:\n{date}, {category}, ₹{amount}?")
     if confirm:
-        with open(filename, 'r') as f:
-            rows = list(csv.reader(f))
-        header, data = rows[0], rows[1:]
-        data = [r for r in data if not (r[0] == str(date) and r[1] == str(category) and r[2] == str(amount))]
-
-        with open(filename, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(header)
-            writer.writerows(data)
-
-        show_expenses()
-        update_dashboard()
+        with perf.span("gui.delete_selected_record"):
+            history.remove(rid)
+            ledger.delete(rid)
+            request_refresh()
         messagebox.showinfo("Deleted", "Record deleted successfully!")
 
 def clear_all_records():
     confirm = messagebox.askyesno("Confirm", "Are you sure you want to delete all records?")
     if confirm:
-        with open(filename, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(["Date", "Category", "Amount"])
-        show_expenses()
-        update_dashboard()
+        with perf.span("gui.clear_all_records"):
+            ledger.clear()
+        request_refresh(reload_history=True)
         messagebox.showinfo("Cleared", "All records cleared successfully!")
 
 def set_income_window():
     win = Toplevel(root)
-    win.title("Set Monthly Income")
+    win.title(f"Set Income • {month_label(selected_month)}")
     win.geometry("400x300")
     win.configure(bg=BG_COLOR)
     win.resizable(False, False)
@@ -152,10 +274,10 @@ def set_income_window():
     content_frame = tk.Frame(win, bg=BG_COLOR)
     content_frame.pack(fill=tk.BOTH, expand=True, padx=30, pady=30)
     
-    tk.Label(content_frame, text="Enter your monthly income:", bg=BG_COLOR, fg=TEXT_COLOR,
-             font=("Segoe UI", 12)).pack(pady=(0, 10))
+    tk.Label(content_frame, text=f"Enter your income for {month_label(selected_month)}:",
+             bg=BG_COLOR, fg=TEXT_COLOR, font=("Segoe UI", 12)).pack(pady=(0, 10))
     
-    income_var = tk.StringVar(value=f"{load_income():.2f}")
+    income_var = tk.StringVar(value=f"{income_for(incomes, selected_month):.2f}")
     
     amount_frame = tk.Frame(content_frame, bg=BG_COLOR)
     amount_frame.pack(pady=20)
@@ -173,9 +295,11 @@ def set_income_window():
     def save_income_and_close():
         try:
             amt = float(income_entry.get())
-            save_income(amt)
+            # Later months without an entry of their own inherit this one
+            incomes[selected_month] = amt
+            run_in_background(save_income, None, income_file, dict(incomes))
             messagebox.showinfo("Success", f"Income set to ₹{amt:,.2f}")
-            update_dashboard()
+            request_refresh()
             win.destroy()
         except ValueError:
             messagebox.showerror("Error", "Please enter a valid number!")
@@ -193,43 +317,90 @@ def set_income_window():
     # Enter key binding
     win.bind('<Return>', lambda e: save_income_and_close())
 
+def import_statement_window():
+    global swap_pending
+    path = filedialog.askopenfilename(title="Import Bank Statement",
+                                      filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+    if not path:
+        return
+
+    # Reading, validating and adding the records all happen on the I/O thread,
+    # into a copy of the ledger that is swapped in once they're all in
+    def add_to(spare, path):
+        records, rejects = read_statement(path)
+        return spare, spare.add_many(records), rejects
+
+    def import_done():
+        global swap_pending
+        swap_pending = False
+        set_actions_state("normal")
+
+    def imported(result):
+        spare, ids, rejects = result
+        ledger.swap_in(spare)
+        import_done()
+        message = f"✅ Imported {len(ids)} expenses"
+        if rejects:
+            rejects_path = path + ".rejects.csv"
+            run_in_background(write_rejects, None, rejects_path, rejects)
+            message += f"\n⚠ {len(rejects)} rows rejected, see:\n{rejects_path}"
+        request_refresh(reload_history=True)
+        messagebox.showinfo("Import Complete", message)
+
+    set_actions_state("disabled")
+    swap_pending = True
+    run_in_background(add_to, imported, ledger.copy(), path, on_error=import_done)
+
+def month_spending():
+    """-> (spent, transactions) in the selected month, up to today for the current month."""
+    through = date.today().toordinal() if selected_month == current_month() else None
+    return ledger.month_total(selected_month, through), ledger.month_count(selected_month, through)
+
 def show_spent_percentage():
-    total_exp = 0.0
-    with open(filename, "r") as f:
-        reader = csv.reader(f)
-        next(reader)
-        for row in reader:
-            try:
-                total_exp += float(row[2])
-            except:
-                pass
-
-    income = load_income()
+    total_exp = month_spending()[0]
+    income = income_for(incomes, selected_month)
     if income <= 0:
         messagebox.showwarning("No Income", "Please set your income first!")
         return
 
     percent = (total_exp / income) * 100
     messagebox.showinfo("Budget Analysis", 
-                       f"💰 Total Expenses: ₹{total_exp:,.2f}\n"
+                       f"📅 {month_label(selected_month)}\n"
+                       f"💰 Expenses: ₹{total_exp:,.2f}\n"
                        f"💵 Monthly Income: ₹{income:,.2f}\n"
                        f"📊 Budget Used: {percent:.1f}%")
 
-def show_graph():
-    data = np.genfromtxt(filename, delimiter=",", dtype=str, skip_header=1)
-    if data.size == 0:
-        messagebox.showwarning("No Data", "No expenses to visualize!")
-        return
-
-    categories = data[:, 1]
-    amounts = data[:, 2].astype(float)
-    unique_cats = np.unique(categories)
-    sums = [np.sum(amounts[categories == cat]) for cat in unique_cats]
+# The analytics window is built once and hidden on close; reopening it only
+# redraws when the ledger changed since the last draw
+graph_win = None
+graph_fig = None
+graph_canvas = None
+trend_fig = None
+trend_canvas = None
+trend_combobox = None
+graph_version = None
+chart_cache = None  # (ledger version, categories, sums)
+
+def chart_data():
+    global chart_cache
+    if chart_cache is None or chart_cache[0] != ledger.version:
+        category_sums = ledger.category_sums()
+        unique_cats = sorted(category_sums)
+        chart_cache = (ledger.version, unique_cats, [category_sums[cat] for cat in unique_cats])
+    return chart_cache[1], chart_cache[2]
+
+def build_graph_window():
+    global graph_win, graph_fig, graph_canvas, trend_fig, trend_canvas, trend_combobox
+    # matplotlib is the slowest import by far, so it waits until it is needed
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    from trends import RESOLUTIONS
 
     graph_win = Toplevel(root)
     graph_win.title("📊 Expense Analytics Dashboard")
     graph_win.geometry("1000x700")
     graph_win.configure(bg=BG_COLOR)
+    graph_win.protocol("WM_DELETE_WINDOW", graph_win.withdraw)
 
     # Header
     header_frame = tk.Frame(graph_win, bg=ACCENT_COLOR, height=60)
@@ -239,80 +410,102 @@ def show_graph():
     tk.Label(header_frame, text="Expense Analytics", font=("Segoe UI", 20, "bold"), 
              bg=ACCENT_COLOR, fg="white").pack(expand=True)
 
-    # Create modern matplotlib style
-    plt.style.use('default')
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
-    fig.patch.set_facecolor(BG_COLOR)
-    
-    # Color palette
-    colors = [ACCENT_COLOR, SECONDARY_COLOR, SUCCESS_COLOR, WARNING_COLOR, DANGER_COLOR, '#8b5cf6', '#06b6d4']
-    
-    # Bar Chart
-    bars = ax1.bar(unique_cats, sums, color=colors[:len(unique_cats)], alpha=0.8, edgecolor='white', linewidth=1)
-    ax1.set_title("Expenses by Category", fontsize=14, fontweight='bold', pad=20, color=TEXT_COLOR)
-    ax1.set_xlabel("Category", fontweight='bold', color=TEXT_SECONDARY)
-    ax1.set_ylabel("Amount (₹)", fontweight='bold', color=TEXT_SECONDARY)
-    ax1.tick_params(axis='x', rotation=45, colors=TEXT_SECONDARY)
-    ax1.tick_params(axis='y', colors=TEXT_SECONDARY)
-    ax1.grid(True, alpha=0.3)
-    ax1.set_facecolor('#f8fafc')
-    
-    # Add value labels on bars
-    for bar in bars:
-        height = bar.get_height()
-        ax1.text(bar.get_x() + bar.get_width()/2., height + max(sums)*0.01,
-                f'₹{height:,.0f}', ha='center', va='bottom', fontweight='bold', fontsize=9)
-    
-    # Pie Chart
-    wedges, texts, autotexts = ax2.pie(sums, labels=unique_cats, autopct='%1.1f%%', 
-                                      startangle=90, colors=colors[:len(unique_cats)],
-                                      textprops={'fontsize': 10, 'color': TEXT_COLOR})
-    
-    for autotext in autotexts:
-        autotext.set_color('white')
-        autotext.set_fontweight('bold')
-    
-    ax2.set_title("Expense Distribution", fontsize=14, fontweight='bold', pad=20, color=TEXT_COLOR)
-
-    plt.tight_layout(pad=3.0)
-
-    canvas = FigureCanvasTkAgg(fig, master=graph_win)
-    canvas.draw()
-    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+    notebook = ttk.Notebook(graph_win)
+    notebook.pack(fill=tk.BOTH, expand=True, padx=20, pady=(20, 0))
+    categories_tab = tk.Frame(notebook, bg=BG_COLOR)
+    trends_tab = tk.Frame(notebook, bg=BG_COLOR)
+    notebook.add(categories_tab, text="Categories")
+    notebook.add(trends_tab, text="Trends")
+
+    # A plain Figure stays out of pyplot's global registry
+    graph_fig = Figure(figsize=(12, 5))
+    graph_fig.patch.set_facecolor(BG_COLOR)
+    graph_fig.subplots(1, 2)
+
+    graph_canvas = FigureCanvasTkAgg(graph_fig, master=categories_tab)
+    graph_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+    # Spending over time, per day, week or month
+    trend_controls = tk.Frame(trends_tab, bg=BG_COLOR)
+    trend_controls.pack(fill=tk.X, pady=(10, 0))
+    tk.Label(trend_controls, text="Spending per", font=("Segoe UI", 10),
+             bg=BG_COLOR, fg=TEXT_SECONDARY).pack(side=tk.LEFT, padx=(0, 8))
+    trend_combobox = ttk.Combobox(trend_controls, values=list(RESOLUTIONS), state="readonly", width=12)
+    trend_combobox.set("Daily")
+    trend_combobox.bind("<<ComboboxSelected>>", lambda e: draw_trends())
+    trend_combobox.pack(side=tk.LEFT)
+
+    trend_fig = Figure(figsize=(12, 5))
+    trend_fig.patch.set_facecolor(BG_COLOR)
+    trend_fig.subplots()
+
+    trend_canvas = FigureCanvasTkAgg(trend_fig, master=trends_tab)
+    trend_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
     # Close button
-    tk.Button(graph_win, text="⬅ Back to Dashboard", command=graph_win.destroy,
+    tk.Button(graph_win, text="⬅ Back to Dashboard", command=graph_win.withdraw,
               bg=ACCENT_COLOR, fg="white", font=("Segoe UI", 12, "bold"),
               relief="flat", width=20, pady=10, cursor="hand2").pack(pady=20)
 
+@timed("gui.draw_graph")
+def draw_graph():
+    global graph_version
+    from charts import draw_categories
+    unique_cats, sums = chart_data()
+    draw_categories(graph_fig, unique_cats, sums)
+    graph_canvas.draw_idle()
+    draw_trends()
+    graph_version = ledger.version
+
+@timed("gui.draw_trends")
+def draw_trends():
+    from charts import draw_trend
+    from trends import ledger_columns, series
+    resolution = trend_combobox.get()
+    ordinals, _, paise = ledger_columns(ledger)
+    draw_trend(trend_fig, resolution, *series(ordinals, paise, resolution))
+    trend_canvas.draw_idle()
+
+@timed("gui.show_graph")
+def show_graph():
+    if len(ledger) == 0:
+        messagebox.showwarning("No Data", "No expenses to visualize!")
+        return
+
+    if graph_win is None:
+        build_graph_window()
+    else:
+        graph_win.deiconify()
+        graph_win.lift()
+    if graph_version != ledger.version:
+        draw_graph()
+
+@timed("gui.update_dashboard")
 def update_dashboard():
-    # Calculate total expenses
-    total_exp = 0.0
-    category_count = {}
-    
-    with open(filename, "r") as f:
-        reader = csv.reader(f)
-        next(reader)
-        for row in reader:
-            try:
-                amount = float(row[2])
-                total_exp += amount
-                category = row[1]
-                category_count[category] = category_count.get(category, 0) + 1
-            except:
-                pass
+    # Months with expenses, plus the current one, newest first
+    update_month_choices()
+
+    update_filter_categories()
+
+    # Spending in the selected month, from the ledger's monthly rollups
+    total_exp, transaction_count = month_spending()
     
-    # Update total expenses
-    total_expenses_label.config(text=f"₹{total_exp:,.2f}")
+    # Update total expenses and transaction count, for the filtered records while filtering
+    if history.filter is not None:
+        total_card.title_label.config(text="FILTERED EXPENSES")
+        transactions_card.title_label.config(text="MATCHING")
+        total_expenses_label.config(text=f"₹{history.total:,.2f}")
+        transactions_label.config(text=str(history.count))
+    else:
+        total_card.title_label.config(text="MONTH EXPENSES")
+        transactions_card.title_label.config(text="TRANSACTIONS")
+        total_expenses_label.config(text=f"₹{total_exp:,.2f}")
+        transactions_label.config(text=str(transaction_count))
     
     # Update income
-    income = load_income()
+    income = income_for(incomes, selected_month)
     income_label.config(text=f"₹{income:,.2f}")
     
-    # Update transaction count
-    transaction_count = len(tree.get_children())
-    transactions_label.config(text=str(transaction_count))
-    
     # Update budget percentage
     if income > 0:
         percentage = (total_exp / income) * 100
@@ -333,41 +526,176 @@ def update_dashboard():
         percentage_label.config(text="Set Income")
         progress_bar['value'] = 0
 
+month_choices = []  # YYYY-MM, in the order the month selector lists them
+
+def update_month_choices():
+    global month_choices
+    months = sorted(set(ledger.months()) | {current_month(), selected_month}, reverse=True)
+    if months != month_choices:
+        month_choices = months
+        month_combobox.config(values=[month_label(m) for m in months])
+    month_combobox.current(month_choices.index(selected_month))
+
+def on_month_selected(event):
+    global selected_month
+    selected_month = month_choices[month_combobox.current()]
+    request_refresh()
+
+# ------------------ Filter ------------------
+FILTER_DELAY_MS = 250
+ALL_CATEGORIES = "All categories"
+INVALID_COLOR = "#fee2e2"
+filter_job = None
+filter_categories = []
+
+def schedule_filter(event=None):
+    """Apply the filter bar once typing pauses for FILTER_DELAY_MS."""
+    global filter_job
+    if filter_job is not None:
+        root.after_cancel(filter_job)
+    filter_job = root.after(FILTER_DELAY_MS, apply_filter)
+
+def filter_field(name, parse):
+    """Parsed value of a filter entry, None when empty; entries that don't parse are marked and ignored."""
+    entry = filter_entries[name]
+    text = entry.get().strip()
+    value = None
+    if text:
+        try:
+            value = parse(text)
+        except ValueError:
+            entry.config(bg=INVALID_COLOR)
+            return None
+    entry.config(bg="white")
+    return value
+
+def read_filter():
+    category = filter_combobox.get()
+    end = filter_field("to", lambda text: date_ordinal(normalize_date(text)))
+    return Filter(category=None if category == ALL_CATEGORIES else category,
+                  start=filter_field("from", lambda text: date_ordinal(normalize_date(text))),
+                  end=None if end is None else end + 1,  # the To date is included
+                  min_amount=filter_field("min", float),
+                  max_amount=filter_field("max", float),
+                  text=filter_field("text", str))
+
+@timed("gui.apply_filter")
+def apply_filter(event=None):
+    global filter_job
+    if filter_job is not None:
+        root.after_cancel(filter_job)
+        filter_job = None
+    history.set_filter(read_filter())
+    request_refresh()
+
+def clear_filter():
+    for entry in filter_entries.values():
+        entry.delete(0, tk.END)
+    filter_combobox.set(ALL_CATEGORIES)
+    apply_filter()
+
+def update_filter_categories():
+    global filter_categories
+    categories = sorted(ledger.category_counts())
+    if categories != filter_categories:
+        filter_categories = categories
+        filter_combobox.config(values=[ALL_CATEGORIES] + categories)
+
+# ------------------ Debug Panel ------------------
+# Hidden: Ctrl+Shift+D shows the timings perf.py records and exports them, and
+# checks the running totals against a full recount
+DEBUG_REFRESH_MS = 1000
+debug_win = None
+debug_job = None
+
+def toggle_debug_panel(event=None):
+    if debug_win is None:
+        build_debug_panel()
+    elif debug_win.winfo_viewable():
+        debug_win.withdraw()
+        return
+    else:
+        debug_win.deiconify()
+        debug_win.lift()
+    update_debug_panel()
+
+def build_debug_panel():
+    global debug_win, debug_tree, debug_recording
+    debug_win = Toplevel(root)
+    debug_win.title("Performance")
+    debug_win.geometry("640x380")
+    debug_win.configure(bg=BG_COLOR)
+    debug_win.protocol("WM_DELETE_WINDOW", debug_win.withdraw)
+
+    # Opening the panel starts recording
+    perf.enable()
+    debug_recording = tk.BooleanVar(value=True)
+    controls = tk.Frame(debug_win, bg=BG_COLOR)
+    controls.pack(fill=tk.X, padx=10, pady=(10, 5))
+    tk.Checkbutton(controls, text="Record timings", variable=debug_recording, bg=BG_COLOR,
+                   command=lambda: perf.enable(debug_recording.get())).pack(side=tk.LEFT)
+    for text, command in (("Export cProfile…", lambda: export_timings(".prof")),
+                          ("Export JSON…", lambda: export_timings(".json")),
+                          ("Reset", perf.reset),
+                          ("Check Totals", check_totals)):
+        tk.Button(controls, text=text, command=command, relief="flat", bg=CARD_COLOR,
+                  cursor="hand2").pack(side=tk.RIGHT, padx=(5, 0))
+
+    columns = ("Span", "Calls", "p50", "p90", "p99", "Max")
+    debug_tree = ttk.Treeview(debug_win, columns=columns, show="headings")
+    for column in columns:
+        debug_tree.heading(column, text=column if column in ("Span", "Calls") else column + " (ms)")
+        debug_tree.column(column, width=200 if column == "Span" else 80,
+                          anchor="w" if column == "Span" else "e")
+    debug_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+
+def update_debug_panel():
+    global debug_job
+    if debug_job is not None:
+        root.after_cancel(debug_job)
+        debug_job = None
+    if not debug_win.winfo_viewable():
+        return
+    debug_tree.delete(*debug_tree.get_children())
+    for name, row in sorted(perf.stats().items()):
+        debug_tree.insert("", tk.END, values=(name, row["calls"], f"{row['p50']:.2f}", f"{row['p90']:.2f}",
+                                              f"{row['p99']:.2f}", f"{row['max']:.2f}"))
+    debug_job = root.after(DEBUG_REFRESH_MS, update_debug_panel)
+
+def export_timings(extension):
+    path = filedialog.asksaveasfilename(parent=debug_win, defaultextension=extension,
+                                        filetypes=[("cProfile stats" if extension == ".prof" else "JSON trace",
+                                                    "*" + extension)])
+    if not path:
+        return
+    try:
+        if extension == ".json":
+            perf.export_json(path)
+        else:
+            perf.export_profile(path)
+    except OSError as e:
+        messagebox.showerror("Export Failed", str(e), parent=debug_win)
+
+def check_totals():
+    """Compare the running totals, kept up to date on every change, with a full recount."""
+    if ledger.verify():
+        messagebox.showinfo("Totals", f"Running totals match a full recount of {len(ledger)} records.",
+                            parent=debug_win)
+    else:
+        messagebox.showerror("Totals", "Running totals disagree with a full recount of the records.",
+                             parent=debug_win)
+
+def on_close():
+    # Let queued writes finish before the window goes away
+    ledger.close()
+    io_executor.shutdown(wait=True)
+    root.destroy()
+
 def on_income_label_click(event):
     """Allow clicking on income label to set income"""
     set_income_window()
 
 # ------------------ Professional GUI ------------------
-root = tk.Tk()
-root.title("ExpenseTracker Pro • Personal Finance Manager")
-root.geometry("1300x850")
-root.configure(bg=BG_COLOR)
-root.resizable(True, True)
-
-# Configure ttk styles
-style = ttk.Style()
-style.theme_use('clam')
-style.configure("Green.Horizontal.TProgressbar", troughcolor=BORDER_COLOR, background=SUCCESS_COLOR)
-style.configure("Yellow.Horizontal.TProgressbar", troughcolor=BORDER_COLOR, background=WARNING_COLOR)
-style.configure("Red.Horizontal.TProgressbar", troughcolor=BORDER_COLOR, background=DANGER_COLOR)
-
-# ---- Header ----
-header_frame = tk.Frame(root, bg=ACCENT_COLOR, height=80)
-header_frame.pack(fill=tk.X)
-header_frame.pack_propagate(False)
-
-# Logo and title
-title_frame = tk.Frame(header_frame, bg=ACCENT_COLOR)
-title_frame.pack(expand=True)
-
-tk.Label(title_frame, text="💰", font=("Segoe UI", 24), bg=ACCENT_COLOR, fg="white").pack(side=tk.LEFT, padx=(0, 10))
-tk.Label(title_frame, text="Personal Expense Tracker", font=("Segoe UI", 24, "bold"), 
-         bg=ACCENT_COLOR, fg="white").pack(side=tk.LEFT)
-
-# ---- Dashboard Stats ----
-stats_frame = tk.Frame(root, bg=BG_COLOR)
-stats_frame.pack(fill=tk.X, padx=20, pady=20)
-
 def create_stat_card(parent, title, value, icon, color, clickable=False):
     card = tk.Frame(parent, bg=CARD_COLOR, relief="flat", bd=1, highlightbackground=BORDER_COLOR, 
                    highlightthickness=1, width=220, height=100)
@@ -378,7 +706,9 @@ def create_stat_card(parent, title, value, icon, color, clickable=False):
     icon_frame.pack(fill=tk.X, padx=15, pady=(15, 5))
     
     tk.Label(icon_frame, text=icon, font=("Segoe UI", 14), bg=CARD_COLOR, fg=color).pack(side=tk.LEFT)
-    tk.Label(icon_frame, text=title, font=("Segoe UI", 10), bg=CARD_COLOR, fg=TEXT_SECONDARY).pack(side=tk.LEFT, padx=(5, 0))
+    # Kept on the card so the dashboard can retitle it while a filter is on
+    card.title_label = tk.Label(icon_frame, text=title, font=("Segoe UI", 10), bg=CARD_COLOR, fg=TEXT_SECONDARY)
+    card.title_label.pack(side=tk.LEFT, padx=(5, 0))
     
     # Value
     value_label = tk.Label(card, text=value, font=("Segoe UI", 18, "bold"), 
@@ -387,176 +717,283 @@ def create_stat_card(parent, title, value, icon, color, clickable=False):
     
     return card, value_label
 
-# Create stat cards with proper spacing
-total_card, total_expenses_label = create_stat_card(stats_frame, "TOTAL EXPENSES", "₹0.00", "💸", DANGER_COLOR)
-total_card.pack(side=tk.LEFT, padx=(0, 15))
+def build_ui():
+    global root, file_menu, total_expenses_label, income_label, transactions_label
+    global percentage_label, progress_bar, date_entry, category_combobox, amount_entry
+    global add_btn, action_widgets, busy_label, tree, history, month_combobox
+    global total_card, transactions_card, filter_combobox, filter_entries, filter_widgets
+
+    root = tk.Tk()
+    root.title("ExpenseTracker Pro • Personal Finance Manager")
+    root.geometry("1300x850")
+    root.configure(bg=BG_COLOR)
+    root.resizable(True, True)
+
+    # ---- Menu ----
+    menubar = tk.Menu(root)
+    file_menu = tk.Menu(menubar, tearoff=0)
+    file_menu.add_command(label="Import Bank Statement…", command=import_statement_window)
+    file_menu.add_separator()
+    file_menu.add_command(label="Exit", command=on_close)
+    menubar.add_cascade(label="File", menu=file_menu)
+    root.config(menu=menubar)
+    root.bind("<Control-Shift-D>", toggle_debug_panel)
+
+    # Configure ttk styles
+    style = ttk.Style()
+    style.theme_use('clam')
+    style.configure("Green.Horizontal.TProgressbar", troughcolor=BORDER_COLOR, background=SUCCESS_COLOR)
+    style.configure("Yellow.Horizontal.TProgressbar", troughcolor=BORDER_COLOR, background=WARNING_COLOR)
+    style.configure("Red.Horizontal.TProgressbar", troughcolor=BORDER_COLOR, background=DANGER_COLOR)
+
+    # ---- Header ----
+    header_frame = tk.Frame(root, bg=ACCENT_COLOR, height=80)
+    header_frame.pack(fill=tk.X)
+    header_frame.pack_propagate(False)
 
-income_card, income_label = create_stat_card(stats_frame, "MONTHLY INCOME", "₹0.00", "💰", SUCCESS_COLOR, clickable=True)
-income_card.pack(side=tk.LEFT, padx=(0, 15))
+    # Logo and title
+    title_frame = tk.Frame(header_frame, bg=ACCENT_COLOR)
+    title_frame.pack(expand=True)
 
-transactions_card, transactions_label = create_stat_card(stats_frame, "TRANSACTIONS", "0", "📊", ACCENT_COLOR)
-transactions_card.pack(side=tk.LEFT, padx=(0, 15))
+    tk.Label(title_frame, text="💰", font=("Segoe UI", 24), bg=ACCENT_COLOR, fg="white").pack(side=tk.LEFT, padx=(0, 10))
+    tk.Label(title_frame, text="Personal Expense Tracker", font=("Segoe UI", 24, "bold"), 
+             bg=ACCENT_COLOR, fg="white").pack(side=tk.LEFT)
 
-percentage_card, percentage_label = create_stat_card(stats_frame, "BUDGET USED", "0%", "📈", WARNING_COLOR)
-percentage_card.pack(side=tk.LEFT, padx=(0, 15))
+    # ---- Month Selector ----
+    month_frame = tk.Frame(root, bg=BG_COLOR)
+    month_frame.pack(fill=tk.X, padx=20, pady=(15, 0))
 
-# Make income label clickable
-income_label.bind("<Button-1>", on_income_label_click)
+    tk.Label(month_frame, text="📅 MONTH", font=("Segoe UI", 10, "bold"),
+             bg=BG_COLOR, fg=TEXT_SECONDARY).pack(side=tk.LEFT, padx=(0, 10))
+    month_combobox = ttk.Combobox(month_frame, state="readonly", width=18, font=("Segoe UI", 10))
+    month_combobox.pack(side=tk.LEFT)
+    month_combobox.bind("<<ComboboxSelected>>", on_month_selected)
 
-# Progress bar frame
-progress_frame = tk.Frame(stats_frame, bg=BG_COLOR)
-progress_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(20, 0))
+    # ---- Dashboard Stats ----
+    stats_frame = tk.Frame(root, bg=BG_COLOR)
+    stats_frame.pack(fill=tk.X, padx=20, pady=20)
 
-tk.Label(progress_frame, text="BUDGET PROGRESS", font=("Segoe UI", 10), 
-         bg=BG_COLOR, fg=TEXT_SECONDARY).pack(anchor="w")
+    # Create stat cards with proper spacing
+    total_card, total_expenses_label = create_stat_card(stats_frame, "MONTH EXPENSES", "₹0.00", "💸", DANGER_COLOR)
+    total_card.pack(side=tk.LEFT, padx=(0, 15))
 
-progress_bar = ttk.Progressbar(progress_frame, orient="horizontal", length=400, 
-                              mode="determinate", style="Green.Horizontal.TProgressbar")
-progress_bar.pack(fill=tk.X, pady=(5, 0))
+    income_card, income_label = create_stat_card(stats_frame, "MONTHLY INCOME", "₹0.00", "💰", SUCCESS_COLOR, clickable=True)
+    income_card.pack(side=tk.LEFT, padx=(0, 15))
 
-# ---- Main Content ----
-main_frame = tk.Frame(root, bg=BG_COLOR)
-main_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+    transactions_card, transactions_label = create_stat_card(stats_frame, "TRANSACTIONS", "0", "📊", ACCENT_COLOR)
+    transactions_card.pack(side=tk.LEFT, padx=(0, 15))
 
-# Left side - Input form and quick actions
-left_frame = tk.Frame(main_frame, bg=BG_COLOR, width=400)
-left_frame.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 20))
-left_frame.pack_propagate(False)
+    percentage_card, percentage_label = create_stat_card(stats_frame, "BUDGET USED", "0%", "📈", WARNING_COLOR)
+    percentage_card.pack(side=tk.LEFT, padx=(0, 15))
 
-# Input card
-input_card = tk.Frame(left_frame, bg=CARD_COLOR, relief="flat", bd=1, 
-                     highlightbackground=BORDER_COLOR, highlightthickness=1)
-input_card.pack(fill=tk.X, pady=(0, 15))
+    # Make income label clickable
+    income_label.bind("<Button-1>", on_income_label_click)
 
-# Card header
-card_header = tk.Frame(input_card, bg=ACCENT_COLOR, height=40)
-card_header.pack(fill=tk.X)
-card_header.pack_propagate(False)
+    # Progress bar frame
+    progress_frame = tk.Frame(stats_frame, bg=BG_COLOR)
+    progress_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(20, 0))
 
-tk.Label(card_header, text="➕ ADD NEW EXPENSE", font=("Segoe UI", 12, "bold"), 
-         bg=ACCENT_COLOR, fg="white").pack(expand=True)
+    tk.Label(progress_frame, text="BUDGET PROGRESS", font=("Segoe UI", 10), 
+             bg=BG_COLOR, fg=TEXT_SECONDARY).pack(anchor="w")
 
-# Form content
-form_frame = tk.Frame(input_card, bg=CARD_COLOR)
-form_frame.pack(fill=tk.BOTH, padx=20, pady=15)
+    progress_bar = ttk.Progressbar(progress_frame, orient="horizontal", length=400, 
+                                  mode="determinate", style="Green.Horizontal.TProgressbar")
+    progress_bar.pack(fill=tk.X, pady=(5, 0))
 
-common_categories = ["Food & Dining", "Transportation", "Shopping", "Entertainment", 
-                    "Bills & Utilities", "Healthcare", "Education", "Travel", "Other"]
+    # ---- Main Content ----
+    main_frame = tk.Frame(root, bg=BG_COLOR)
+    main_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+
+    # Left side - Input form and quick actions
+    left_frame = tk.Frame(main_frame, bg=BG_COLOR, width=400)
+    left_frame.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 20))
+    left_frame.pack_propagate(False)
+
+    # Input card
+    input_card = tk.Frame(left_frame, bg=CARD_COLOR, relief="flat", bd=1, 
+                         highlightbackground=BORDER_COLOR, highlightthickness=1)
+    input_card.pack(fill=tk.X, pady=(0, 15))
+
+    # Card header
+    card_header = tk.Frame(input_card, bg=ACCENT_COLOR, height=40)
+    card_header.pack(fill=tk.X)
+    card_header.pack_propagate(False)
+
+    tk.Label(card_header, text="➕ ADD NEW EXPENSE", font=("Segoe UI", 12, "bold"), 
+             bg=ACCENT_COLOR, fg="white").pack(expand=True)
 
-# Date field
-tk.Label(form_frame, text="Date (YYYY-MM-DD)", bg=CARD_COLOR, fg=TEXT_COLOR,
-         font=("Segoe UI", 10, "bold")).grid(row=0, column=0, sticky="w", pady=(0, 5))
-date_entry = tk.Entry(form_frame, font=("Segoe UI", 11), relief="solid", bd=1, 
-                     bg="white", width=30)
-date_entry.grid(row=1, column=0, sticky="ew", pady=(0, 10))
-
-# Category field
-tk.Label(form_frame, text="Category", bg=CARD_COLOR, fg=TEXT_COLOR,
-         font=("Segoe UI", 10, "bold")).grid(row=2, column=0, sticky="w", pady=(0, 5))
-category_combobox = ttk.Combobox(form_frame, values=common_categories, 
-                                font=("Segoe UI", 11), state="normal", width=28)
-category_combobox.grid(row=3, column=0, sticky="ew", pady=(0, 10))
-
-# Amount field
-tk.Label(form_frame, text="Amount (₹)", bg=CARD_COLOR, fg=TEXT_COLOR,
-         font=("Segoe UI", 10, "bold")).grid(row=4, column=0, sticky="w", pady=(0, 5))
-amount_entry = tk.Entry(form_frame, font=("Segoe UI", 11), relief="solid", bd=1, 
-                       bg="white", width=30)
-amount_entry.grid(row=5, column=0, sticky="ew", pady=(0, 15))
-
-# Add expense button
-add_btn = tk.Button(form_frame, text="➕ ADD EXPENSE", command=add_expense,
-                    bg=ACCENT_COLOR, fg="white", font=("Segoe UI", 11, "bold"),
-                    relief="flat", pady=8, cursor="hand2")
-add_btn.grid(row=6, column=0, sticky="ew")
-
-# Quick actions card - WITH SET INCOME BUTTON
-actions_card = tk.Frame(left_frame, bg=CARD_COLOR, relief="flat", bd=1, 
-                       highlightbackground=BORDER_COLOR, highlightthickness=1)
-actions_card.pack(fill=tk.BOTH, expand=True)
-
-actions_header = tk.Frame(actions_card, bg=SECONDARY_COLOR, height=35)
-actions_header.pack(fill=tk.X)
-actions_header.pack_propagate(False)
-
-tk.Label(actions_header, text="⚡ QUICK ACTIONS", font=("Segoe UI", 11, "bold"),
-         bg=SECONDARY_COLOR, fg="white").pack(expand=True)
-
-# UPDATED: Added Set Income button back
-actions_container = tk.Frame(actions_card, bg=CARD_COLOR)
-actions_container.pack(fill=tk.BOTH, expand=True, padx=12, pady=10)
-
-action_buttons = [
-    ("📊 Analytics", show_graph, ACCENT_COLOR),
-    ("💰 Set Income", set_income_window, SUCCESS_COLOR),
-    ("🗑 Delete", delete_selected_record, DANGER_COLOR),
-    ("🧹 Clear All", clear_all_records, WARNING_COLOR)
-]
-
-# Compact buttons
-for i, (text, cmd, color) in enumerate(action_buttons):
-    btn = tk.Button(actions_container, text=text, command=cmd, bg=color,
-                   fg="white", font=("Segoe UI", 9),
-                   relief="flat", width=15, pady=6, cursor="hand2")
-    btn.pack(fill=tk.X, pady=3)
-
-# Right side - Expense list
-right_frame = tk.Frame(main_frame, bg=BG_COLOR)
-right_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
-
-# List header
-list_header = tk.Frame(right_frame, bg=CARD_COLOR, relief="flat", bd=1,
-                      highlightbackground=BORDER_COLOR, highlightthickness=1)
-list_header.pack(fill=tk.X)
-
-tk.Label(list_header, text="📋 EXPENSE HISTORY", font=("Segoe UI", 12, "bold"), 
-         bg=CARD_COLOR, fg=TEXT_COLOR, pady=12).pack()
-
-# Treeview with modern styling
-tree_container = tk.Frame(right_frame, bg=BG_COLOR)
-tree_container.pack(fill=tk.BOTH, expand=True, pady=(8, 0))
-
-# Configure treeview style
-style.configure("Custom.Treeview", 
-                background=CARD_COLOR,
-                foreground=TEXT_COLOR,
-                fieldbackground=CARD_COLOR,
-                borderwidth=0,
-                font=("Segoe UI", 10))
-style.configure("Custom.Treeview.Heading",
-                background=ACCENT_COLOR,
-                foreground="white",
-                relief="flat",
-                font=("Segoe UI", 11, "bold"))
-style.map("Custom.Treeview", 
-          background=[('selected', '#dbeafe')])
-
-tree = ttk.Treeview(tree_container, columns=("Date", "Category", "Amount"), 
-                   show="headings", height=20, style="Custom.Treeview")
-
-tree.heading("Date", text="📅 DATE")
-tree.heading("Category", text="🏷 CATEGORY")
-tree.heading("Amount", text="💸 AMOUNT")
-
-tree.column("Date", width=120, anchor="center")
-tree.column("Category", width=150, anchor="center")
-tree.column("Amount", width=120, anchor="center")
-
-# Add scrollbar
-scrollbar = ttk.Scrollbar(tree_container, orient="vertical", command=tree.yview)
-tree.configure(yscrollcommand=scrollbar.set)
-
-tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-# Initialize the application
-show_expenses()
-update_dashboard()
-
-# Center the window on screen
-root.update_idletasks()
-x = (root.winfo_screenwidth() // 2) - (root.winfo_width() // 2)
-y = (root.winfo_screenheight() // 2) - (root.winfo_height() // 2)
-root.geometry(f"+{x}+{y}")
-
-root.mainloop()
\ No newline at end of file
+    # Form content
+    form_frame = tk.Frame(input_card, bg=CARD_COLOR)
+    form_frame.pack(fill=tk.BOTH, padx=20, pady=15)
+
+    # Date field
+    tk.Label(form_frame, text="Date (YYYY-MM-DD)", bg=CARD_COLOR, fg=TEXT_COLOR,
+             font=("Segoe UI", 10, "bold")).grid(row=0, column=0, sticky="w", pady=(0, 5))
+    date_entry = tk.Entry(form_frame, font=("Segoe UI", 11), relief="solid", bd=1, 
+                         bg="white", width=30)
+    date_entry.grid(row=1, column=0, sticky="ew", pady=(0, 10))
+
+    # Category field
+    tk.Label(form_frame, text="Category", bg=CARD_COLOR, fg=TEXT_COLOR,
+             font=("Segoe UI", 10, "bold")).grid(row=2, column=0, sticky="w", pady=(0, 5))
+    category_combobox = ttk.Combobox(form_frame, values=common_categories, 
+                                    font=("Segoe UI", 11), state="normal", width=28)
+    category_combobox.grid(row=3, column=0, sticky="ew", pady=(0, 10))
+
+    # Amount field
+    tk.Label(form_frame, text="Amount (₹)", bg=CARD_COLOR, fg=TEXT_COLOR,
+             font=("Segoe UI", 10, "bold")).grid(row=4, column=0, sticky="w", pady=(0, 5))
+    amount_entry = tk.Entry(form_frame, font=("Segoe UI", 11), relief="solid", bd=1, 
+                           bg="white", width=30)
+    amount_entry.grid(row=5, column=0, sticky="ew", pady=(0, 15))
+
+    # Add expense button
+    add_btn = tk.Button(form_frame, text="➕ ADD EXPENSE", command=add_expense,
+                        bg=ACCENT_COLOR, fg="white", font=("Segoe UI", 11, "bold"),
+                        relief="flat", pady=8, cursor="hand2")
+    add_btn.grid(row=6, column=0, sticky="ew")
+
+    # Quick actions card - WITH SET INCOME BUTTON
+    actions_card = tk.Frame(left_frame, bg=CARD_COLOR, relief="flat", bd=1, 
+                           highlightbackground=BORDER_COLOR, highlightthickness=1)
+    actions_card.pack(fill=tk.BOTH, expand=True)
+
+    actions_header = tk.Frame(actions_card, bg=SECONDARY_COLOR, height=35)
+    actions_header.pack(fill=tk.X)
+    actions_header.pack_propagate(False)
+
+    tk.Label(actions_header, text="⚡ QUICK ACTIONS", font=("Segoe UI", 11, "bold"),
+             bg=SECONDARY_COLOR, fg="white").pack(expand=True)
+
+    # UPDATED: Added Set Income button back
+    actions_container = tk.Frame(actions_card, bg=CARD_COLOR)
+    actions_container.pack(fill=tk.BOTH, expand=True, padx=12, pady=10)
+
+    action_buttons = [
+        ("📊 Analytics", show_graph, ACCENT_COLOR),
+        ("💰 Set Income", set_income_window, SUCCESS_COLOR),
+        ("🗑 Delete", delete_selected_record, DANGER_COLOR),
+        ("🧹 Clear All", clear_all_records, WARNING_COLOR)
+    ]
+
+    # Compact buttons
+    action_widgets = []
+    for i, (text, cmd, color) in enumerate(action_buttons):
+        btn = tk.Button(actions_container, text=text, command=cmd, bg=color,
+                       fg="white", font=("Segoe UI", 9),
+                       relief="flat", width=15, pady=6, cursor="hand2")
+        btn.pack(fill=tk.X, pady=3)
+        action_widgets.append(btn)
+
+    # Right side - Expense list
+    right_frame = tk.Frame(main_frame, bg=BG_COLOR)
+    right_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+
+    # List header
+    list_header = tk.Frame(right_frame, bg=CARD_COLOR, relief="flat", bd=1,
+                          highlightbackground=BORDER_COLOR, highlightthickness=1)
+    list_header.pack(fill=tk.X)
+
+    tk.Label(list_header, text="📋 EXPENSE HISTORY", font=("Segoe UI", 12, "bold"), 
+             bg=CARD_COLOR, fg=TEXT_COLOR, pady=12).pack()
+
+    # Busy indicator, shown while storage work is queued
+    busy_label = tk.Label(list_header, text="", font=("Segoe UI", 9),
+                          bg=CARD_COLOR, fg=TEXT_SECONDARY)
+    busy_label.place(relx=1.0, rely=0.5, anchor="e", x=-12)
+
+    # Filter bar, applied as you type
+    filter_bar = tk.Frame(right_frame, bg=CARD_COLOR, relief="flat", bd=1,
+                          highlightbackground=BORDER_COLOR, highlightthickness=1)
+    filter_bar.pack(fill=tk.X, pady=(8, 0))
+
+    filter_combobox = ttk.Combobox(filter_bar, values=[ALL_CATEGORIES], state="readonly",
+                                   font=("Segoe UI", 10), width=16)
+    filter_combobox.set(ALL_CATEGORIES)
+    filter_combobox.pack(side=tk.LEFT, padx=(10, 6), pady=8)
+    filter_combobox.bind("<<ComboboxSelected>>", apply_filter)
+
+    filter_entries = {}
+    for name, label, width in [("text", "🔍", 14), ("from", "From", 11), ("to", "To", 11),
+                               ("min", "₹ Min", 8), ("max", "Max", 8)]:
+        tk.Label(filter_bar, text=label, font=("Segoe UI", 9), bg=CARD_COLOR,
+                 fg=TEXT_SECONDARY).pack(side=tk.LEFT, padx=(6, 2))
+        entry = tk.Entry(filter_bar, font=("Segoe UI", 10), relief="solid", bd=1, bg="white", width=width)
+        entry.pack(side=tk.LEFT)
+        entry.bind("<KeyRelease>", schedule_filter)
+        entry.bind("<Return>", apply_filter)
+        filter_entries[name] = entry
+
+    clear_btn = tk.Button(filter_bar, text="✖ Clear", command=clear_filter, bg=TEXT_SECONDARY, fg="white",
+                          font=("Segoe UI", 9), relief="flat", cursor="hand2")
+    clear_btn.pack(side=tk.RIGHT, padx=10)
+    filter_widgets = list(filter_entries.values()) + [clear_btn]
+
+    # Treeview with modern styling
+    tree_container = tk.Frame(right_frame, bg=BG_COLOR)
+    tree_container.pack(fill=tk.BOTH, expand=True, pady=(8, 0))
+
+    # Configure treeview style
+    style.configure("Custom.Treeview", 
+                    background=CARD_COLOR,
+                    foreground=TEXT_COLOR,
+                    fieldbackground=CARD_COLOR,
+                    borderwidth=0,
+                    font=("Segoe UI", 10))
+    style.configure("Custom.Treeview.Heading",
+                    background=ACCENT_COLOR,
+                    foreground="white",
+                    relief="flat",
+                    font=("Segoe UI", 11, "bold"))
+    style.map("Custom.Treeview", 
+              background=[('selected', '#dbeafe')])
+
+    tree = ttk.Treeview(tree_container, columns=("Date", "Category", "Amount"), 
+                       show="headings", height=20, style="Custom.Treeview")
+
+    tree.heading("Date", text="📅 DATE")
+    tree.heading("Category", text="🏷 CATEGORY")
+    tree.heading("Amount", text="💸 AMOUNT")
+
+    tree.column("Date", width=120, anchor="center")
+    tree.column("Category", width=150, anchor="center")
+    tree.column("Amount", width=120, anchor="center")
+
+    # Add scrollbar; it scrolls the history window rather than the Treeview itself
+    scrollbar = ttk.Scrollbar(tree_container, orient="vertical")
+    history = HistoryView(tree, scrollbar, ledger)
+
+    tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+def main(argv=None):
+    global filename, io_executor, ledger, incomes, selected_month
+    argv = sys.argv[1:] if argv is None else argv
+    # Month partitions in expenses/ by default (expenses.csv is moved into them),
+    # or pass a .csv file for a single journal, a .db file for SQLite or the
+    # http:// URL of a ledger service (service.py) to run as its client
+    filename = argv[0] if argv else "expenses"
+    # All storage I/O runs on this one worker thread, in the order it was queued
+    io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ledger-io")
+    ledger = Ledger(filename, submit=lambda work, *args: run_in_background(work, None, *args))
+    incomes = load_income(income_file, legacy_income_file)
+    selected_month = current_month()
+
+    build_ui()
+
+    # Initialize the application; the ledger is read on the I/O thread
+    set_actions_state("disabled")
+    run_in_background(load_spare, ledger_loaded)
+
+    # Center the window on screen
+    root.update_idletasks()
+    x = (root.winfo_screenwidth() // 2) - (root.winfo_width() // 2)
+    y = (root.winfo_screenheight() // 2) - (root.winfo_height() // 2)
+    root.geometry(f"+{x}+{y}")
+
+    root.protocol("WM_DELETE_WINDOW", on_close)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
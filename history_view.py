@@ -0,0 +1,186 @@
+from tkinter import ttk
+from bisect import bisect_left, insort
+
+from perf import span, timed
+
+
+def _category_key(dates, codes, paise, live, names):
+    lowered = [name.lower() for name in names]
+    return lambda rid: lowered[codes[rid]]
+
+
+# Column -> sort key of a record ID, made from the ledger's columns (see
+# Ledger.columns), so dates sort as ordinals and amounts as exact paise
+SORT_KEYS = {
+    "Date": lambda dates, codes, paise, live, names: dates.__getitem__,
+    "Category": _category_key,
+    "Amount": lambda dates, codes, paise, live, names: paise.__getitem__,
+}
+
+
+class HistoryView:
+    """Windowed view of the ledger on top of a ttk.Treeview.
+
+    Only the rows in the current window (what fits on screen plus a small
+    buffer) exist as Treeview items. The scrollbar and mouse wheel move the
+    window over a sorted list of row ids, and adding or deleting one record
+    only touches the Treeview when that record falls inside the window.
+
+    With a filter set (see set_filter) only the matching records are listed,
+    and total/count describe them.
+    """
+
+    def __init__(self, tree, scrollbar, ledger, buffer=5):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.ledger = ledger
+        self.buffer = buffer
+        self.first = 0
+        self.visible = int(tree.cget("height"))
+        style = ttk.Style(tree)
+        self.rowheight = int(style.lookup(tree.cget("style") or "Treeview", "rowheight") or 20)
+        self.sort_column = None
+        self.descending = False
+        self.order = []
+        self.filter = None
+        self.paise = 0
+        self.count = 0
+
+        self.titles = {column: tree.heading(column, "text") for column in tree["columns"]}
+        self.set_sortable(True)
+
+        scrollbar.configure(command=self.scroll)
+        tree.bind("<Configure>", self._on_resize)
+        tree.bind("<MouseWheel>", lambda e: self.scroll("scroll", -1 if e.delta > 0 else 1, "units"))
+        tree.bind("<Button-4>", lambda e: self.scroll("scroll", -1, "units"))
+        tree.bind("<Button-5>", lambda e: self.scroll("scroll", 1, "units"))
+
+    # ------------------ Ordering ------------------
+    def _sort_key(self):
+        # Made again for each use: a reload swaps in new columns
+        if self.sort_column is None:
+            return None
+        return SORT_KEYS[self.sort_column](*self.ledger.columns())
+
+    def _entry(self, rid):
+        key = self._sort_key()
+        return (rid if key is None else key(rid)), rid
+
+    def _position(self, index):
+        # Index into self.order -> position on screen
+        return len(self.order) - 1 - index if self.descending else index
+
+    def reload(self):
+        """Rebuild the ordering from the ledger, e.g. on startup or after a clear."""
+        if self.filter is None:
+            rids = self.ledger.ids()
+        else:
+            rids = self.ledger.query(self.filter)
+        self.paise, self.count = self.ledger.paise_of(rids), len(rids)
+        key = self._sort_key()
+        self.order = list(zip(rids if key is None else map(key, rids), rids))
+        self.order.sort()
+        self.first = 0
+        self.render()
+
+    @property
+    def total(self):
+        return self.paise / 100
+
+    def set_filter(self, where):
+        """List only the records matching `where` (a ledger.Filter), or all of them for None."""
+        self.filter = where if where is not None and where.active() else None
+        self.reload()
+
+    def set_sortable(self, sortable):
+        """Turn sorting by a click on a column heading on or off, e.g. while the ledger loads."""
+        for column in self.titles:
+            self.tree.heading(column, command=(lambda c=column: self.sort_by(c)) if sortable else "")
+
+    def sort_by(self, column):
+        if column == self.sort_column:
+            self.descending = not self.descending
+        else:
+            self.sort_column = column
+            self.descending = False
+        for name, title in self.titles.items():
+            arrow = (" ▼" if self.descending else " ▲") if name == column else ""
+            self.tree.heading(name, text=title + arrow)
+        self.reload()
+
+    # ------------------ Mutations ------------------
+    def insert(self, rid):
+        """Show a row that was just added to the ledger."""
+        row = self.ledger.get(rid)
+        if self.filter is not None and not self.filter.matches(row):
+            return
+        self.paise += row.paise
+        self.count += 1
+        entry = self._entry(rid)
+        insort(self.order, entry)
+        self._changed(self._position(bisect_left(self.order, entry)))
+
+    def remove(self, rid):
+        """Hide a row; call this before the row is deleted from the ledger."""
+        entry = self._entry(rid)
+        index = bisect_left(self.order, entry)
+        if index == len(self.order) or self.order[index] != entry:
+            return
+        self.paise -= self.ledger.get(rid).paise
+        self.count -= 1
+        position = self._position(index)
+        del self.order[index]
+        self._changed(position)
+
+    def _changed(self, position):
+        if position < self.first + self.visible + self.buffer:
+            self.render()
+        else:
+            self._update_scrollbar()
+
+    # ------------------ Window ------------------
+    def scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            first = int(float(amount) * len(self.order))
+        elif unit == "pages":
+            first = self.first + int(amount) * self.visible
+        else:
+            first = self.first + int(amount)
+        first = max(0, min(first, len(self.order) - self.visible))
+        if first != self.first:
+            self.first = first
+            self.render()
+
+    def _on_resize(self, event):
+        # One row's worth of height goes to the column headings
+        visible = max(1, event.height // self.rowheight - 1)
+        if visible != self.visible:
+            self.visible = visible
+            self.render()
+
+    @timed("history.render")
+    def render(self):
+        self.first = max(0, min(self.first, len(self.order) - self.visible))
+        last = min(len(self.order), self.first + self.visible + self.buffer)
+        wanted = [str(self.order[self._position(i)][1]) for i in range(self.first, last)]
+        current = self.tree.get_children()
+        if list(current) != wanted:
+            keep = set(wanted)
+            stale = [iid for iid in current if iid not in keep]
+            if stale:
+                self.tree.delete(*stale)
+            with span("history.tree_insert"):
+                for index, iid in enumerate(wanted):
+                    if self.tree.exists(iid):
+                        self.tree.move(iid, "", index)
+                    else:
+                        self.tree.insert("", index, iid=iid, values=tuple(self.ledger.get(int(iid))))
+        self.tree.yview_moveto(0)
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        total = len(self.order)
+        if total <= self.visible:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.first / total, (self.first + self.visible) / total)
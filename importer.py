@@ -0,0 +1,144 @@
+"""Bulk import of bank statement CSV files into the ledger.
+
+The statement is read in batches. Each batch has its distinct dates parsed
+once, rows that fail validation are collected into a reject report instead
+of stopping the import, and all accepted rows are written to the ledger in a
+single buffered pass.
+
+Usage:
+    python importer.py statement.csv [--ledger expenses] [--rejects rejects.csv]
+"""
+import csv
+
+from dates import INPUT_FORMATS, normalize_date
+from ledger import Ledger, to_paise
+
+BATCH_SIZE = 10000
+# Followed by the rejected row's original fields
+REJECT_HEADER = ["Line", "Reason"]
+
+
+def parse_amount(text):
+    # Statements write amounts like "₹1,234.50"
+    amount = float(text.replace(",", "").replace("₹", "").strip())
+    # NaN, infinity and amounts too large to store raise ValueError too
+    to_paise(amount)
+    return amount
+
+
+def _validate(batch, columns, formats, default_category, records, rejects):
+    date_col, category_col, amount_col = columns
+    width = max(columns)
+    dates = {}
+    for line, row in batch:
+        if len(row) > width:
+            raw = row[date_col].strip()
+            if raw not in dates:
+                try:
+                    dates[raw] = normalize_date(raw, formats)
+                except ValueError:
+                    dates[raw] = None
+
+    for line, row in batch:
+        if len(row) <= width:
+            rejects.append((line, "missing columns", row))
+            continue
+        date = dates[row[date_col].strip()]
+        if date is None:
+            rejects.append((line, "invalid date", row))
+            continue
+        category = row[category_col].strip() or default_category
+        if not category:
+            rejects.append((line, "missing category", row))
+            continue
+        try:
+            amount = parse_amount(row[amount_col])
+        except ValueError:
+            rejects.append((line, "invalid amount", row))
+            continue
+        records.append((date, category, amount))
+
+
+def read_statement(path, date_column="Date", category_column="Category",
+                   amount_column="Amount", date_formats=INPUT_FORMATS, default_category=None):
+    """Read and validate a statement; returns (records, rejects).
+
+    Records are (date, category, amount) tuples ready for Ledger.add_many.
+    Each reject is a (line number, reason, raw row) tuple. Raises ValueError
+    if the statement has no header row or is missing one of the columns.
+    """
+    date_formats = tuple(date_formats)
+    records, rejects = [], []
+    with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = [name.strip() for name in next(reader, [])]
+        columns = []
+        for name in (date_column, category_column, amount_column):
+            if name not in header:
+                raise ValueError(f"{path}: no {name!r} column in header {header}")
+            columns.append(header.index(name))
+
+        batch = []
+        for line, row in enumerate(reader, start=2):
+            if not row:
+                continue
+            batch.append((line, row))
+            if len(batch) == BATCH_SIZE:
+                _validate(batch, columns, date_formats, default_category, records, rejects)
+                batch = []
+        _validate(batch, columns, date_formats, default_category, records, rejects)
+
+    return records, rejects
+
+
+def import_statement(ledger, path, *args, **kwargs):
+    """Import a statement into the ledger; returns (new record IDs, rejects).
+
+    Takes the same options as read_statement().
+    """
+    records, rejects = read_statement(path, *args, **kwargs)
+    return ledger.add_many(records), rejects
+
+
+def write_rejects(path, rejects):
+    # The statement's own text goes back out, ₹ signs included, whatever the platform's default
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(REJECT_HEADER)
+        writer.writerows([line, reason] + row for line, reason, row in rejects)
+
+
+# ------------------ Command line ------------------
+def main(argv=None):
+    # Only the command line needs argparse, keep it out of GUI startup
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import a bank statement CSV into the ledger")
+    parser.add_argument("statement")
+    parser.add_argument("--ledger", default="expenses")
+    parser.add_argument("--rejects", help="where to write rejected rows (default: <statement>.rejects.csv)")
+    parser.add_argument("--date-column", default="Date")
+    parser.add_argument("--category-column", default="Category")
+    parser.add_argument("--amount-column", default="Amount")
+    parser.add_argument("--date-format", action="append",
+                        help="strptime format of the statement's dates, may be repeated "
+                             "(default: %%Y-%%m-%%d and %%Y/%%m/%%d)")
+    parser.add_argument("--default-category", help="category for rows that have none")
+    args = parser.parse_args(argv)
+
+    ledger = Ledger(args.ledger)
+    try:
+        ids, rejects = import_statement(ledger, args.statement, args.date_column, args.category_column,
+                                        args.amount_column, args.date_format or INPUT_FORMATS,
+                                        args.default_category)
+    finally:
+        ledger.close()
+    print(f"Imported {len(ids)} records into {args.ledger}")
+    if rejects:
+        rejects_path = args.rejects or args.statement + ".rejects.csv"
+        write_rejects(rejects_path, rejects)
+        print(f"Rejected {len(rejects)} rows, see {rejects_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Monthly income, kept per month so past budgets keep the income they had.
+
+The history is a dict of YYYY-MM -> amount saved as JSON. A month without an
+entry uses the latest earlier one; months before the first entry use the
+first one.
+"""
+import json, os
+from bisect import bisect_right
+
+from dates import current_month
+from storage import atomic_write
+
+
+def load_income(path, legacy_path=None):
+    """Income history saved in `path`, {} when unset or unreadable.
+
+    When `path` doesn't exist yet the single value of an old income.txt at
+    `legacy_path` becomes the entry for the current month.
+    """
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            try:
+                history = json.load(f)
+            except ValueError:
+                return {}
+        return {month: float(amount) for month, amount in history.items()}
+    if legacy_path and os.path.exists(legacy_path):
+        with open(legacy_path, "r") as f:
+            try:
+                return {current_month(): float(f.read().strip())}
+            except ValueError:
+                return {}
+    return {}
+
+
+def save_income(path, history):
+    atomic_write(path, lambda f: json.dump(dict(sorted(history.items())), f, indent=2))
+
+
+def income_for(history, month):
+    """Income that applies to `month`, 0.0 when none was ever set."""
+    if not history:
+        return 0.0
+    months = sorted(history)
+    return history[months[max(bisect_right(months, month) - 1, 0)]]
@@ -0,0 +1,598 @@
+import math
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from itertools import chain, compress
+
+from dates import date_ordinal, month_range, ordinal_date, ordinal_month
+from perf import timed
+from storage import MAX_ID, open_storage, to_paise
+
+# The date index packs (ordinal, ID) into one int64, so it sorts as plain numbers
+ID_BITS = 32
+ID_MASK = (1 << ID_BITS) - 1
+MAX_CATEGORIES = 1 << 16
+# Deleted IDs stay behind as holes in the columns, 15 bytes each. An ID this
+# much further than the records there are would only allocate empty room;
+# deletes alone never leave a ledger that sparse
+MAX_ID_GAP = 1 << 24
+# add_many() merges this many records or more into the indexes at once
+MERGE_AT = 64
+
+
+class Record:
+    """View of one expense in a Ledger; unpacks as (date, category, amount).
+
+    Only valid until the record is deleted.
+    """
+
+    __slots__ = ("ledger", "id")
+
+    def __init__(self, ledger, rid):
+        self.ledger = ledger
+        self.id = rid
+
+    @property
+    def ordinal(self):
+        return self.ledger._dates[self.id]
+
+    @property
+    def date(self):
+        return ordinal_date(self.ledger._dates[self.id])
+
+    @property
+    def category(self):
+        return self.ledger._names[self.ledger._codes[self.id]]
+
+    @property
+    def paise(self):
+        return self.ledger._paise[self.id]
+
+    @property
+    def amount(self):
+        return self.ledger._paise[self.id] / 100
+
+    def __iter__(self):
+        return iter((self.date, self.category, self.amount))
+
+    def __getitem__(self, index):
+        return (self.date, self.category, self.amount)[index]
+
+    def __len__(self):
+        return 3
+
+    def __repr__(self):
+        return f"Record({self.id}, {self.date!r}, {self.category!r}, {self.amount!r})"
+
+
+class Ledger:
+    """In-memory copy of a stored ledger.
+
+    The records are loaded from the storage backend once, when the ledger is
+    created. Every read after that is served from memory. The total, the
+    per-category sums and counts and the per-month sums and counts are kept up
+    to date on every mutation so the dashboard never has to walk the rows.
+    A date index is kept sorted, so a date range is found by binary search.
+    The first query() also builds a category -> IDs posting list and an
+    index of IDs sorted by amount, which are maintained from then on.
+
+    Records are stored column-wise in arrays indexed by ID: the date as an
+    int32 ordinal, the category as a uint16 code into an interned list of
+    names and the amount as int64 paise, so sums are exact. That is about 15
+    bytes per record plus 8 per index entry, instead of a dict entry with a
+    tuple of Python objects. get() returns a Record view of one row.
+
+    Every record has a stable integer ID. Mutations are passed on to the
+    backend one record at a time; see storage.py for how each backend
+    persists them. Records other programs add to or delete from storage are
+    taken in with adopt() and forget(), which don't write back.
+
+    With submit=None storage calls run in the calling thread. A GUI can pass
+    a submit(fn, *args) that queues them on a single worker thread instead;
+    the in-memory state is then updated immediately and the write happens
+    behind it. In that case the ledger is not loaded on construction: load a
+    plain Ledger on the worker and swap_in() it, or hand the result of
+    storage.load to load().
+    """
+
+    def __init__(self, path, storage=None, submit=None):
+        self.path = path
+        self.storage = storage or open_storage(path)
+        self.submit = submit
+        # Bumped on every change, lets views cache anything derived from the rows
+        self.version = 0
+        self._reset_columns(0)
+        self._reset_aggregates()
+        if submit is None:
+            self.load()
+
+    # ------------------ Columns ------------------
+    def _reset_columns(self, size):
+        # IDs are handed out in order, so they index the columns directly;
+        # deleted IDs stay behind as holes with _live set to 0
+        self._dates = array('i', bytes(4 * size))
+        self._codes = array('H', bytes(2 * size))
+        self._paise = array('q', bytes(8 * size))
+        self._live = bytearray(size)
+        self._next_id = size
+        self._size = 0
+        self._names = []
+        self._code_of = {}
+
+    def _intern(self, category):
+        code = self._code_of.get(category)
+        if code is None:
+            if len(self._names) == MAX_CATEGORIES:
+                raise ValueError(f"{self.path}: more than {MAX_CATEGORIES} categories")
+            code = self._code_of[category] = len(self._names)
+            self._names.append(category)
+        return code
+
+    # ------------------ Loading ------------------
+    @timed("ledger.load")
+    def load(self, records=None):
+        """Fill the ledger from storage, or from records already read by storage.load()."""
+        if records is None:
+            records = self.storage.load()
+        size = max((record[0] for record in records), default=-1) + 1
+        if size > min(MAX_ID, len(records) + MAX_ID_GAP) + 1:
+            raise ValueError(f"{self.path}: record ID {size - 1} is out of range for {len(records)} records")
+        self._reset_columns(size)
+        self._reset_aggregates()
+        ordinals = {}
+        for rid, date, category, amount in records:
+            if rid < 0:
+                # It would index the columns from the end, over another record
+                raise ValueError(f"{self.path}: record ID {rid} is negative")
+            ordinal = ordinals.get(date)
+            if ordinal is None:
+                try:
+                    ordinal = ordinals[date] = date_ordinal(date)
+                except ValueError:
+                    raise ValueError(f"{self.path}: record {rid} has an unreadable date {date!r}") from None
+            try:
+                paise = to_paise(amount)
+            except ValueError as e:
+                raise ValueError(f"{self.path}: record {rid}: {e}") from None
+            self._dates[rid] = ordinal
+            self._codes[rid] = self._intern(category)
+            self._paise[rid] = paise
+            self._live[rid] = 1
+        self._size = self._live.count(1)
+        # One pass fills every aggregate
+        self._total, self._sums, self._counts, day_sums, day_counts = self._scan()
+        self._month_sums, self._month_counts = self._months(day_sums, day_counts)
+        self._by_date = array('q', sorted((self._dates[rid] << ID_BITS) | rid for rid in self.ids()))
+
+    def _store(self, date, category, amount, index=True, rid=None):
+        # rid is given for records written by someone else, it may be any unused ID
+        # A bad date, amount or ID raises ValueError here, before any column is touched
+        ordinal = date_ordinal(date)
+        paise = to_paise(amount)
+        if rid is not None and not 0 <= rid <= min(MAX_ID, self._size + MAX_ID_GAP):
+            raise ValueError(f"record ID {rid} is out of range for {self._size} records")
+        code = self._intern(category)
+        if rid is None or rid == self._next_id:
+            rid = self._next_id
+            self._next_id += 1
+            self._dates.append(ordinal)
+            self._codes.append(code)
+            self._paise.append(paise)
+            self._live.append(1)
+        else:
+            if rid > self._next_id:
+                # Leave holes for the IDs in between
+                gap = rid + 1 - self._next_id
+                self._dates.frombytes(bytes(4 * gap))
+                self._codes.frombytes(bytes(2 * gap))
+                self._paise.frombytes(bytes(8 * gap))
+                self._live.extend(bytes(gap))
+                self._next_id = rid + 1
+            self._dates[rid], self._codes[rid], self._paise[rid] = ordinal, code, paise
+            self._live[rid] = 1
+        self._size += 1
+        self._count(ordinal, code, paise, 1)
+        if index:
+            insort(self._by_date, (ordinal << ID_BITS) | rid)
+            if self._by_amount is not None:
+                insort(self._by_amount, rid, key=self._amount_key)
+        if self._by_category is not None:
+            postings = self._by_category.setdefault(code, array('q'))
+            if postings and postings[-1] > rid:
+                insort(postings, rid)
+            else:
+                # New IDs are the largest yet, so the posting list stays sorted
+                postings.append(rid)
+        return rid
+
+    def _unstore(self, rid):
+        if not (0 <= rid < self._next_id and self._live[rid]):
+            raise KeyError(rid)
+        ordinal, code, paise = self._dates[rid], self._codes[rid], self._paise[rid]
+        self._live[rid] = 0
+        self._size -= 1
+        self._count(ordinal, code, paise, -1)
+        del self._by_date[bisect_left(self._by_date, (ordinal << ID_BITS) | rid)]
+        if self._by_amount is not None:
+            del self._by_amount[bisect_left(self._by_amount, (paise, rid), key=self._amount_key)]
+            ids = self._by_category[code]
+            del ids[bisect_left(ids, rid)]
+            if not ids:
+                del self._by_category[code]
+
+    # ------------------ Handing over ------------------
+    # load() or a big add_many() takes seconds on a large ledger. A GUI runs
+    # them on its worker thread against a spare Ledger (a fresh one, or a
+    # copy()) and swaps the result in with swap_in(), which only moves references.
+    def copy(self):
+        """A Ledger with the same records and indexes that changes apart from this one.
+
+        It shares the storage but writes to it in the calling thread (submit=None).
+        """
+        other = Ledger.__new__(Ledger)
+        other.__dict__.update(self.__dict__)
+        other.submit = None
+        for name in ("_dates", "_codes", "_paise", "_live", "_names", "_by_date"):
+            setattr(other, name, getattr(self, name)[:])
+        for name in ("_code_of", "_sums", "_counts", "_month_sums", "_month_counts"):
+            setattr(other, name, getattr(self, name).copy())
+        if self._by_amount is not None:
+            other._by_amount = self._by_amount[:]
+        if self._by_category is not None:
+            other._by_category = {code: ids[:] for code, ids in self._by_category.items()}
+        return other
+
+    def swap_in(self, other):
+        """Take over the records and indexes of `other`, which is not to be used again."""
+        version = max(self.version, other.version)
+        state = {name: value for name, value in vars(other).items() if name.startswith("_")}
+        self.__dict__.update(state)
+        self.version = version + 1
+
+    # ------------------ Aggregates ------------------
+    def _reset_aggregates(self):
+        self.version += 1
+        # Amounts in paise, categories by code
+        self._total = 0
+        self._sums = {}
+        self._counts = {}
+        self._month_sums = {}
+        self._month_counts = {}
+        self._by_date = array('q')
+        # Search indexes, built by the first query()
+        self._by_amount = None
+        self._by_category = None
+
+    @staticmethod
+    def _bump(sums, counts, key, amount, sign):
+        count = counts.get(key, 0) + sign
+        if count:
+            counts[key] = count
+            sums[key] = sums.get(key, 0) + sign * amount
+        else:
+            del counts[key]
+            del sums[key]
+
+    def _count(self, ordinal, code, paise, sign):
+        self.version += 1
+        self._bump(self._sums, self._counts, code, paise, sign)
+        self._bump(self._month_sums, self._month_counts, ordinal_month(ordinal), paise, sign)
+        self._total += sign * paise
+
+    def _scan(self):
+        """-> (total, sums and counts per category code, sums and counts per date ordinal)."""
+        total, sums, counts, day_sums, day_counts = 0, {}, {}, {}, {}
+        for live, ordinal, code, paise in zip(self._live, self._dates, self._codes, self._paise):
+            if not live:
+                continue
+            total += paise
+            if code in counts:
+                sums[code] += paise
+                counts[code] += 1
+            else:
+                sums[code] = paise
+                counts[code] = 1
+            if ordinal in day_counts:
+                day_sums[ordinal] += paise
+                day_counts[ordinal] += 1
+            else:
+                day_sums[ordinal] = paise
+                day_counts[ordinal] = 1
+        return total, sums, counts, day_sums, day_counts
+
+    @staticmethod
+    def _months(day_sums, day_counts):
+        month_sums, month_counts = {}, {}
+        for ordinal, paise in day_sums.items():
+            month = ordinal_month(ordinal)
+            month_sums[month] = month_sums.get(month, 0) + paise
+            month_counts[month] = month_counts.get(month, 0) + day_counts[ordinal]
+        return month_sums, month_counts
+
+    def recompute(self):
+        """Full scan of the rows -> (total, category sums, category counts, month sums, month counts).
+
+        Amounts are in paise and categories by code, like the running aggregates.
+        """
+        total, sums, counts, day_sums, day_counts = self._scan()
+        return (total, sums, counts) + self._months(day_sums, day_counts)
+
+    def verify(self):
+        """Check the running aggregates and the date index against recompute().
+
+        load() builds them with that same scan, so this checks what add and
+        delete did to them since; the GUI's debug panel runs it on request.
+        """
+        running = (self._total, self._sums, self._counts, self._month_sums, self._month_counts)
+        return self.recompute() == running and len(self._by_date) == self._size
+
+    # ------------------ Storage ------------------
+    def _write(self, method, *args):
+        if self.submit is None:
+            method(*args)
+        else:
+            self.submit(method, *args)
+
+    def _stored(self, rid):
+        # Storage gets the amount as it is kept, in whole paise
+        return rid, ordinal_date(self._dates[rid]), self._names[self._codes[rid]], self._paise[rid] / 100
+
+    def compact(self):
+        """Rewrite storage from the live rows."""
+        self._write(self.storage.rewrite, [self._stored(rid) for rid in self.ids()])
+
+    def close(self):
+        self._write(self.storage.close)
+
+    # ------------------ Mutations ------------------
+    def add(self, date, category, amount):
+        """Append one expense and return its ID.
+
+        Raises ValueError for an unreadable date or an amount that can't be stored.
+        """
+        rid = self._store(date, category, amount)
+        self._write(self.storage.append, *self._stored(rid))
+        return rid
+
+    def add_many(self, records, ids=None):
+        """Add (date, category, amount) records in one storage write; returns their IDs.
+
+        `ids` may ask for an ID per record, None for the next free one, as a
+        client of the service does. An ID that is taken, or so far past the
+        next free one that it would leave a long run of holes, is not honoured.
+        Raises ValueError, with nothing added, if any record has an unreadable
+        date or an amount that can't be stored.
+        """
+        for date, _, amount in records:
+            date_ordinal(date)
+            to_paise(amount)
+        # A few records are inserted into the indexes one by one, like add() does
+        index = len(records) < MERGE_AT
+        if ids is None:
+            ids = [self._store(date, category, amount, index) for date, category, amount in records]
+        else:
+            wanted, ids = ids, [None] * len(records)
+            limit = self._next_id + len(records)
+            for position, rid in enumerate(wanted):
+                if rid is not None and 0 <= rid < limit and rid not in self:
+                    ids[position] = self._store(*records[position], index, rid=rid)
+            # The rest go after, so the next free ID can't be one asked for later in the list
+            for position, rid in enumerate(ids):
+                if rid is None:
+                    ids[position] = self._store(*records[position], index)
+        if not index:
+            # Sorting the merged runs beats an insort per record on big imports
+            self._by_date = array('q', sorted(chain(self._by_date, ((self._dates[rid] << ID_BITS) | rid
+                                                                    for rid in ids))))
+            if self._by_amount is not None:
+                self._by_amount = array('q', sorted(chain(self._by_amount, ids), key=self._amount_key))
+        self._write(self.storage.append_many, [self._stored(rid) for rid in ids])
+        return ids
+
+    def delete(self, rid):
+        """Remove the record with this ID."""
+        self._unstore(rid)
+        self._write(self.storage.delete, rid)
+
+    # ------------------ Changes made elsewhere ------------------
+    def adopt(self, rid, date, category, amount):
+        """Take in a record another program already stored, replacing any record with its ID.
+
+        Raises ValueError for an unreadable date, an amount that can't be
+        stored or an ID too far past the others (see MAX_ID_GAP).
+        """
+        if rid in self:
+            self._unstore(rid)
+        self._store(date, category, amount, rid=rid)
+
+    def forget(self, rid):
+        """Drop a record another program already deleted from storage."""
+        if rid in self:
+            self._unstore(rid)
+
+    def clear(self):
+        # Storage is emptied too, so IDs can start over
+        self._reset_columns(0)
+        self._reset_aggregates()
+        self._write(self.storage.rewrite, [])
+
+    # ------------------ Reads ------------------
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, rid):
+        return 0 <= rid < self._next_id and self._live[rid] == 1
+
+    def get(self, rid):
+        if rid not in self:
+            raise KeyError(rid)
+        return Record(self, rid)
+
+    def ids(self):
+        """IDs of the live records, in ID order."""
+        return list(compress(range(self._next_id), self._live))
+
+    def items(self):
+        return ((rid, Record(self, rid)) for rid in self.ids())
+
+    def columns(self):
+        """(dates, codes, paise, live, names): the columns, indexed by ID, for bulk readers.
+
+        live[rid] is 1 for records that exist and names[code] is a category.
+        These are the ledger's own arrays: don't modify them, and drop any
+        buffer views (np.frombuffer) before the next mutation, since an array
+        can't grow while it is exported.
+        """
+        return self._dates, self._codes, self._paise, self._live, self._names
+
+    def total(self):
+        return self._total / 100
+
+    def category_sums(self):
+        return {self._names[code]: paise / 100 for code, paise in self._sums.items()}
+
+    def category_counts(self):
+        return {self._names[code]: count for code, count in self._counts.items()}
+
+    def range_ids(self, start, end):
+        """IDs of the records dated start <= ordinal < end, in date order."""
+        lo = bisect_left(self._by_date, start << ID_BITS)
+        hi = bisect_left(self._by_date, end << ID_BITS, lo)
+        return [key & ID_MASK for key in self._by_date[lo:hi]]
+
+    def paise_of(self, ids):
+        """Exact sum of these records' amounts, in paise."""
+        paise = self._paise
+        return sum(paise[rid] for rid in ids)
+
+    def _range_paise(self, start, end):
+        return self.paise_of(self.range_ids(start, end))
+
+    def range_total(self, start, end):
+        """Sum of the records dated start <= ordinal < end."""
+        return self._range_paise(start, end) / 100
+
+    def months(self):
+        """Months (YYYY-MM) that have records, oldest first."""
+        return sorted(self._month_counts)
+
+    def month_total(self, month, through=None):
+        """Spending in `month`; with `through` (an ordinal) only up to and including that day."""
+        paise = self._month_sums.get(month, 0)
+        if through is not None and paise:
+            # The rollup covers the whole month, take off what comes after `through`
+            start, end = month_range(month)
+            paise -= self._range_paise(max(start, through + 1), end)
+        return paise / 100
+
+    def month_count(self, month, through=None):
+        count = self._month_counts.get(month, 0)
+        if through is not None and count:
+            start, end = month_range(month)
+            count -= len(self.range_ids(max(start, through + 1), end))
+        return count
+
+    # ------------------ Search ------------------
+    def _amount_key(self, rid):
+        return self._paise[rid], rid
+
+    def _search_indexes(self):
+        if self._by_amount is None:
+            ids = self.ids()
+            paise = self._paise
+            # Sort (amount, ID) as one number; Python ints don't overflow
+            self._by_amount = array('q', [key & ID_MASK for key in sorted((paise[rid] << ID_BITS) | rid
+                                                                         for rid in ids)])
+            self._by_category = {}
+            codes = self._codes
+            for rid in ids:
+                postings = self._by_category.get(codes[rid])
+                if postings is None:
+                    postings = self._by_category[codes[rid]] = array('q')
+                postings.append(rid)
+
+    @timed("ledger.query")
+    def query(self, where):
+        """IDs of the records matching `where`, a Filter.
+
+        Every condition is sized on its index first (posting lists for the
+        category and text, binary search for the date and amount ranges); the
+        smallest candidate list is then walked and checked against the rest.
+        """
+        self._search_indexes()
+        codes = low = high = None
+        candidates = []
+        if where.category is not None or where.text is not None:
+            codes = {code for code in self._by_category if where.matches_category(self._names[code])}
+            candidates.append((sum(len(self._by_category[code]) for code in codes),
+                               lambda: chain.from_iterable(self._by_category[code] for code in codes)))
+        if where.start is not None or where.end is not None:
+            lo = 0 if where.start is None else bisect_left(self._by_date, where.start << ID_BITS)
+            hi = len(self._by_date) if where.end is None else bisect_left(self._by_date, where.end << ID_BITS)
+            candidates.append((hi - lo, lambda: (key & ID_MASK for key in self._by_date[lo:hi])))
+        if where.min_amount is not None or where.max_amount is not None:
+            # Whole paise that satisfy the bounds
+            low = None if where.min_amount is None else math.ceil(where.min_amount * 100 - 1e-6)
+            high = None if where.max_amount is None else math.floor(where.max_amount * 100 + 1e-6)
+            first = 0 if low is None else bisect_left(self._by_amount, (low, -1), key=self._amount_key)
+            last = (len(self._by_amount) if high is None else
+                    bisect_right(self._by_amount, (high, math.inf), key=self._amount_key))
+            candidates.append((last - first, lambda: self._by_amount[first:last]))
+        if not candidates:
+            return self.ids()
+        _, ids = min(candidates, key=lambda candidate: candidate[0])
+        if len(candidates) == 1:
+            # The index answers a single condition exactly
+            return list(ids())
+
+        dates, category_codes, paise = self._dates, self._codes, self._paise
+        start, end = where.start, where.end
+
+        def matches(rid):
+            if codes is not None and category_codes[rid] not in codes:
+                return False
+            if (low is not None and paise[rid] < low) or (high is not None and paise[rid] > high):
+                return False
+            return (start is None or dates[rid] >= start) and (end is None or dates[rid] < end)
+
+        return [rid for rid in ids() if matches(rid)]
+
+
+class Filter:
+    """Conditions for Ledger.query(); the ones left as None don't filter.
+
+    start and end are date ordinals, end exclusive. The amount bounds are
+    inclusive, and text matches category names ignoring case.
+    """
+
+    def __init__(self, category=None, start=None, end=None, min_amount=None, max_amount=None, text=None):
+        self.category = category
+        self.start = start
+        self.end = end
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        self.text = text.lower() if text else None
+
+    def active(self):
+        return any(value is not None for value in (self.category, self.start, self.end,
+                                                   self.min_amount, self.max_amount, self.text))
+
+    def matches_category(self, name):
+        if self.category is not None and name != self.category:
+            return False
+        return self.text is None or self.text in name.lower()
+
+    def matches(self, row):
+        date, category, amount = row
+        if not self.matches_category(category):
+            return False
+        if self.min_amount is not None and amount < self.min_amount:
+            return False
+        if self.max_amount is not None and amount > self.max_amount:
+            return False
+        if self.start is not None or self.end is not None:
+            ordinal = date_ordinal(date)
+            if self.start is not None and ordinal < self.start:
+                return False
+            if self.end is not None and ordinal >= self.end:
+                return False
+        return True
@@ -0,0 +1,177 @@
+"""Timing spans around the hot paths.
+
+Handlers and storage calls are wrapped with @timed(name), and smaller blocks
+with `with span(name):`. While recording is off (the default) a wrapped call
+costs one flag check. While it is on, every span goes into a ring buffer of
+the last RING_SIZE spans, which stats() turns into latency percentiles, and
+into running per-span totals that export_profile() writes in the cProfile
+(pstats) format, so the usual tools can read them:
+
+    python -m pstats profile.prof
+
+Setting EXPENSE_TRACKER_PROFILE=<path> turns recording on at startup and
+writes the spans to <path> on exit: JSON when it ends in .json, pstats
+otherwise. The GUI has a hidden debug panel for the same (Ctrl+Shift+D).
+"""
+import atexit, functools, json, marshal, os, threading
+from collections import deque
+from contextlib import nullcontext
+from time import perf_counter
+
+ENV_VAR = "EXPENSE_TRACKER_PROFILE"
+RING_SIZE = 4096
+PERCENTILES = (50, 90, 99)
+
+enabled = False
+ring = deque(maxlen=RING_SIZE)  # (name, start, duration, thread name)
+totals = {}  # name -> [calls, own time, total time, {parent: [calls, own time, total time]}]
+_lock = threading.Lock()
+_local = threading.local()
+_epoch = perf_counter()
+
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+
+def reset():
+    with _lock:
+        ring.clear()
+        totals.clear()
+
+
+# ------------------ Spans ------------------
+def _enter(name):
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    # [name, start, time spent in nested spans]
+    stack.append([name, perf_counter(), 0.0])
+
+
+def _exit():
+    end = perf_counter()
+    stack = _local.stack
+    name, start, nested = stack.pop()
+    duration = end - start
+    parent = None
+    if stack:
+        stack[-1][2] += duration
+        parent = stack[-1][0]
+    own = duration - nested
+    ring.append((name, start, duration, threading.current_thread().name))
+    with _lock:
+        entry = totals.get(name)
+        if entry is None:
+            entry = totals[name] = [0, 0.0, 0.0, {}]
+        entry[0] += 1
+        entry[1] += own
+        entry[2] += duration
+        caller = entry[3].setdefault(parent, [0, 0.0, 0.0])
+        caller[0] += 1
+        caller[1] += own
+        caller[2] += duration
+
+
+def timed(name):
+    """Decorator: record every call of the function as span `name` while recording is on."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            _enter(name)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _exit()
+        return wrapper
+    return decorate
+
+
+class _Span:
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        _enter(self.name)
+
+    def __exit__(self, *exc):
+        _exit()
+
+
+_NO_SPAN = nullcontext()
+
+
+def span(name):
+    """Context manager recording the block as span `name` while recording is on."""
+    return _Span(name) if enabled else _NO_SPAN
+
+
+# ------------------ Reports ------------------
+def _percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def stats():
+    """{name: {"calls", "p50", "p90", "p99", "max", "mean"}}, latencies in ms over the ring buffer.
+
+    "calls" counts every call since the last reset, not only those still in the ring.
+    """
+    durations = {}
+    for name, _, duration, _ in list(ring):
+        durations.setdefault(name, []).append(duration)
+    with _lock:
+        calls = {name: entry[0] for name, entry in totals.items()}
+    result = {}
+    for name, values in durations.items():
+        values.sort()
+        result[name] = {"calls": calls.get(name, len(values)), "max": values[-1] * 1000,
+                        "mean": sum(values) / len(values) * 1000}
+        for p in PERCENTILES:
+            result[name][f"p{p}"] = _percentile(values, p) * 1000
+    return result
+
+
+def export_json(path):
+    """Percentiles plus the spans in the ring as Chrome trace events (chrome://tracing, Perfetto)."""
+    events = [{"name": name, "ph": "X", "ts": (start - _epoch) * 1e6, "dur": duration * 1e6,
+               "pid": os.getpid(), "tid": thread} for name, start, duration, thread in list(ring)]
+    with open(path, 'w') as f:
+        json.dump({"stats": stats(), "traceEvents": events}, f, indent=1)
+
+
+def _function(name):
+    # pstats wants (file, line, function); the part before the last dot plays the file
+    module, _, function = name.rpartition(".")
+    return module or "~", 0, function
+
+
+def export_profile(path):
+    """Span totals in the pstats format written by cProfile."""
+    with _lock:
+        snapshot = {name: (entry[0], entry[1], entry[2], dict(entry[3])) for name, entry in totals.items()}
+    profile = {}
+    for name, (calls, own, total, callers) in snapshot.items():
+        profile[_function(name)] = (calls, calls, own, total,
+                                    {_function(parent): tuple([c[0], c[0], c[1], c[2]])
+                                     for parent, c in callers.items() if parent is not None})
+    with open(path, 'wb') as f:
+        marshal.dump(profile, f)
+
+
+def export(path):
+    """JSON for a .json path, pstats otherwise."""
+    if path.lower().endswith(".json"):
+        export_json(path)
+    else:
+        export_profile(path)
+
+
+_output = os.environ.get(ENV_VAR)
+if _output:
+    enable()
+    atexit.register(export, _output)
@@ -0,0 +1,259 @@
+"""Render the Analytics charts of ledgers to PNG or SVG files, without a display.
+
+For every month with expenses, and for the whole ledger, this writes the
+category chart (bar and pie) and the spending trend the Analytics window
+shows, drawn by the same charts.py functions:
+
+    <output>/<ledger>/2024-12-categories.png
+    <output>/<ledger>/2024-12-trend.png
+    <output>/<ledger>/all-categories.png
+    <output>/<ledger>/all-trend.png
+
+The parent process reads each ledger once, without writing to it, and
+computes every chart's data with numpy. Charts are drawn by a pool of worker processes on the Agg
+backend; each worker builds one figure per kind of chart and redraws it for
+every job instead of building a new figure each time. A hash of each
+chart's data is kept in <output>/render-manifest.json, and charts whose data
+hasn't changed since they were last written are skipped, so re-rendering a
+year of reports after a day's expenses only draws that month and the totals.
+
+Usage:
+    python render.py expenses [more ledgers] [--output charts] [--format png|svg]
+                     [--months 2024-11,2024-12] [--jobs N] [--force]
+"""
+import hashlib, json, os, sys, time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from dates import date_ordinal, month_label, month_range, ordinal_month
+from storage import atomic_write, ledger_path, read_ledger, to_paise
+
+MANIFEST = "render-manifest.json"
+FIGSIZE = (12, 5)
+DPI = 100
+# Bump when the charts change, so everything is drawn again
+RENDER_VERSION = 1
+
+
+# ------------------ Chart data ------------------
+def ledger_name(path):
+    return os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+
+
+def ledger_folders(paths):
+    """-> {path: folder its charts go in, under the output}.
+
+    Raises ValueError for two ledgers of the same name, e.g. a/expenses.csv
+    and b/expenses.db: their charts and manifest entries would overwrite
+    each other's.
+    """
+    folders, owners = {}, {}
+    for path in paths:
+        name = ledger_name(path)
+        if name in owners:
+            raise ValueError(f"{owners[name]} and {path} would both be drawn into {name}/, "
+                             f"render them to separate outputs")
+        owners[name] = path
+        folders[path] = name
+    return folders
+
+
+def ledger_columns(path):
+    """-> (ordinals, codes, paise, category names) of a ledger's records, as numpy arrays.
+
+    The ledger is only read: a Ledger would recover or compact its files on load.
+    """
+    import numpy as np
+
+    ordinals, codes, paise = array('i'), array('H'), array('q')
+    names = {}
+    for rid, day, category, amount in read_ledger(path):
+        try:
+            ordinals.append(date_ordinal(day))
+            paise.append(to_paise(amount))
+        except ValueError as e:
+            raise ValueError(f"{path}: record {rid}: {e}") from None
+        codes.append(names.setdefault(category, len(names)))
+    return (np.frombuffer(ordinals, dtype=np.int32), np.frombuffer(codes, dtype=np.uint16),
+            np.frombuffer(paise, dtype=np.int64), list(names))
+
+
+def _categories(names, codes, paise):
+    """Categories with records, sorted as in the Analytics window, and rupees spent on each."""
+    import numpy as np
+
+    counts = np.bincount(codes, minlength=len(names))
+    sums = np.bincount(codes, weights=paise, minlength=len(names))
+    used = sorted((names[code], code) for code in np.flatnonzero(counts))
+    return [name for name, _ in used], [float(sums[code]) / 100 for _, code in used]
+
+
+def ledger_jobs(path, months=None):
+    """-> [(file name without extension, kind, title, data)] of one ledger's charts.
+
+    `months` limits the monthly charts to those YYYY-MM; the totals are always drawn.
+    """
+    import numpy as np
+    from trends import series
+
+    ordinals, codes, paise, names = ledger_columns(path)
+    if not len(ordinals):
+        return []
+
+    # Sorted by date, each month is one slice of the columns
+    order = np.argsort(ordinals, kind="stable")
+    ordinals, codes, paise = ordinals[order], codes[order], paise[order]
+    present = sorted({ordinal_month(int(day)) for day in np.unique(ordinals)})
+    if months is not None:
+        present = [month for month in present if month in months]
+
+    jobs = []
+    for month in present:
+        lo, hi = np.searchsorted(ordinals, month_range(month))
+        title = month_label(month)
+        jobs.append((f"{month}-categories", "categories", title, _categories(names, codes[lo:hi], paise[lo:hi])))
+        jobs.append((f"{month}-trend", "trend", title, ("Daily",) + series(ordinals[lo:hi], paise[lo:hi], "Daily")))
+    title = f"{ledger_name(path)}, {month_label(ordinal_month(int(ordinals[0])))} to " \
+            f"{month_label(ordinal_month(int(ordinals[-1])))}"
+    jobs.append(("all-categories", "categories", title, _categories(names, codes, paise)))
+    jobs.append(("all-trend", "trend", title, ("Monthly",) + series(ordinals, paise, "Monthly")))
+    return jobs
+
+
+def digest(kind, fmt, title, data):
+    """Hash of everything that goes into a chart file."""
+    h = hashlib.sha256(json.dumps([RENDER_VERSION, kind, fmt, DPI, FIGSIZE, title]).encode())
+    if kind == "categories":
+        h.update(json.dumps(data).encode())
+    else:
+        resolution, starts, spent, average = data
+        h.update(resolution.encode())
+        for column in (starts, spent, average):
+            h.update(column.tobytes())
+    return h.hexdigest()
+
+
+# ------------------ Workers ------------------
+# Each worker's figures, by kind of chart, drawn over for every job
+_figures = {}
+
+
+def _figure(kind):
+    fig = _figures.get(kind)
+    if fig is None:
+        # Agg needs no display; the figure is never shown, only saved
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        from charts import BACKGROUND
+
+        fig = _figures[kind] = Figure(figsize=FIGSIZE, dpi=DPI)
+        FigureCanvasAgg(fig)
+        fig.patch.set_facecolor(BACKGROUND)
+        if kind == "categories":
+            fig.subplots(1, 2)
+        else:
+            fig.subplots()
+    return fig
+
+
+def render_chart(path, kind, fmt, title, data):
+    """Draw one chart and save it to path, replacing any older file in one step."""
+    from charts import draw_categories, draw_trend
+
+    fig = _figure(kind)
+    if kind == "categories":
+        draw_categories(fig, *data, title=title)
+    else:
+        draw_trend(fig, *data, title=title)
+    tmp = path + ".tmp"
+    fig.savefig(tmp, format=fmt, facecolor=fig.get_facecolor())
+    os.replace(tmp, path)
+    return path
+
+
+# ------------------ Rendering ------------------
+def load_manifest(output):
+    try:
+        with open(os.path.join(output, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def render(paths, output, fmt="png", months=None, jobs=None, force=False):
+    """Render the charts of every ledger; returns (charts rendered, charts skipped, failures).
+
+    Failures are (file, error message) pairs; the charts that were rendered
+    are recorded in the manifest either way. Raises ValueError for ledgers
+    that share a name (see ledger_folders).
+    """
+    folders = ledger_folders(paths)
+    manifest = {} if force else load_manifest(output)
+    pending, skipped = [], 0
+    for path in paths:
+        folder = os.path.join(output, folders[path])
+        os.makedirs(folder, exist_ok=True)
+        for name, kind, title, data in ledger_jobs(path, months):
+            target = os.path.join(folder, f"{name}.{fmt}")
+            key = os.path.relpath(target, output)
+            stamp = digest(kind, fmt, title, data)
+            if manifest.get(key) == stamp and os.path.exists(target):
+                skipped += 1
+            else:
+                pending.append((key, stamp, (target, kind, fmt, title, data)))
+
+    done, failures = 0, []
+    if pending:
+        try:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                futures = {pool.submit(render_chart, *job): (key, stamp) for key, stamp, job in pending}
+                for future in as_completed(futures):
+                    key, stamp = futures[future]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        failures.append((key, str(e)))
+                        manifest.pop(key, None)
+                    else:
+                        manifest[key] = stamp
+                        done += 1
+        finally:
+            atomic_write(os.path.join(output, MANIFEST),
+                         lambda f: json.dump(manifest, f, indent=1, sort_keys=True))
+    return done, skipped, failures
+
+
+# ------------------ Command line ------------------
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render the Analytics charts of ledgers to image files")
+    parser.add_argument("paths", nargs="+", help="ledgers: directories, .csv or .db files")
+    parser.add_argument("--output", default="charts", help="directory to write the charts to")
+    parser.add_argument("--format", choices=("png", "svg"), default="png")
+    parser.add_argument("--months", help="comma separated YYYY-MM to draw (default: every month with expenses)")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="draw every chart, even unchanged ones")
+    args = parser.parse_args(argv)
+    # Report them all at once, rather than fail on the first; a name without an
+    # extension may still be the expenses.csv it is migrated from
+    missing = [path for path in args.paths
+               if not path.startswith("http://") and not os.path.exists(ledger_path(path))]
+    if missing:
+        parser.error(f"no such ledger: {', '.join(missing)}")
+    try:
+        ledger_folders(args.paths)
+    except ValueError as e:
+        parser.error(str(e))
+
+    months = set(args.months.split(",")) if args.months else None
+    start = time.perf_counter()
+    done, skipped, failures = render(args.paths, args.output, args.format, months, args.jobs, args.force)
+    for key, error in failures:
+        print(f"Failed to render {key}: {error}", file=sys.stderr)
+    print(f"Rendered {done} charts, skipped {skipped} unchanged, in {time.perf_counter() - start:.2f}s")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
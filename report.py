@@ -0,0 +1,298 @@
+"""Combined summary of many ledgers, computed in a process pool.
+
+Each CSV ledger is split into byte ranges of about CHUNK_BYTES that start on
+a row boundary, and every range is summarized by a worker process into a
+partial: amount in paise and record count per (date, category). Amounts are
+integers from there on, so partials merge exactly in any order and the
+totals, per-category and per-month figures all come out of the merged
+partials. SQLite ledgers are summarized by one query each, and the sealed
+months of a partitioned ledger (see storage.PartitionedStorage) by their
+precomputed summaries, without reading their rows.
+
+Deleted records are tombstone rows that may sit in a later range than the
+record itself. The first pass reports where each tombstone is; files that
+have any get a second pass that sums the deleted records, which is then
+subtracted.
+
+Usage:
+    python report.py ledgers/ 2024/alice.csv 2024/bob.csv [--format csv] [--output summary.csv]
+"""
+import csv, io, os, sqlite3, sys
+from concurrent.futures import ProcessPoolExecutor
+
+from dates import month_of, month_range, ordinal_date
+from storage import HEADER, TOMBSTONE, parse_id, read_summary, to_paise
+
+CHUNK_BYTES = 32 * 1024 * 1024
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+# Served from the covering index storage.SCHEMA creates for it
+SQLITE_SUMMARY = ("SELECT day, category, SUM(CAST(ROUND(amount * 100) AS INTEGER)), COUNT(*) "
+                  "FROM expenses GROUP BY day, category")
+
+
+# ------------------ Partials ------------------
+def _merge(into, partial):
+    """Add one partial, {(date, category): [paise, count]}, to another."""
+    for key, (paise, count) in partial.items():
+        if key in into:
+            into[key][0] += paise
+            into[key][1] += count
+        else:
+            into[key] = [paise, count]
+    return into
+
+
+def _rows(path, start, end):
+    """Parsed CSV rows of the byte range.
+
+    Both passes number rows by their place in this reader, not by line: a
+    quoted line break makes one row span two lines.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return csv.reader(io.StringIO(data.decode("utf-8"), newline=''))
+
+
+def _summarize_chunk(path, start, end, legacy):
+    """-> (partial of every record in the range, [(tombstoned ID, row number)]).
+
+    The header row fails the amount check like any other malformed row.
+    """
+    partial, tombstones = {}, []
+    for line, row in enumerate(_rows(path, start, end)):
+        if row[:1] == [TOMBSTONE]:
+            try:
+                tombstones.append((parse_id(row[3]), line))
+            except (ValueError, IndexError):
+                pass
+            continue
+        if len(row) < 3:
+            continue
+        try:
+            paise = to_paise(float(row[2]))
+            if not legacy:
+                parse_id(row[3])
+        except (ValueError, IndexError):
+            continue
+        key = (row[0], row[1])
+        if key in partial:
+            entry = partial[key]
+            entry[0] += paise
+            entry[1] += 1
+        else:
+            partial[key] = [paise, 1]
+    return partial, tombstones
+
+
+def _summarize_deleted(path, start, end, chunk, deleted):
+    """Partial of the records in the range whose ID is tombstoned later in the file.
+
+    `deleted` maps an ID to the (chunk, row number) of its last tombstone.
+    """
+    partial = {}
+    for line, row in enumerate(_rows(path, start, end)):
+        if len(row) < 4 or row[0] == TOMBSTONE:
+            continue
+        try:
+            rid = parse_id(row[3])
+            tombstone = deleted.get(rid)
+            if tombstone is None or tombstone < (chunk, line):
+                continue
+            paise = to_paise(float(row[2]))
+        except ValueError:
+            continue
+        _merge(partial, {(row[0], row[1]): [paise, 1]})
+    return partial
+
+
+def _summarize_sqlite(path):
+    # As in storage.read_ledger: a name may hold characters a URI gives meaning to
+    from urllib.request import pathname2url
+
+    connection = sqlite3.connect("file:" + pathname2url(os.path.abspath(path)) + "?mode=ro", uri=True)
+    try:
+        rows = connection.execute(SQLITE_SUMMARY).fetchall()
+    finally:
+        connection.close()
+    return {(ordinal_date(day), category): [paise, count] for day, category, paise, count in rows}
+
+
+# ------------------ Planning ------------------
+def ledger_files(paths):
+    """Expand directories into the ledgers they contain, in a stable order."""
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        for folder, _, names in sorted(os.walk(path)):
+            files.extend(os.path.join(folder, name) for name in sorted(names)
+                         if name.lower().endswith((".csv",) + SQLITE_EXTENSIONS))
+    return files
+
+
+def _header(path):
+    with open(path, 'r', newline='') as f:
+        return next(csv.reader(f), None)
+
+
+def _chunks(path, chunk_bytes):
+    """Byte ranges of about chunk_bytes, each starting at the beginning of a row.
+
+    A line break only ends a row outside quotes, that is after an even number
+    of quote characters: a quote inside a field is written doubled.
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+    quotes = 0
+    with open(path, 'rb') as f:
+        while bounds[-1] + chunk_bytes < size:
+            quotes += f.read(chunk_bytes).count(b'"')
+            line = f.readline()
+            quotes += line.count(b'"')
+            while quotes % 2 and line:
+                line = f.readline()
+                quotes += line.count(b'"')
+            if f.tell() >= size:
+                break
+            bounds.append(f.tell())
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+# ------------------ Report ------------------
+def report(paths, jobs=None, chunk_bytes=CHUNK_BYTES):
+    """Summarize the ledgers in `paths` (files or directories).
+
+    Returns {"ledgers": {path: [paise, count]}, "categories": {...}, "months": {...},
+    "total": paise, "count": n} with every amount in integer paise. Files that
+    aren't ledgers are skipped and listed under "skipped".
+    """
+    files, skipped, partials = [], [], {}
+    reported = ledger_files(paths)
+    for path in reported:
+        sealed = read_summary(path)
+        if sealed is not None:
+            # Sums per category for the whole month; the first day stands in for the date
+            day = ordinal_date(month_range(sealed["month"])[0])
+            partials[path] = {(day, category): list(entry) for category, entry in sealed["categories"].items()}
+            continue
+        if path.lower().endswith(SQLITE_EXTENSIONS):
+            files.append((path, None))
+            continue
+        header = _header(path)
+        if header is None or header[:3] != HEADER[:3]:
+            skipped.append(path)
+            continue
+        files.append((path, "ID" not in header))
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        # First pass: every range of every file at once
+        pending, ranges = {}, {}
+        for path, legacy in files:
+            if legacy is None:
+                pending[path] = [pool.submit(_summarize_sqlite, path)]
+            else:
+                ranges[path] = _chunks(path, chunk_bytes)
+                pending[path] = [pool.submit(_summarize_chunk, path, start, end, legacy)
+                                 for start, end in ranges[path]]
+
+        second = {}
+        for path, legacy in files:
+            partial, deleted = {}, {}
+            for chunk, future in enumerate(pending[path]):
+                result = future.result()
+                if legacy is None:
+                    _merge(partial, result)
+                    continue
+                _merge(partial, result[0])
+                for rid, line in result[1]:
+                    deleted[rid] = max(deleted.get(rid, (chunk, line)), (chunk, line))
+            partials[path] = partial
+            if deleted:
+                second[path] = [pool.submit(_summarize_deleted, path, start, end, chunk, deleted)
+                                for chunk, (start, end) in enumerate(ranges[path])]
+
+        # Second pass: take the deleted records back out
+        for path, futures in second.items():
+            for future in futures:
+                for key, (paise, count) in future.result().items():
+                    entry = partials[path][key]
+                    entry[0] -= paise
+                    entry[1] -= count
+                    if not entry[1]:
+                        del partials[path][key]
+
+    summary = {"ledgers": {}, "categories": {}, "months": {}, "total": 0, "count": 0, "skipped": skipped}
+    for path in reported:
+        if path not in partials:
+            continue
+        partial = partials[path]
+        file_total = [0, 0]
+        for (date, category), (paise, count) in partial.items():
+            for group, key in (("categories", category), ("months", month_of(date))):
+                entry = summary[group].setdefault(key, [0, 0])
+                entry[0] += paise
+                entry[1] += count
+            file_total[0] += paise
+            file_total[1] += count
+        summary["ledgers"][path] = file_total
+        summary["total"] += file_total[0]
+        summary["count"] += file_total[1]
+    return summary
+
+
+def rupees(paise):
+    """Integer paise -> exact decimal string, e.g. 123456 -> 1234.56."""
+    sign = "-" if paise < 0 else ""
+    return f"{sign}{abs(paise) // 100}.{abs(paise) % 100:02d}"
+
+
+def write_json(summary, out):
+    import json
+
+    def groups(name):
+        return {key: {"total": float(rupees(paise)), "count": count}
+                for key, (paise, count) in sorted(summary[name].items())}
+
+    json.dump({"total": float(rupees(summary["total"])), "count": summary["count"],
+               "categories": groups("categories"), "months": groups("months"),
+               "ledgers": groups("ledgers"), "skipped": summary["skipped"]}, out, indent=2)
+    out.write("\n")
+
+
+def write_csv(summary, out):
+    writer = csv.writer(out)
+    writer.writerow(["Scope", "Key", "Total", "Count"])
+    writer.writerow(["all", "", rupees(summary["total"]), summary["count"]])
+    for scope, name in (("category", "categories"), ("month", "months"), ("ledger", "ledgers")):
+        for key, (paise, count) in sorted(summary[name].items()):
+            writer.writerow([scope, key, rupees(paise), count])
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Combined summary of many expense ledgers")
+    parser.add_argument("paths", nargs="+", help="ledger files (.csv or .db) or directories holding them")
+    parser.add_argument("--format", choices=("json", "csv"), default="json")
+    parser.add_argument("--output", help="file to write to (default: standard output)")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--chunk-mb", type=float, default=CHUNK_BYTES / 2**20,
+                        help="size of the pieces a CSV ledger is split into")
+    args = parser.parse_args(argv)
+
+    summary = report(args.paths, args.jobs, int(args.chunk_mb * 2**20))
+    for path in summary["skipped"]:
+        print(f"Skipped {path}: not a ledger", file=sys.stderr)
+    write = write_json if args.format == "json" else write_csv
+    if args.output:
+        with open(args.output, 'w', newline='') as out:
+            write(summary, out)
+    else:
+        write(summary, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
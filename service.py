@@ -0,0 +1,412 @@
+"""Local HTTP/JSON service that owns a ledger, so several programs can share it.
+
+One process keeps the Ledger in memory and is the only one writing its
+storage. The GUI (python expense_tracker.py http://127.0.0.1:8765), scripts
+and anything else that speaks HTTP go through it instead of appending to the
+files themselves. Queries and aggregates are answered from memory.
+
+Writes from all connections are queued, and a single writer task takes
+whatever has queued up as one batch: it applies the batch to the ledger,
+then writes it to storage with one append and one fsync on the I/O thread,
+and only then answers the requests in it. The next batch gathers while one
+is being committed, so under load one fsync covers many writes.
+
+Every add and delete gets a sequence number in a change log. Clients that
+keep a copy of the ledger (ServiceStorage, which the GUI uses) poll it for
+what other clients changed.
+
+Endpoints, all JSON:
+    GET    /expenses?category=&text=&start=&end=&min=&max=   matching records
+    POST   /expenses        {"date", "category", "amount"[, "id"]} or a list of them -> {"ids"}
+    DELETE /expenses/<id>
+    DELETE /expenses        removes every record
+    GET    /summary         total, count, sums and counts per category and month
+    GET    /changes?since=<seq>&run=<run>
+
+Dates are DD-MM-YYYY or YYYY-MM-DD, start and end are inclusive.
+
+Usage:
+    python service.py expenses [--host 127.0.0.1] [--port 8765]
+"""
+import asyncio, http.client, json, os
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from dates import DATE_FORMAT, INPUT_FORMATS, date_ordinal, normalize_date
+from ledger import Filter, Ledger
+from storage import Storage, open_storage, to_paise
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DATE_FORMATS = (DATE_FORMAT,) + INPUT_FORMATS
+MAX_BODY = 64 * 1024 * 1024
+# Changes kept for GET /changes; a client further behind loads the ledger again
+CHANGE_LOG = 100000
+TIMEOUT = 30
+
+
+def parse_expense(item):
+    """One expense of a POST body -> ((date, category, amount), requested ID or None)."""
+    if not isinstance(item, dict):
+        raise ValueError("an expense is an object with date, category and amount")
+    date = normalize_date(str(item.get("date", "")).strip(), DATE_FORMATS)
+    category = item.get("category")
+    if not isinstance(category, str) or not category.strip():
+        raise ValueError("missing category")
+    amount = item.get("amount")
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+        raise ValueError(f"invalid amount {amount!r}")
+    # NaN, infinity and amounts too large to store
+    to_paise(amount)
+    rid = item.get("id")
+    if rid is not None and (isinstance(rid, bool) or not isinstance(rid, int)):
+        raise ValueError(f"invalid id {rid!r}")
+    return (date, category.strip(), float(amount)), rid
+
+
+def parse_filter(query):
+    """Query string parameters of GET /expenses -> ledger.Filter."""
+    def value(name, parse):
+        values = query.get(name)
+        return None if not values else parse(values[0])
+
+    def ordinal(text):
+        return date_ordinal(normalize_date(text, DATE_FORMATS))
+
+    end = value("end", ordinal)
+    return Filter(category=value("category", str), start=value("start", ordinal),
+                  end=None if end is None else end + 1, min_amount=value("min", float),
+                  max_amount=value("max", float), text=value("text", str))
+
+
+def _response(status, payload, close):
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    head = (f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n" + ("Connection: close\r\n" if close else "") + "\r\n")
+    return head.encode('latin-1') + body
+
+
+class Service:
+    """The ledger at `path` behind an asyncio HTTP server; see the module docstring."""
+
+    def __init__(self, path):
+        self.storage = open_storage(path)
+        # Storage calls are collected per batch instead of being made right away
+        self.ledger = Ledger(path, storage=self.storage, submit=self._submit)
+        self.ledger.load(self.storage.load())
+        self.io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ledger-io")
+        # A new run token tells clients that sequence numbers started over
+        self.run = os.urandom(8).hex()
+        self.seq = 0
+        self.floor = 0  # clients behind this have to load again, the ledger was cleared or reloaded
+        self.log = []  # (seq, rid, record or None, client)
+        self.calls = []
+        self.queue = []
+        self.wake = asyncio.Event()
+
+    # ------------------ Writes ------------------
+    def _submit(self, method, *args):
+        self.calls.append((method, args))
+
+    async def _write(self, apply, client, *args):
+        future = asyncio.get_running_loop().create_future()
+        self.queue.append((apply, client, args, future))
+        self.wake.set()
+        return await future
+
+    async def _writer(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.wake.wait()
+            self.wake.clear()
+            batch, self.queue = self.queue, []
+            done = []
+            for apply, client, args, future in batch:
+                # Whatever one request runs into is its own answer; the writer has to outlive it
+                try:
+                    done.append((future, apply(client, *args), None))
+                except Exception as error:
+                    done.append((future, None, error))
+            calls, self.calls = self.calls, []
+            if calls:
+                try:
+                    await loop.run_in_executor(self.io, self._commit, calls)
+                except Exception as error:
+                    # The ledger is ahead of storage now, start over from what was stored
+                    done = [(future, None, error) for future, _, _ in done]
+                    self.ledger.load(await loop.run_in_executor(self.io, self.storage.load))
+                    self._reset()
+            for future, result, error in done:
+                if future.cancelled():
+                    continue  # the client went away
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+
+    def _commit(self, calls):
+        """Make one batch's storage calls on the I/O thread, adds merged into one append, then fsync."""
+        appends = []
+        for method, args in calls:
+            if method == self.storage.append_many:
+                appends.extend(args[0])
+                continue
+            if appends:
+                self.storage.append_many(appends)
+                appends = []
+            method(*args)
+        if appends:
+            self.storage.append_many(appends)
+        self.storage.sync()
+
+    def _log(self, rid, record, client):
+        self.seq += 1
+        self.log.append((self.seq, rid, record, client))
+        if len(self.log) > 2 * CHANGE_LOG:
+            del self.log[:-CHANGE_LOG]
+
+    def _reset(self):
+        self.seq += 1
+        self.floor = self.seq
+        self.log = []
+
+    def _add(self, client, records, ids):
+        ids = self.ledger.add_many(records, ids)
+        for rid in ids:
+            self._log(rid, [rid, *self.ledger.get(rid)], client)
+        return {"ids": ids, "seq": self.seq, "run": self.run}
+
+    def _delete(self, client, rid):
+        self.ledger.delete(rid)
+        self._log(rid, None, client)
+        return {"seq": self.seq, "run": self.run}
+
+    def _clear(self, client):
+        self.ledger.clear()
+        self._reset()
+        return {"seq": self.seq, "run": self.run}
+
+    # ------------------ Reads ------------------
+    def expenses(self, where):
+        ledger = self.ledger
+        rids = ledger.query(where) if where.active() else ledger.ids()
+        return {"seq": self.seq, "run": self.run, "count": len(rids), "total": ledger.paise_of(rids) / 100,
+                "records": [[rid, *ledger.get(rid)] for rid in rids]}
+
+    def summary(self):
+        ledger = self.ledger
+        counts = ledger.category_counts()
+        return {"seq": self.seq, "run": self.run, "total": ledger.total(), "count": len(ledger),
+                "categories": {name: [total, counts[name]] for name, total in ledger.category_sums().items()},
+                "months": {month: [ledger.month_total(month), ledger.month_count(month)]
+                           for month in ledger.months()}}
+
+    def changes(self, since, run, client):
+        """Changes after `since` made by other clients, or {"reload": true} if they aren't all kept."""
+        first = self.log[0][0] if self.log else self.seq + 1
+        if run != self.run or since < self.floor or since < first - 1 or since > self.seq:
+            return {"reload": True, "seq": self.seq, "run": self.run}
+        changes = [[rid, record] for _, rid, record, origin in self.log[since - first + 1:] if origin != client]
+        return {"seq": self.seq, "run": self.run, "changes": changes}
+
+    # ------------------ HTTP ------------------
+    async def _dispatch(self, method, target, body, client):
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        parts = url.path.strip("/").split("/")
+        if parts[0] == "expenses" and len(parts) == 1:
+            if method == "GET":
+                return self.expenses(parse_filter(query))
+            if method == "POST":
+                items = json.loads(body or b"null")
+                parsed = [parse_expense(item) for item in (items if isinstance(items, list) else [items])]
+                return await self._write(self._add, client, [record for record, _ in parsed],
+                                         [rid for _, rid in parsed])
+            if method == "DELETE":
+                return await self._write(self._clear, client)
+        elif parts[0] == "expenses" and len(parts) == 2 and method == "DELETE":
+            try:
+                rid = int(parts[1])
+            except ValueError:
+                raise KeyError(parts[1]) from None
+            return await self._write(self._delete, client, rid)
+        elif parts == ["summary"] and method == "GET":
+            return self.summary()
+        elif parts == ["changes"] and method == "GET":
+            return self.changes(int(query.get("since", ["0"])[0]), query.get("run", [None])[0], client)
+        raise LookupError(f"no {method} {url.path}")
+
+    async def _connection(self, reader, writer):
+        """Serve one client's requests, keeping the connection open between them."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, target, version = line.decode('latin-1').split()
+                except ValueError:
+                    writer.write(_response(HTTPStatus.BAD_REQUEST, {"error": "malformed request line"}, True))
+                    break
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header.decode('latin-1').partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY:
+                    writer.write(_response(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "body too large"}, True))
+                    break
+                body = await reader.readexactly(length)
+                close = version == "HTTP/1.0" or headers.get("connection", "").lower() == "close"
+                try:
+                    status, payload = HTTPStatus.OK, await self._dispatch(method, target, body,
+                                                                          headers.get("x-client"))
+                except KeyError as error:
+                    status, payload = HTTPStatus.NOT_FOUND, {"error": f"no record {error.args[0]}"}
+                except LookupError as error:
+                    status, payload = HTTPStatus.NOT_FOUND, {"error": str(error)}
+                except ValueError as error:
+                    status, payload = HTTPStatus.BAD_REQUEST, {"error": str(error)}
+                except Exception as error:
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(error)}
+                writer.write(_response(status, payload, close))
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Serve until cancelled; port 0 picks a free one, printed on startup."""
+        writer = asyncio.create_task(self._writer())
+        server = await asyncio.start_server(self._connection, host, port)
+        host, port = server.sockets[0].getsockname()[:2]
+        print(f"Serving {self.ledger.path} on http://{host}:{port}", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            writer.cancel()
+
+    def close(self):
+        # Lets a commit that is under way finish first
+        self.io.shutdown(wait=True)
+        self.storage.close()
+
+
+# ------------------ Client ------------------
+class ServiceStorage(Storage):
+    """A running service as the storage of a Ledger, which then mirrors the service's ledger.
+
+    Writes are sent as they happen, with the IDs the Ledger picked, and
+    read_tail() returns what other clients changed since. When the service
+    had to give one of our records another ID, because another client took
+    it first, deletes are translated to the new ID and read_tail() asks for
+    a load(), which brings the mirror back in step.
+    """
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.url = url
+        self.address = parts.hostname or DEFAULT_HOST, parts.port or DEFAULT_PORT
+        self.client = os.urandom(8).hex()
+        self._connection = None
+        self._run = None
+        self._seq = 0
+        self._renamed = {}
+        self._stale = False
+
+    def _request(self, method, path, payload=None):
+        body = None if payload is None else json.dumps(payload).encode()
+        headers = {"Content-Type": "application/json", "X-Client": self.client}
+        for retry in (False, True):
+            if self._connection is None:
+                self._connection = http.client.HTTPConnection(*self.address, timeout=TIMEOUT)
+            try:
+                self._connection.request(method, path, body, headers)
+                response = self._connection.getresponse()
+                reply = json.loads(response.read() or b"null")
+                break
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # A kept-alive connection the service dropped, e.g. after a restart
+                self._connection.close()
+                self._connection = None
+                if retry:
+                    raise
+        if response.status == HTTPStatus.NOT_FOUND:
+            raise KeyError(reply["error"])
+        if response.status != HTTPStatus.OK:
+            raise OSError(f"{self.url}: {reply['error']}")
+        return reply
+
+    def load(self):
+        reply = self._request("GET", "/expenses")
+        self._run, self._seq = reply["run"], reply["seq"]
+        self._renamed, self._stale = {}, False
+        return [tuple(record) for record in reply["records"]]
+
+    def append_many(self, records):
+        reply = self._request("POST", "/expenses", [{"id": rid, "date": date, "category": category, "amount": amount}
+                                                    for rid, date, category, amount in records])
+        for (rid, _, _, _), given in zip(records, reply["ids"]):
+            if given != rid:
+                self._renamed[rid] = given
+                self._stale = True
+
+    def delete(self, rid):
+        try:
+            self._request("DELETE", f"/expenses/{self._renamed.get(rid, rid)}")
+        except KeyError:
+            pass  # another client deleted it first
+
+    def rewrite(self, records):
+        """Replace everything on the service, other clients' records included."""
+        reply = self._request("DELETE", "/expenses")
+        self._run, self._seq = reply["run"], reply["seq"]
+        self._renamed, self._stale = {}, False
+        if records:
+            self.append_many(records)
+
+    def read_tail(self):
+        if self._stale:
+            return None
+        reply = self._request("GET", f"/changes?since={self._seq}&run={self._run}")
+        if reply.get("reload"):
+            return None
+        self._seq = reply["seq"]
+        return [(rid, None if record is None else tuple(record)) for rid, record in reply["changes"]]
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+# ------------------ Command line ------------------
+def main(argv=None):
+    # Only the command line needs argparse, keep it out of client startup
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a ledger to local clients over HTTP")
+    parser.add_argument("ledger", nargs="?", default="expenses", help="ledger directory, .csv or .db (default: expenses)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="0 picks a free port")
+    args = parser.parse_args(argv)
+
+    service = Service(args.ledger)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
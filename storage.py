@@ -0,0 +1,1159 @@
+"""Storage backends for the ledger.
+
+A backend persists records and hands them back on load; the Ledger keeps
+everything else in memory. CsvStorage is the plain expenses.csv file,
+PartitionedStorage a directory of them, one per month, and SqliteStorage
+keeps the same records in an indexed SQLite database.
+
+Every full rewrite goes to a temp file that is fsynced and renamed over the
+original, so a crash leaves either the old file or the new one.
+
+Other programs may add to the same ledger while it is open: read_tail()
+returns what they changed since the last call, or None when the ledger has
+to be loaded again. Instances of the app take an exclusive lock on
+<ledger>.lock around every write, and a record whose ID another instance
+used first is stored under a new one (see claim_ids()).
+
+Usage:
+    python storage.py migrate expenses.csv expenses.db
+"""
+import csv, io, json, os, re, shutil, sqlite3, threading, time
+from array import array
+from contextlib import contextmanager
+from itertools import chain
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from dates import current_month, date_ordinal, month_of, ordinal_date
+from perf import timed
+
+HEADER = ["Date", "Category", "Amount", "ID"]
+HEADER_LINE = ",".join(HEADER).encode() + b"\r\n"
+# A deleted record is an appended row: TOMBSTONE,,,<id>
+TOMBSTONE = "#deleted"
+# Rewrite the file once tombstones make up this share of its rows
+COMPACT_RATIO = 0.3
+COMPACT_MIN_TOMBSTONES = 16
+# Group commit: appends are fsynced at most this long after they are written,
+# or straight away for a batch of at least COMMIT_BATCH rows
+COMMIT_WINDOW = 0.5
+COMMIT_BATCH = 1000
+# A temp file nobody wrote to for this many seconds is left over from a crash;
+# a younger one may belong to another instance that is still writing it
+LEFTOVER_AGE = 60
+# Amounts are kept as int64 paise; the largest one accepted, in rupees, either way
+MAX_AMOUNT = 9 * 10 ** 16
+# IDs index the Ledger's columns and share an int64 with a date in its date index
+MAX_ID = (1 << 32) - 1
+
+
+def sync_directory(path):
+    """fsync the directory holding `path` so a rename into it survives a crash."""
+    if os.name != "posix":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, write, tmp=None):
+    """Replace `path` with what write(f) puts in a fresh text file -> ((device, inode), size) of it."""
+    tmp = tmp or path + ".tmp"
+    with open(tmp, 'w', newline='', encoding='utf-8') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+        stat = os.fstat(f.fileno())
+    os.replace(tmp, path)
+    sync_directory(path)
+    # From the written file: another instance may replace `path` again right away
+    return (stat.st_dev, stat.st_ino), stat.st_size
+
+
+_held = threading.local()
+
+
+@contextmanager
+def file_lock(path, wait=True):
+    """Hold an exclusive lock on the file at `path`, created if need be, against other processes and threads.
+
+    Yields True, or False without the lock when `wait` is false and it is
+    taken. A thread that already holds it passes straight through.
+    """
+    held = getattr(_held, "paths", None)
+    if held is None:
+        held = _held.paths = set()
+    if path in held:
+        yield True
+        return
+    with open(path, 'a+b') as f:
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if wait else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            if wait:
+                raise
+            yield False
+            return
+        held.add(path)
+        try:
+            yield True
+        finally:
+            held.discard(path)
+            if fcntl is None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def claim_ids(records, taken, renamed, stored_top):
+    """The records to append, those whose ID is in `taken` moved to new IDs.
+
+    Each instance picks IDs on its own, so two may pick the same one; the
+    one that writes second sees the other's row and moves its record past
+    every ID in use. `renamed` maps our ID to the one written and is
+    updated; its IDs count as taken too. stored_top() is the highest ID in
+    storage, only asked for when an ID has to move.
+    """
+    taken = taken | set(renamed.values())
+    if not any(record[0] in taken for record in records):
+        return records
+    next_id = max(max(taken), max(record[0] for record in records), stored_top()) + 1
+    claimed = []
+    for record in records:
+        if record[0] in taken:
+            renamed[record[0]] = next_id
+            record = (next_id,) + tuple(record[1:])
+            next_id += 1
+        claimed.append(record)
+    return claimed
+
+
+def to_paise(amount):
+    """Rupees -> whole paise; ValueError for NaN, infinity and anything past MAX_AMOUNT."""
+    # NaN fails both comparisons
+    if not -MAX_AMOUNT <= amount <= MAX_AMOUNT:
+        raise ValueError(f"amount {amount!r} is not a finite number within ±{MAX_AMOUNT:.0e}")
+    return round(amount * 100)
+
+
+def parse_id(text):
+    """Text of an ID column -> int; ValueError unless it is within 0..MAX_ID."""
+    rid = int(text)
+    if not 0 <= rid <= MAX_ID:
+        raise ValueError(f"record ID {rid} is outside 0..{MAX_ID}")
+    return rid
+
+
+def open_storage(path):
+    """Pick the backend from the file extension; a directory or a name without one is partitioned.
+
+    An http:// URL is a ledger service (see service.py).
+    """
+    if path.startswith("http://"):
+        # Only clients of a service pay for importing it
+        from service import ServiceStorage
+        return ServiceStorage(path)
+    extension = os.path.splitext(path.rstrip("/\\"))[1].lower()
+    if extension in (".db", ".sqlite", ".sqlite3"):
+        return SqliteStorage(path)
+    if not extension or os.path.isdir(path):
+        return PartitionedStorage(path)
+    return CsvStorage(path)
+
+
+def ledger_path(path):
+    """The file or directory read_ledger() reads for `path`.
+
+    A name without an extension is a partition directory, or the .csv file
+    it is moved from once the ledger is first opened.
+    """
+    if not os.path.splitext(path.rstrip("/\\"))[1] and not os.path.isdir(path):
+        return path + ".csv"
+    return path
+
+
+def read_ledger(path):
+    """The live records of a ledger, as load() returns them, without writing to it.
+
+    Loading may recover, compact, migrate or seal files; tools that only
+    read a ledger, perhaps one another instance has open, use this instead.
+    """
+    if path.startswith("http://"):
+        storage = open_storage(path)
+        try:
+            return storage.load()
+        finally:
+            storage.close()
+    path = ledger_path(path)
+    extension = os.path.splitext(path.rstrip("/\\"))[1].lower()
+    if extension in (".db", ".sqlite", ".sqlite3"):
+        from urllib.request import pathname2url
+
+        uri = "file:" + pathname2url(os.path.abspath(path)) + "?mode=ro"
+        db = sqlite3.connect(uri, uri=True)
+        try:
+            return SqliteStorage._records(db)
+        finally:
+            db.close()
+    if os.path.isdir(path):
+        records = []
+        for name in sorted(os.listdir(path)):
+            if PARTITION.match(name):
+                records.extend(CsvStorage(os.path.join(path, name)).read())
+        records.sort()
+        return records
+    return CsvStorage(path).read()
+
+
+class Storage:
+    """Interface shared by the backends.
+
+    load() returns the live records as (id, date, category, amount) tuples in
+    insertion order. IDs are chosen by the Ledger and passed to append(); a
+    backend shared with other writers may store a record under another ID
+    when its own was taken meanwhile, and read_tail() then returns None so
+    the Ledger loads again. Calls may come from a worker thread, but never
+    from two threads at once.
+    """
+
+    def load(self):
+        raise NotImplementedError
+
+    def append(self, rid, date, category, amount):
+        self.append_many([(rid, date, category, amount)])
+
+    def append_many(self, records):
+        raise NotImplementedError
+
+    def delete(self, rid):
+        raise NotImplementedError
+
+    def rewrite(self, records):
+        """Replace everything stored with these records."""
+        raise NotImplementedError
+
+    def read_tail(self):
+        """Changes other programs made since load() or the last call.
+
+        -> [(rid, record)] in the order they were made, record being an
+        (id, date, category, amount) tuple, or None for a deletion; or None
+        when what changed can't be told and the caller has to load() again.
+        """
+        return []
+
+    def sync(self):
+        """Make the writes so far durable; backends that commit every write have nothing to do."""
+
+    def close(self):
+        pass
+
+
+# ------------------ CSV ------------------
+class CsvStorage(Storage):
+    """expenses.csv with an ID column, used as an append-only journal.
+
+    Adds append the record and deletes append a tombstone, so neither rewrites
+    the file; once tombstones pass COMPACT_RATIO the file is compacted in a
+    background thread and swapped in atomically. Appends go through one open
+    handle and are fsynced in groups (see COMMIT_WINDOW); load() replays the
+    journal after recovering from whatever a crash left behind.
+
+    The file may be shared with other instances or scripts that append to
+    it. The storage remembers the inode it read and how far, so read_tail()
+    parses only the rows appended since, skipping its own; a new inode (the
+    file was compacted or cleared elsewhere) or a shorter file means a full
+    load(). Each of our appends is a single write(2) at the end of the file,
+    so rows from different writers never interleave. Appends, loads,
+    rewrites and the swap of a compacted file all hold the lock file
+    (<path>.lock unless `lock` names another), so they don't race other
+    instances, and an append first checks the rows it hasn't returned from
+    read_tail() yet for IDs it is about to use. Scripts that don't take the
+    lock are on their own.
+    """
+
+    def __init__(self, path, lock=None):
+        self.path = path
+        self.lock = lock or path + ".lock"
+        self._live = 0
+        self._tombstones = 0
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._compactor = None
+        self._file = None
+        self._dirty = False
+        self._timer = None
+        # (device, inode) of the file read, how far into it, and our own
+        # appends past that point as (start, end) byte ranges
+        self._identity = None
+        self._offset = 0
+        self._own = []
+        # Set when the file was swapped while others' rows were unread
+        self._stale = False
+        # File size when read_tail() last found a row without a line ending
+        self._unterminated = None
+        # IDs of others' records read_tail() returned, which the Ledger may not
+        # have taken in yet, and our IDs that were taken (see claim_ids())
+        self._foreign = set()
+        self._renamed = {}
+
+    def _recover(self):
+        """Remove temp files of an interrupted rewrite and cut off a half-written last row.
+
+        We always write rows whole with a line ending, so a last row without
+        one was cut off mid-append, unless it holds a complete record: files
+        edited by hand or written by scripts often just lack the final line
+        ending, which is then added. Torn bytes are kept in <path>.torn.
+        """
+        for leftover in (self.path + ".tmp", self.path + ".compact"):
+            try:
+                if time.time() - os.stat(leftover).st_mtime > LEFTOVER_AGE:
+                    os.remove(leftover)
+            except FileNotFoundError:
+                pass
+        with open(self.path, 'rb+') as f:
+            end = f.seek(0, os.SEEK_END)
+            cut = end
+            while cut > 0:
+                start = max(0, cut - 4096)
+                f.seek(start)
+                newline = f.read(cut - start).rfind(b"\n")
+                if newline >= 0:
+                    cut = start + newline + 1
+                    break
+                cut = start
+            if cut == end:
+                return
+            f.seek(0)
+            header = f.readline()
+            f.seek(cut)
+            torn = f.read()
+            if cut == 0 or self._complete(torn, b"ID" not in header):
+                # The header, or a whole row: only the line ending is missing
+                f.write(b"\r\n")
+                f.flush()
+                os.fsync(f.fileno())
+                return
+            f.truncate(cut)
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self.path + ".torn", 'ab') as f:
+            f.write(torn + b"\n")
+
+    @staticmethod
+    def _parse(row, rid=None):
+        """CSV row -> (rid, record), record None for a tombstone; None for a malformed row.
+
+        An amount or ID the Ledger can't hold (see to_paise() and parse_id())
+        makes a row malformed. `rid` is for rows of the legacy format, which
+        have no ID column.
+        """
+        try:
+            if row[0] == TOMBSTONE:
+                return parse_id(row[3]), None
+            amount = float(row[2])
+            if not -MAX_AMOUNT <= amount <= MAX_AMOUNT:
+                return None
+            if rid is None:
+                rid = parse_id(row[3])
+        except (ValueError, IndexError):
+            return None
+        return rid, (rid, row[0], row[1], amount)
+
+    @classmethod
+    def _complete(cls, line, legacy=False):
+        """Whether the bytes of a last row without a line ending hold a whole record."""
+        try:
+            row = next(csv.reader([line.decode('utf-8')]), None)
+        except (UnicodeDecodeError, csv.Error):
+            return False
+        if not row or cls._parse(row, 0 if legacy else None) is None:
+            return False
+        if row[0] == TOMBSTONE:
+            return len(row) == len(HEADER)
+        try:
+            date_ordinal(row[0])
+        except ValueError:
+            return False
+        return len(row) == len(HEADER) - legacy
+
+    @timed("storage.csv_read")
+    def _read(self):
+        """Parse the file -> (live records, tombstone count, legacy format?, (identity, bytes read))."""
+        records = {}
+        tombstones = 0
+        parse = self._parse
+        with open(self.path, 'r', newline='', encoding='utf-8') as f:
+            stat = os.fstat(f.fileno())
+            reader = csv.reader(f)
+            header = next(reader, None)
+            # Files written before record IDs existed get them assigned in file order
+            legacy = header is not None and "ID" not in header
+            for row in reader:
+                parsed = parse(row, len(records) if legacy else None)
+                if parsed is None:
+                    continue
+                rid, record = parsed
+                if record is None:
+                    tombstones += 1
+                    records.pop(rid, None)
+                else:
+                    records[rid] = record
+            end = f.buffer.tell()
+        return list(records.values()), tombstones, legacy, ((stat.st_dev, stat.st_ino), end)
+
+    def load(self):
+        with file_lock(self.lock):
+            # Rows appended to an empty file would have no header, and the first would be taken for it
+            if not os.path.exists(self.path) or not os.path.getsize(self.path):
+                self.rewrite([])
+            self._recover()
+            records, self._tombstones, legacy, end = self._read()
+            self._live = len(records)
+            with self._lock:
+                self._set_position(*end)
+                self._foreign, self._renamed = set(), {}
+            if legacy:
+                self.rewrite(records)
+        self._maybe_compact()
+        return records
+
+    def read(self):
+        """Live records of the file, without recovering or compacting it, so it may be read-only."""
+        return self._read()[0]
+
+    @timed("storage.csv_append")
+    def _write(self, rows):
+        buffer = io.StringIO(newline='')
+        csv.writer(buffer).writerows(rows)
+        data = buffer.getvalue().encode('utf-8')
+        ours = len(data)
+        with self._lock:
+            if self._file is not None and self._replaced():
+                # Another instance swapped the file, append to the new one
+                self._close_file()
+            if self._file is None:
+                self._file = open(self.path, 'a+b', buffering=0)
+            size = self._file.seek(0, os.SEEK_END)
+            if size:
+                self._file.seek(size - 1)
+                if self._file.read(1) != b"\n":
+                    # End the last row another program left without a line ending, or ours runs into it
+                    data = b"\r\n" + data
+            else:
+                # Emptied since load(), by someone else
+                data = HEADER_LINE + data
+            # Unbuffered: one write(2), handed to the OS now, on disk by the next group commit
+            self._file.write(data)
+            end = self._file.tell()
+            if end - len(data) == self._offset:
+                self._offset = end
+            else:
+                # Others appended since our last read, read_tail() skips this range; a
+                # line ending we added belongs to their row
+                self._own.append((end - ours, end))
+            self._dirty = True
+            if len(rows) >= COMMIT_BATCH:
+                self._sync()
+            elif self._timer is None:
+                # Not a daemon, so a pending commit still happens if nobody calls close()
+                self._timer = threading.Timer(COMMIT_WINDOW, self.sync)
+                self._timer.start()
+            tombstones = sum(1 for row in rows if row[0] == TOMBSTONE)
+            self._tombstones += tombstones
+            self._live += len(rows) - 2 * tombstones
+
+    def append_many(self, records):
+        with file_lock(self.lock):
+            with self._lock:
+                records = claim_ids(records, self._taken(), self._renamed, self._stored_top)
+            self._append(records)
+
+    def _append(self, records):
+        self._write([[date, category, amount, rid] for rid, date, category, amount in records])
+
+    def delete(self, rid):
+        with file_lock(self.lock):
+            self._write([[TOMBSTONE, "", "", self._renamed.get(rid, rid)]])
+        self._maybe_compact()
+
+    # ------------------ Durability ------------------
+    def _sync(self):
+        if self._dirty:
+            os.fsync(self._file.fileno())
+            self._dirty = False
+
+    @timed("storage.csv_fsync")
+    def sync(self):
+        """fsync appends that were written since the last sync."""
+        with self._lock:
+            self._timer = None
+            self._sync()
+
+    def _close_file(self):
+        # Called before the file is replaced; the open handle would point at the old one
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._dirty = False
+
+    def _replaced(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        opened = os.fstat(self._file.fileno())
+        return (stat.st_dev, stat.st_ino) != (opened.st_dev, opened.st_ino)
+
+    # ------------------ Other writers ------------------
+    def _set_position(self, identity, offset):
+        self._identity = identity
+        self._offset = offset
+        self._own = []
+        self._stale = False
+        self._unterminated = None
+
+    def _file_position(self):
+        stat = os.stat(self.path)
+        return (stat.st_dev, stat.st_ino), stat.st_size
+
+    def _theirs(self, data, start):
+        """Bytes read from offset `start` on without our own appends -> (their bytes, our ranges past them)."""
+        end = start + len(data)
+        pieces, position, rest = [], start, []
+        for first, last in self._own:
+            if last <= end:
+                pieces.append(data[position - start:first - start])
+                position = last
+            else:
+                rest.append((first, last))
+        pieces.append(data[position - start:])
+        return b"".join(pieces), rest
+
+    def _taken(self):
+        """IDs of others' rows the Ledger may not know yet: unread ones and those read_tail() just returned.
+
+        Called with self._lock held.
+        """
+        taken = set(self._foreign)
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return taken
+        with f:
+            stat = os.fstat(f.fileno())
+            same = (stat.st_dev, stat.st_ino) == self._identity and stat.st_size >= self._offset
+            # A file swapped by another instance is new to us from the start
+            start = self._offset if same else 0
+            if stat.st_size == start:
+                return taken
+            f.seek(start)
+            data = f.read(stat.st_size - start)
+        if same:
+            data = self._theirs(data, start)[0]
+        for row in csv.reader(io.StringIO(data.decode('utf-8', 'replace'), newline='')):
+            parsed = self._parse(row)
+            if parsed is not None:
+                taken.add(parsed[0])
+        return taken
+
+    def _stored_top(self):
+        return max((record[0] for record in self._read()[0]), default=-1)
+
+    def read_tail(self):
+        """Rows other programs appended since the last call; see Storage.read_tail().
+
+        Only the bytes past the last offset are read, and a row that is still
+        being written is left for the next call. A last row without a line
+        ending that is unchanged a call later and holds a whole record is
+        taken as it is: its writer just left the line ending off.
+        """
+        with self._lock:
+            try:
+                f = open(self.path, 'rb')
+            except FileNotFoundError:
+                return None
+            with f:
+                # Identity of the open file: the path may be swapped for a compacted one meanwhile
+                stat = os.fstat(f.fileno())
+                # After a rename the Ledger still has our records under the IDs they lost
+                if (self._stale or self._renamed or (stat.st_dev, stat.st_ino) != self._identity
+                        or stat.st_size < self._offset):
+                    return None
+                if stat.st_size == self._offset:
+                    return []
+                f.seek(self._offset)
+                data = f.read(stat.st_size - self._offset)
+            cut = data.rfind(b"\n") + 1
+            if cut < len(data):
+                if self._unterminated == stat.st_size and self._complete(data[cut:]):
+                    cut = len(data)
+                    self._unterminated = None
+                else:
+                    self._unterminated = stat.st_size
+            data = data[:cut]
+            start, self._offset = self._offset, self._offset + len(data)
+            theirs, self._own = self._theirs(data, start)
+
+            changes = []
+            for row in csv.reader(io.StringIO(theirs.decode('utf-8'), newline='')):
+                parsed = self._parse(row)
+                if parsed is None:
+                    continue
+                changes.append(parsed)
+                if parsed[1] is None:
+                    self._tombstones += 1
+                    self._live -= 1
+                else:
+                    self._foreign.add(parsed[0])
+                    self._live += 1
+            return changes
+
+    @staticmethod
+    def _write_records(f, records):
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows([date, category, amount, rid] for rid, date, category, amount in records)
+
+    @timed("storage.csv_rewrite")
+    def rewrite(self, records):
+        """Atomically replace the file with these records."""
+        with file_lock(self.lock), self._lock:
+            self._generation += 1
+            self._close_file()
+            self._set_position(*atomic_write(self.path, lambda f: self._write_records(f, records)))
+            self._foreign, self._renamed = set(), {}
+            self._live = len(records)
+            self._tombstones = 0
+
+    # ------------------ Compaction ------------------
+    def _maybe_compact(self):
+        if self._compactor is not None or self._tombstones < COMPACT_MIN_TOMBSTONES:
+            return
+        if self._tombstones < COMPACT_RATIO * (self._live + self._tombstones):
+            return
+        self._compactor = threading.Thread(target=self._compact, daemon=True)
+        self._compactor.start()
+
+    def _compact(self):
+        tmp = self.path + ".compact"
+        try:
+            with self._lock:
+                # Everything appended past `end`, by us or anyone else, is carried over below
+                records, _, _, (identity, end) = self._read()
+                generation = self._generation
+            try:
+                f = open(tmp, 'x', newline='', encoding='utf-8')
+            except FileExistsError:
+                return  # another instance is compacting the same file
+            with f:
+                self._write_records(f, records)
+                f.flush()
+                with file_lock(self.lock, wait=False) as locked, self._lock:
+                    if not locked:
+                        # Its holder may be joining this thread (close() does); a later delete tries again
+                        os.remove(tmp)
+                        return
+                    if generation != self._generation or self._file_position()[0] != identity:
+                        # The file was rewritten while we worked, the snapshot is stale
+                        os.remove(tmp)
+                        return
+                    try:
+                        ours = os.stat(tmp).st_ino == os.fstat(f.fileno()).st_ino
+                    except FileNotFoundError:
+                        ours = False
+                    if not ours:
+                        return  # removed as a leftover after all, the file stays as it is
+                    with open(self.path, 'rb') as source:
+                        source.seek(end)
+                        tail = source.read()
+                    # Through the same handle, the path may name a different file by now
+                    f.buffer.write(tail)
+                    f.buffer.flush()
+                    os.fsync(f.fileno())
+                    size = f.buffer.tell()
+                    written = os.fstat(f.fileno())
+                    caught_up = self._identity == identity and self._offset == end + len(tail)
+                    self._close_file()
+                    os.replace(tmp, self.path)
+                    sync_directory(self.path)
+                    rows = csv.reader(io.StringIO(tail.decode('utf-8'), newline=''))
+                    self._tombstones = sum(1 for row in rows if row and row[0] == TOMBSTONE)
+                    self._set_position((written.st_dev, written.st_ino), size)
+                    # Rows of other writers we hadn't read moved to new offsets, only a reload finds them
+                    self._stale = not caught_up
+        finally:
+            self._compactor = None
+
+    def close(self):
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._file is not None:
+                self._sync()
+                self._close_file()
+
+
+# ------------------ Month partitions ------------------
+PARTITION = re.compile(r"^(\d{4}-\d{2})\.csv$")
+
+
+def summary_path(partition):
+    """2025-01.csv -> 2025-01.summary.json, next to it."""
+    return os.path.splitext(partition)[0] + ".summary.json"
+
+
+def read_summary(partition):
+    """Summary of a sealed partition, None for any other file.
+
+    {"month": "YYYY-MM", "count": n, "paise": total, "categories": {name: [paise, count]}}
+    """
+    if not PARTITION.match(os.path.basename(partition)):
+        return None
+    try:
+        with open(summary_path(partition), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def set_writable(path, writable):
+    # Only the write bits change, whatever else the user set stays
+    mode = os.stat(path).st_mode
+    os.chmod(path, mode | 0o200 if writable else mode & ~0o222)
+
+
+def summarize(month, records):
+    categories = {}
+    for _, _, category, amount in records:
+        entry = categories.setdefault(category, [0, 0])
+        entry[0] += to_paise(amount)
+        entry[1] += 1
+    return {"month": month, "count": len(records), "paise": sum(entry[0] for entry in categories.values()),
+            "categories": categories}
+
+
+class PartitionedStorage(Storage):
+    """A directory with one CSV journal per month, e.g. expenses/2025-01.csv.
+
+    Adds and deletes go to the partition of the record's month only, so
+    appends, tombstones and compaction cost what that month holds rather than
+    the whole history. Months before the current one are sealed on load:
+    compacted, made read-only and given a summary (total and per-category sums
+    and counts, see summarize()), which report.py uses instead of the rows.
+    load() still reads the rows of every month, since the Ledger keeps each
+    record in memory. Writing to a sealed month unseals it until the next
+    load.
+
+    A single-file ledger at <directory>.csv is moved into partitions the first
+    time the directory is opened, and kept as <directory>.csv.migrated.
+
+    IDs are unique across the whole directory, so every partition shares one
+    lock file, <directory>.lock, and an append checks the IDs other
+    instances wrote to any partition before it claims its own.
+    """
+
+    def __init__(self, path):
+        self.path = path.rstrip("/\\") or path
+        self.lock = self.path + ".lock"
+        self._open = {}  # month -> CsvStorage
+        self._sealed = {}  # month -> summary
+        self._inodes = {}  # month -> inodes of its sealed CSV and summary
+        self._months = []  # partition numbers stored in _where, 1-based
+        self._number = {}
+        self._where = array('H')  # record ID -> partition number, 0 when unknown
+        self._stale = False
+        self._renamed = {}  # our ID -> the one it was stored under, see claim_ids()
+
+    def _file(self, month):
+        return os.path.join(self.path, month + ".csv")
+
+    def _note(self, records, month):
+        number = self._number.get(month)
+        if number is None:
+            self._months.append(month)
+            number = self._number[month] = len(self._months)
+        where = self._where
+        for record in records:
+            rid = record[0]
+            if rid >= len(where):
+                where.frombytes(bytes(2 * (rid + 1 - len(where))))
+            where[rid] = number
+
+    @staticmethod
+    def _by_month(records):
+        groups = {}
+        for record in records:
+            groups.setdefault(month_of(record[1]), []).append(record)
+        return groups
+
+    # ------------------ Loading ------------------
+    def _migrate(self, source):
+        """Split a single-file ledger into a new partition directory."""
+        single = CsvStorage(source, self.lock)
+        records = single.load()
+        single.close()
+        tmp = self.path + ".tmp"
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp)
+        os.makedirs(tmp)
+        for month, group in self._by_month(records).items():
+            path = os.path.join(tmp, month + ".csv")
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                CsvStorage._write_records(f, group)
+                f.flush()
+                os.fsync(f.fileno())
+            sync_directory(path)
+        # The directory appears complete or not at all; the old file only moves once it has
+        os.replace(tmp, self.path)
+        sync_directory(self.path)
+        os.replace(source, source + ".migrated")
+        sync_directory(source)
+
+    @timed("storage.partitions_load")
+    def load(self):
+        with file_lock(self.lock):
+            return self._load()
+
+    def _load(self):
+        if not os.path.isdir(self.path):
+            if os.path.exists(self.path + ".csv"):
+                self._migrate(self.path + ".csv")
+            else:
+                os.makedirs(self.path)
+        self.close()
+        self._open, self._sealed, self._inodes = {}, {}, {}
+        self._months, self._number, self._where = [], {}, array('H')
+        self._stale, self._renamed = False, {}
+        current = current_month()
+        records = []
+        for name in sorted(os.listdir(self.path)):
+            match = PARTITION.match(name)
+            if match is None:
+                continue
+            month = match.group(1)
+            path = os.path.join(self.path, name)
+            summary = read_summary(path)
+            if summary is not None:
+                # Read-only and never compacted again; the Ledger needs its rows all the same
+                group = CsvStorage(path).read()
+                self._sealed[month] = summary
+                self._inodes[month] = self._identify(month)
+            else:
+                if not os.stat(path).st_mode & 0o200:
+                    set_writable(path, True)  # a seal that was cut short
+                part = self._open[month] = CsvStorage(path, self.lock)
+                group = part.load()
+                if month < current:
+                    self._seal(month, group)
+            self._note(group, month)
+            records.extend(group)
+        records.sort()
+        return records
+
+    # ------------------ Sealing ------------------
+    def _seal(self, month, records):
+        part = self._open.pop(month)
+        part.rewrite(records)
+        part.close()
+        summary = self._sealed[month] = summarize(month, records)
+        path = self._file(month)
+        atomic_write(summary_path(path), lambda f: json.dump(summary, f))
+        set_writable(path, False)
+        self._inodes[month] = self._identify(month)
+
+    def _identify(self, month):
+        path = self._file(month)
+        return os.stat(path).st_ino, os.stat(summary_path(path)).st_ino
+
+    def _unseal(self, month):
+        path = self._file(month)
+        del self._sealed[month]
+        del self._inodes[month]
+        try:
+            set_writable(path, True)
+            os.remove(summary_path(path))
+        except FileNotFoundError:
+            return False  # another instance unsealed or removed it first
+        return True
+
+    def _partition(self, month):
+        """Writable partition of `month`, unsealing or creating it."""
+        part = self._open.get(month)
+        if part is not None:
+            return part
+        path = self._file(month)
+        part = CsvStorage(path, self.lock)
+        sealed = month in self._sealed
+        if sealed and self._unseal(month):
+            part.load()
+        elif os.path.exists(path):
+            # Another instance created or unsealed it since our load, its rows are not in our ledger
+            self._stale = True
+            part.load()
+        else:
+            self._stale |= sealed
+            part.rewrite([])
+        self._open[month] = part
+        return part
+
+    # ------------------ Writes ------------------
+    def append_many(self, records):
+        with file_lock(self.lock):
+            records = claim_ids(records, self._taken(), self._renamed, self._stored_top)
+            for month, group in self._by_month(records).items():
+                self._partition(month)._append(group)
+                self._note(group, month)
+
+    def delete(self, rid):
+        rid = self._renamed.get(rid, rid)
+        number = self._where[rid] if rid < len(self._where) else 0
+        if not number:
+            return
+        self._partition(self._months[number - 1]).delete(rid)
+
+    def rewrite(self, records):
+        with file_lock(self.lock):
+            self._rewrite(records)
+        self._renamed = {}
+
+    def _rewrite(self, records):
+        groups = self._by_month(records)
+        for month in set(self._open) | set(self._sealed):
+            if month in groups:
+                continue
+            path = self._file(month)
+            part = self._open.pop(month, None)
+            if part is not None:
+                part.close()
+            if month in self._sealed:
+                self._unseal(month)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            sync_directory(path)
+        self._months, self._number, self._where = [], {}, array('H')
+        current = current_month()
+        for month, group in groups.items():
+            self._partition(month).rewrite(group)
+            self._note(group, month)
+            if month < current:
+                self._seal(month, group)
+
+    # ------------------ Other writers ------------------
+    def _expected(self):
+        return ({month + ".csv" for month in chain(self._open, self._sealed)}
+                | {month + ".summary.json" for month in self._sealed})
+
+    def _listing(self):
+        """{file name: inode} of the partitions and summaries in the directory."""
+        return {entry.name: entry.inode() for entry in os.scandir(self.path)
+                if PARTITION.match(entry.name) or entry.name.endswith(".summary.json")}
+
+    def _still_sealed(self, month, listing):
+        # Sealing rewrites both files, so a month resealed elsewhere has new inodes
+        return (listing.get(month + ".csv"), listing.get(month + ".summary.json")) == self._inodes.get(month)
+
+    def _taken(self):
+        """IDs other instances wrote that our Ledger may not have yet, in any partition."""
+        taken = set()
+        listing = self._listing()
+        for name in listing:
+            match = PARTITION.match(name)
+            if match is None:
+                continue
+            month = match.group(1)
+            part = self._open.get(month)
+            if part is not None:
+                with part._lock:
+                    taken |= part._taken()
+            elif not self._still_sealed(month, listing):
+                # Created, unsealed or resealed elsewhere since our load, any of its IDs may be new
+                taken.update(record[0] for record in CsvStorage(self._file(month)).read())
+        return taken
+
+    def _stored_top(self):
+        return max((record[0] for name in self._listing() if PARTITION.match(name)
+                    for record in CsvStorage(os.path.join(self.path, name)).read()), default=-1)
+
+    def read_tail(self):
+        """What other instances appended to the open partitions; None once one was created, sealed or unsealed."""
+        listing = self._listing()
+        # After a rename the Ledger still has our records under the IDs they lost
+        if self._stale or self._renamed or listing.keys() != self._expected():
+            return None
+        for month in self._inodes:
+            if not self._still_sealed(month, listing):
+                return None
+        changes = []
+        for month, part in self._open.items():
+            tail = part.read_tail()
+            if tail is None:
+                return None
+            self._note([record for _, record in tail if record is not None], month)
+            changes.extend(tail)
+        return changes
+
+    def sync(self):
+        for part in self._open.values():
+            part.sync()
+
+    def close(self):
+        for part in self._open.values():
+            part.close()
+
+
+# ------------------ SQLite ------------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS expenses (
+    id       INTEGER PRIMARY KEY,
+    day      INTEGER NOT NULL,
+    category TEXT    NOT NULL,
+    amount   REAL    NOT NULL
+);
+-- Covers report.py's GROUP BY day, category, so it reads neither the table
+-- nor a temporary B-tree. The app answers its own aggregates from the Ledger.
+CREATE INDEX IF NOT EXISTS expenses_day_category ON expenses (day, category, amount);
+-- Earlier indexes no query used, which only slowed every insert
+DROP INDEX IF EXISTS expenses_day;
+DROP INDEX IF EXISTS expenses_category;
+"""
+
+
+class SqliteStorage(Storage):
+    """SQLite database in WAL mode.
+
+    Dates are stored as ordinals, and one index serves the per-day,
+    per-category sums report.py takes from the database. The app itself
+    answers every aggregate from the Ledger's running totals.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # The Ledger may hand writes to a worker thread; calls are never concurrent
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self._version = self._data_version()
+        self._renamed = {}  # our ID -> the one it was stored under, see claim_ids()
+
+    def _data_version(self):
+        # Changes whenever another connection commits, never for our own writes
+        return self.db.execute("PRAGMA data_version").fetchone()[0]
+
+    @timed("storage.sqlite_load")
+    def load(self):
+        # Read first: a commit landing in between costs an extra reload, not a missed one
+        self._version = self._data_version()
+        self._renamed = {}
+        return self._records(self.db)
+
+    @staticmethod
+    def _records(db):
+        dates = {}
+        records = []
+        for rid, day, category, amount in db.execute(
+                "SELECT id, day, category, amount FROM expenses ORDER BY id"):
+            if day not in dates:
+                dates[day] = ordinal_date(day)
+            records.append((rid, dates[day], category, amount))
+        return records
+
+    def read_tail(self):
+        """None once another connection committed since load(); SQLite can't say what changed."""
+        return None if self._renamed or self._data_version() != self._version else []
+
+    def _taken(self, records):
+        """IDs of these records that are already in the database."""
+        ids = [record[0] for record in records]
+        taken = set()
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            taken.update(rid for rid, in self.db.execute(
+                f"SELECT id FROM expenses WHERE id IN ({','.join('?' * len(chunk))})", chunk))
+        return taken
+
+    def _stored_top(self):
+        top = self.db.execute("SELECT MAX(id) FROM expenses").fetchone()[0]
+        return -1 if top is None else top
+
+    def _insert(self, records):
+        dates = {}
+        rows = []
+        for rid, date, category, amount in records:
+            if date not in dates:
+                dates[date] = date_ordinal(date)
+            rows.append((rid, dates[date], category, amount))
+        self.db.executemany("INSERT INTO expenses (id, day, category, amount) VALUES (?, ?, ?, ?)", rows)
+
+    @timed("storage.sqlite_append")
+    def append_many(self, records):
+        with self.db:
+            # The write lock, taken up front, keeps other connections out between the check and the insert
+            self.db.execute("BEGIN IMMEDIATE")
+            self._insert(claim_ids(records, self._taken(records), self._renamed, self._stored_top))
+
+    @timed("storage.sqlite_delete")
+    def delete(self, rid):
+        with self.db:
+            self.db.execute("DELETE FROM expenses WHERE id = ?", (self._renamed.get(rid, rid),))
+
+    @timed("storage.sqlite_rewrite")
+    def rewrite(self, records):
+        with self.db:
+            self.db.execute("DELETE FROM expenses")
+            self._insert(records)
+        self._renamed = {}
+
+    def close(self):
+        self.db.close()
+
+
+# ------------------ Command line ------------------
+def migrate(source, db_path):
+    """Import the live records of a ledger into a SQLite database; returns how many.
+
+    The source is only read (see read_ledger), and must exist.
+    """
+    records = read_ledger(source)
+    db = SqliteStorage(db_path)
+    try:
+        db.rewrite(records)
+    finally:
+        db.close()
+    return len(records)
+
+
+def main(argv=None):
+    # Only the command line needs argparse, keep it out of GUI startup
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ledger storage tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate_cmd = commands.add_parser("migrate", help="import a ledger into a SQLite database")
+    migrate_cmd.add_argument("ledger", help="partition directory or .csv file, e.g. expenses")
+    migrate_cmd.add_argument("database")
+    args = parser.parse_args(argv)
+    # An error about the ledger named, not about the expenses.csv it would fall back to
+    if not os.path.exists(ledger_path(args.ledger)):
+        parser.error(f"no such ledger: {args.ledger}")
+
+    print(f"Imported {migrate(args.ledger, args.database)} records into {args.database}")
+
+
+if __name__ == "__main__":
+    main()
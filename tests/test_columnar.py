@@ -0,0 +1,72 @@
+import os, random
+
+import numpy as np
+import pytest
+
+from columnar import ColumnarLedger, columnar_to_csv, csv_to_columnar, main
+from ledger import Ledger
+from storage import CsvStorage
+
+
+@pytest.fixture
+def ledger_path(tmp_path):
+    random.seed(4)
+    path = str(tmp_path / "expenses.csv")
+    ledger = Ledger(path)
+    ledger.add_many([(f"{random.randint(1, 28):02d}-{random.randint(1, 12):02d}-2025",
+                      random.choice(["Food", "Rent", "Travel"]), random.randint(1, 500000) / 100)
+                     for _ in range(500)])
+    for rid in random.sample(ledger.ids(), 50):
+        ledger.delete(rid)
+    ledger.close()
+    return path
+
+
+# ------------------ Conversion ------------------
+def test_round_trip_gives_the_compacted_csv(ledger_path, tmp_path):
+    col = str(tmp_path / "expenses.col")
+    assert csv_to_columnar(ledger_path, col) == 450
+    back = str(tmp_path / "back.csv")
+    assert columnar_to_csv(col, back) == 450
+    assert CsvStorage(back).read() == CsvStorage(ledger_path).read()
+
+
+def test_the_columnar_ledger_adds_up_like_the_ledger(ledger_path, tmp_path):
+    col = str(tmp_path / "expenses.col")
+    csv_to_columnar(ledger_path, col)
+    columnar, ledger = ColumnarLedger(col), Ledger(ledger_path)
+    assert len(columnar) == len(ledger)
+    assert columnar.total() == ledger.total()
+    assert columnar.category_counts() == ledger.category_counts()
+    assert columnar.category_sums() == pytest.approx(ledger.category_sums())
+    ledger.close()
+
+
+def test_records_that_would_not_round_trip_are_refused(tmp_path):
+    path = str(tmp_path / "expenses.csv")
+    for row in (b"1-10-2026,Food,5,0", b"01-10-2026,Food,5.001,0"):
+        with open(path, 'wb') as f:
+            f.write(b"Date,Category,Amount,ID\r\n" + row + b"\r\n")
+        with pytest.raises(ValueError):
+            csv_to_columnar(path, str(tmp_path / "out.col"))
+
+
+def test_a_column_of_the_wrong_type_is_refused(ledger_path, tmp_path):
+    col = str(tmp_path / "expenses.col")
+    csv_to_columnar(ledger_path, col)
+    np.save(os.path.join(col, "amounts.npy"), np.zeros(450, dtype=np.float64))
+    with pytest.raises(ValueError):
+        ColumnarLedger(col)
+
+
+# ------------------ Command line ------------------
+def test_to_columnar_reads_a_partitioned_ledger(tmp_path, capsys):
+    path = str(tmp_path / "expenses")
+    ledger = Ledger(path)
+    ledger.add_many([(f"01-{month:02d}-2026", "Food", month) for month in range(1, 4)])
+    ledger.close()
+    main(["to-columnar", path, str(tmp_path / "expenses.col")])
+    main(["summary", str(tmp_path / "expenses.col")])
+    assert "Transactions: 3" in capsys.readouterr().out
+    with pytest.raises(SystemExit):
+        main(["to-columnar", str(tmp_path / "other"), str(tmp_path / "other.col")])
@@ -0,0 +1,80 @@
+import csv
+
+import pytest
+
+from importer import import_statement, main, read_statement, write_rejects
+from ledger import Ledger
+
+STATEMENT = ("\ufeffDate,Description,Category,Amount\r\n"
+             "2026-10-01,Lunch,Food,\"₹1,234.50\"\r\n"
+             "2026/10/02,Bus,Travel,40\r\n"
+             "\r\n"
+             "31-10-2026,Cab,Travel,90\r\n"
+             "2026-10-03,Shop,,12\r\n"
+             "2026-10-04,Fee,Bank,nan\r\n"
+             "2026-10-05,Short\r\n")
+
+
+@pytest.fixture
+def statement(tmp_path):
+    path = tmp_path / "statement.csv"
+    path.write_text(STATEMENT, encoding="utf-8")
+    return str(path)
+
+
+# ------------------ Reading ------------------
+def test_rows_are_validated_and_rejects_keep_their_line(statement):
+    records, rejects = read_statement(statement)
+    assert records == [("01-10-2026", "Food", 1234.5), ("02-10-2026", "Travel", 40.0)]
+    assert [(line, reason) for line, reason, _ in rejects] == [
+        (5, "invalid date"), (6, "missing category"), (7, "invalid amount"), (8, "missing columns")]
+    assert rejects[0][2] == ["31-10-2026", "Cab", "Travel", "90"]
+
+
+def test_options_pick_columns_formats_and_a_default_category(statement):
+    records, rejects = read_statement(statement, category_column="Description",
+                                      date_formats=["%d-%m-%Y"], default_category="Other")
+    assert records == [("31-10-2026", "Cab", 90.0)]
+    records, _ = read_statement(statement, default_category="Other")
+    assert ("03-10-2026", "Other", 12.0) in records
+
+
+def test_batches_give_the_same_result(statement, monkeypatch):
+    whole = read_statement(statement)
+    monkeypatch.setattr("importer.BATCH_SIZE", 2)
+    assert read_statement(statement) == whole
+
+
+def test_a_missing_column_stops_the_import(tmp_path):
+    path = tmp_path / "statement.csv"
+    path.write_text("Date,Amount\r\n2026-10-01,5\r\n")
+    with pytest.raises(ValueError):
+        read_statement(str(path))
+
+
+# ------------------ Importing ------------------
+def test_import_adds_the_records_and_reports_rejects(statement, tmp_path):
+    ledger = Ledger(str(tmp_path / "expenses.csv"))
+    ids, rejects = import_statement(ledger, statement)
+    assert [tuple(ledger.get(rid)) for rid in ids] == [("01-10-2026", "Food", 1234.5),
+                                                      ("02-10-2026", "Travel", 40.0)]
+    ledger.close()
+    rejects_path = str(tmp_path / "rejects.csv")
+    write_rejects(rejects_path, rejects)
+    with open(rejects_path, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["Line", "Reason"]
+    assert rows[1] == ["5", "invalid date", "31-10-2026", "Cab", "Travel", "90"]
+    assert len(rows) == 1 + len(rejects)
+
+
+def test_command_line_import(statement, tmp_path, capsys):
+    ledger_path = str(tmp_path / "expenses.csv")
+    main([statement, "--ledger", ledger_path])
+    out = capsys.readouterr().out
+    assert "Imported 2 records" in out and "Rejected 4 rows" in out
+    ledger = Ledger(ledger_path)
+    assert len(ledger) == 2
+    ledger.close()
+    with open(statement + ".rejects.csv", encoding='utf-8') as f:
+        assert len(f.read().splitlines()) == 5
@@ -0,0 +1,166 @@
+import math, random
+
+import pytest
+
+from dates import date_ordinal, month_of
+from ledger import MAX_ID_GAP, Filter, Ledger
+from storage import Storage, to_paise
+
+CATEGORIES = ["Food", "Rent", "Travel", "Fuel", "Bills"]
+
+
+def random_date():
+    return f"{random.randint(1, 28):02d}-{random.randint(1, 12):02d}-{random.choice([2024, 2025])}"
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    random.seed(3)
+    ledger = Ledger(str(tmp_path / "expenses.csv"))
+    ledger.add_many([(random_date(), random.choice(CATEGORIES), random.randint(1, 500000) / 100)
+                     for _ in range(2000)])
+    for rid in random.sample(ledger.ids(), 300):
+        ledger.delete(rid)
+    yield ledger
+    ledger.close()
+
+
+def expected(ledger):
+    """(total, {category: [paise, count]}, {month: [paise, count]}) from the records themselves."""
+    total, categories, months = 0, {}, {}
+    for _, (date, category, amount) in ledger.items():
+        paise = to_paise(amount)
+        total += paise
+        for groups, key in ((categories, category), (months, month_of(date))):
+            entry = groups.setdefault(key, [0, 0])
+            entry[0] += paise
+            entry[1] += 1
+    return total, categories, months
+
+
+def aggregates(ledger):
+    sums, counts = ledger.category_sums(), ledger.category_counts()
+    return (round(ledger.total() * 100), {name: [round(sums[name] * 100), counts[name]] for name in sums},
+            {month: [round(ledger.month_total(month) * 100), ledger.month_count(month)]
+             for month in ledger.months()})
+
+
+# ------------------ Aggregates ------------------
+def test_running_aggregates_match_a_full_scan(ledger):
+    for _ in range(500):
+        if random.random() < 0.5:
+            ledger.add(random_date(), random.choice(CATEGORIES), random.randint(1, 500000) / 100)
+        else:
+            ledger.delete(random.choice(ledger.ids()))
+    assert ledger.verify()
+    assert aggregates(ledger) == expected(ledger)
+
+
+def test_reload_builds_the_same_aggregates(ledger):
+    before = aggregates(ledger)
+    ledger.load()
+    assert ledger.verify()
+    assert aggregates(ledger) == before == expected(ledger)
+
+
+def test_month_totals_through_a_day(ledger):
+    for month in ledger.months():
+        through = date_ordinal(f"15-{month[5:]}-{month[:4]}")
+        rids = [rid for rid, record in ledger.items() if month_of(record.date) == month and record.ordinal <= through]
+        assert ledger.month_count(month, through) == len(rids)
+        assert round(ledger.month_total(month, through) * 100) == ledger.paise_of(rids)
+
+
+@pytest.mark.parametrize("amount", [math.nan, math.inf, -math.inf, 1e300])
+def test_amounts_that_cannot_be_stored_are_refused(ledger, amount):
+    before = aggregates(ledger), len(ledger)
+    with pytest.raises(ValueError):
+        ledger.add("01-01-2025", "Food", amount)
+    with pytest.raises(ValueError):
+        ledger.add_many([("02-01-2025", "Food", 1.0), ("03-01-2025", "Food", amount)])
+    assert (aggregates(ledger), len(ledger)) == before
+    assert ledger.verify()
+
+
+def test_ids_out_of_range_are_refused(tmp_path):
+    ledger = Ledger(str(tmp_path / "expenses.csv"))
+    ledger.add("01-10-2026", "Rent", 20)
+    for rid in (-1, MAX_ID_GAP + 10):
+        with pytest.raises(ValueError):
+            ledger.adopt(rid, "02-10-2026", "Fuel", 5)
+    assert [tuple(record) for _, record in ledger.items()] == [("01-10-2026", "Rent", 20.0)]
+    assert ledger.verify()
+    ledger.close()
+    for records in ([(0, "01-10-2026", "Rent", 20.0), (-1, "02-10-2026", "Fuel", 5.0)],
+                    [(0, "01-10-2026", "Rent", 20.0), (MAX_ID_GAP + 10, "02-10-2026", "Fuel", 5.0)]):
+        with pytest.raises(ValueError):
+            # Not loaded on construction with a submit
+            Ledger("other", storage=Storage(), submit=lambda *call: None).load(records)
+
+
+def test_a_copy_changes_apart_and_swaps_in(ledger):
+    ledger.query(Filter(category="Food"))  # with the search indexes built
+    before = aggregates(ledger), ledger.ids()
+    spare = ledger.copy()
+    spare.add_many([(random_date(), "Gifts", 5.0) for _ in range(100)])
+    spare.delete(spare.ids()[0])
+    assert (aggregates(ledger), ledger.ids()) == before
+    assert ledger.verify()
+    version = ledger.version
+    ledger.swap_in(spare)
+    assert ledger.version > version
+    assert ledger.verify()
+    assert aggregates(ledger) == expected(ledger)
+    assert sorted(ledger.query(Filter(category="Gifts"))) == ledger.ids()[-100:]
+    # The copy wrote to the shared storage itself
+    assert len(Ledger(ledger.path)) == len(ledger)
+
+
+# ------------------ Changes made elsewhere ------------------
+def test_adopted_and_forgotten_records_count(ledger):
+    top = max(ledger.ids())
+    ledger.adopt(top + 5, "01-01-2025", "Gifts", 12.34)
+    ledger.forget(ledger.ids()[0])
+    ledger.forget(top + 100)  # never there
+    assert ledger.verify()
+    assert aggregates(ledger) == expected(ledger)
+
+
+# ------------------ Query ------------------
+def test_a_ledger_waiting_for_its_load_is_empty():
+    ledger = Ledger("other", storage=Storage(), submit=lambda *call: None)
+    assert ledger.ids() == [] and len(ledger) == 0
+    assert ledger.query(Filter(category="Food", min_amount=1)) == []
+    assert 0 not in ledger
+
+
+def random_filter():
+    start = end = low = high = None
+    if random.random() < 0.5:
+        start = date_ordinal(random_date())
+    if random.random() < 0.5:
+        end = date_ordinal(random_date())
+    if random.random() < 0.5:
+        low = random.randint(0, 300000) / 100
+    if random.random() < 0.5:
+        high = random.randint(0, 500000) / 100
+    category = random.choice(CATEGORIES) if random.random() < 0.3 else None
+    text = random.choice(["o", "R", "el", "zz"]) if random.random() < 0.3 else None
+    return Filter(category, start, end, low, high, text)
+
+
+def test_query_matches_a_scan(ledger):
+    for step in range(300):
+        where = random_filter()
+        assert sorted(ledger.query(where)) == [rid for rid, record in ledger.items() if where.matches(record)]
+        # The indexes are kept up to date once built
+        if step % 3 == 0:
+            ledger.add(random_date(), random.choice(CATEGORIES), random.randint(1, 500000) / 100)
+        elif step % 3 == 1:
+            ledger.delete(random.choice(ledger.ids()))
+
+
+def test_query_amount_bounds_are_inclusive(ledger):
+    rid = ledger.add("01-01-2025", "Food", 123.45)
+    assert rid in ledger.query(Filter(min_amount=123.45, max_amount=123.45))
+    assert rid not in ledger.query(Filter(min_amount=123.46))
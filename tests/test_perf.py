@@ -0,0 +1,62 @@
+import json, pstats, time
+from collections import deque
+
+import pytest
+
+import perf
+
+
+@pytest.fixture
+def recording():
+    perf.reset()
+    perf.enable()
+    yield
+    perf.enable(False)
+    perf.reset()
+
+
+@perf.timed("test.outer")
+def outer():
+    time.sleep(0.002)
+    with perf.span("test.inner"):
+        time.sleep(0.002)
+
+
+# ------------------ Spans ------------------
+def test_nothing_is_recorded_while_off():
+    perf.reset()
+    outer()
+    assert perf.stats() == {}
+
+
+def test_nested_spans_split_own_and_total_time(recording):
+    for _ in range(3):
+        outer()
+    stats = perf.stats()
+    assert stats["test.outer"]["calls"] == stats["test.inner"]["calls"] == 3
+    assert stats["test.outer"]["p50"] > stats["test.inner"]["p50"] >= 2
+    _, own, total, _ = perf.totals["test.outer"]
+    assert own < total
+    assert list(perf.totals["test.inner"][3]) == ["test.outer"]
+
+
+def test_calls_count_past_the_ring(recording, monkeypatch):
+    monkeypatch.setattr(perf, "ring", deque(maxlen=4))
+    for _ in range(10):
+        with perf.span("test.short"):
+            pass
+    assert len(perf.ring) == 4
+    assert perf.stats()["test.short"]["calls"] == 10
+
+
+# ------------------ Reports ------------------
+def test_exports_read_back(recording, tmp_path):
+    outer()
+    perf.export(str(tmp_path / "spans.json"))
+    with open(tmp_path / "spans.json") as f:
+        exported = json.load(f)
+    assert {event["name"] for event in exported["traceEvents"]} == {"test.outer", "test.inner"}
+    assert set(exported["stats"]) == {"test.outer", "test.inner"}
+    perf.export(str(tmp_path / "spans.prof"))
+    functions = {function for _, _, function in pstats.Stats(str(tmp_path / "spans.prof")).stats}
+    assert functions == {"outer", "inner"}
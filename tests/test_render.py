@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+import render
+from ledger import Ledger
+
+
+def fill(path, records):
+    ledger = Ledger(path)
+    ledger.add_many(records)
+    ledger.close()
+
+
+def charts(output):
+    return sorted(os.path.relpath(os.path.join(folder, name), output)
+                  for folder, _, names in os.walk(output) for name in names if name != render.MANIFEST)
+
+
+# ------------------ Rendering ------------------
+def test_only_changed_charts_are_drawn_again(tmp_path):
+    path, output = str(tmp_path / "expenses.csv"), str(tmp_path / "charts")
+    fill(path, [("05-11-2024", "Food", 10), ("06-11-2024", "Rent", 500), ("01-12-2024", "Food", 20)])
+    assert render.render([path], output, jobs=1) == (6, 0, [])
+    assert charts(output) == [os.path.join("expenses", f"{name}.png") for name in
+                              ("2024-11-categories", "2024-11-trend", "2024-12-categories", "2024-12-trend",
+                               "all-categories", "all-trend")]
+    assert render.render([path], output, jobs=1) == (0, 6, [])
+    # One more expense in December: that month and the totals change, November doesn't
+    fill(path, [("02-12-2024", "Fuel", 5)])
+    assert render.render([path], output, jobs=1) == (4, 2, [])
+    assert render.render([path], output, jobs=1, force=True) == (6, 0, [])
+
+
+def test_ledgers_of_the_same_name_are_refused(tmp_path):
+    first, second = str(tmp_path / "a" / "expenses.csv"), str(tmp_path / "b" / "expenses.db")
+    for path in (first, second):
+        os.makedirs(os.path.dirname(path))
+        fill(path, [("05-11-2024", "Food", 10)])
+    with pytest.raises(ValueError):
+        render.render([first, second], str(tmp_path / "charts"), jobs=1)
+    with pytest.raises(SystemExit):
+        render.main([first, second, "--output", str(tmp_path / "charts")])
+    assert not os.path.exists(tmp_path / "charts")
+
+
+def test_a_ledger_is_named_the_way_read_ledger_finds_it(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Not opened by the app yet, so still expenses.csv rather than partitions
+    with open("expenses.csv", 'w', newline='') as f:
+        f.write("Date,Category,Amount,ID\r\n05-11-2024,Food,10,0\r\n")
+    assert render.main(["expenses", "--jobs", "1"]) == 0
+    assert charts("charts") == [os.path.join("expenses", f"{name}.png") for name in
+                                ("2024-11-categories", "2024-11-trend", "all-categories", "all-trend")]
+    assert sorted(os.listdir(tmp_path)) == ["charts", "expenses.csv"]
+    with pytest.raises(SystemExit):
+        render.main(["other"])
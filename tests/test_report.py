@@ -0,0 +1,88 @@
+import random, sqlite3
+
+import pytest
+
+import storage
+from dates import month_of
+from ledger import Ledger
+from report import SQLITE_SUMMARY, report
+from storage import to_paise
+
+
+def fill(path):
+    """Random adds and deletes through a Ledger -> (total, categories, months) of what is left."""
+    random.seed(path)
+    ledger = Ledger(path)
+    ledger.add_many([(f"{random.randint(1, 28):02d}-{random.randint(1, 12):02d}-{random.choice([2024, 2025])}",
+                      random.choice(["Food", "Rent", "Travel"]), random.randint(1, 500000) / 100)
+                     for _ in range(3000)])
+    for rid in random.sample(ledger.ids(), 400):
+        ledger.delete(rid)
+    total, categories, months = 0, {}, {}
+    for _, (date, category, amount) in ledger.items():
+        paise = to_paise(amount)
+        total += paise
+        for groups, key in ((categories, category), (months, month_of(date))):
+            entry = groups.setdefault(key, [0, 0])
+            entry[0] += paise
+            entry[1] += 1
+    ledger.close()
+    # Loading again seals the past months of a partitioned ledger, which report() takes from their summaries
+    Ledger(path).close()
+    return total, categories, months
+
+
+@pytest.mark.parametrize("name", ["expenses.csv", "expenses", "expenses.db"])
+def test_report_matches_the_ledger(tmp_path, name):
+    path = str(tmp_path / name)
+    total, categories, months = fill(path)
+    # Small chunks, so tombstones land in other chunks than their records
+    summary = report([path], jobs=2, chunk_bytes=4096)
+    assert summary["total"] == total
+    assert summary["count"] == sum(count for _, count in categories.values())
+    assert summary["categories"] == categories
+    assert summary["months"] == months
+    assert summary["skipped"] == []
+
+
+def test_sqlite_sums_come_from_an_index(tmp_path):
+    path = str(tmp_path / "expenses.db")
+    fill(path)
+    db = sqlite3.connect(path)
+    plan = " ".join(row[-1] for row in db.execute("EXPLAIN QUERY PLAN " + SQLITE_SUMMARY))
+    db.close()
+    assert "COVERING INDEX" in plan and "TEMP B-TREE" not in plan
+
+
+def test_report_adds_up_several_ledgers(tmp_path):
+    first, second = str(tmp_path / "a.csv"), str(tmp_path / "b.db")
+    expected = [fill(first), fill(second)]
+    summary = report([first, second], jobs=2, chunk_bytes=8192)
+    assert summary["ledgers"] == {first: [expected[0][0], sum(c for _, c in expected[0][1].values())],
+                                  second: [expected[1][0], sum(c for _, c in expected[1][1].values())]}
+    assert summary["total"] == expected[0][0] + expected[1][0]
+
+
+def test_report_skips_files_that_are_not_ledgers(tmp_path):
+    path = tmp_path / "notes.csv"
+    path.write_text("Name,Phone\r\nA,1\r\n")
+    summary = report([str(tmp_path)], jobs=1)
+    assert summary["skipped"] == [str(path)]
+    assert summary["count"] == 0
+
+
+def test_report_reads_ledgers_whatever_their_names_and_fields(tmp_path):
+    folder = tmp_path / "q?#%20"
+    folder.mkdir()
+    path = str(folder / "expenses.csv")
+    ledger = Ledger(path)
+    # A quoted line break makes one row span two lines
+    ids = ledger.add_many([("01-10-2026", "Food\nand drink", 1.0), ("02-10-2026", "Rent", 2.0)] * 50)
+    for rid in ids[::3]:
+        ledger.delete(rid)
+    ledger.close()
+    db = str(folder / "expenses.db")
+    storage.migrate(path, db)
+    for ledger_path in (path, db):
+        summary = report([ledger_path], jobs=1, chunk_bytes=256)
+        assert summary["categories"] == {"Food\nand drink": [3300, 33], "Rent": [6600, 33]}
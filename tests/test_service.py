@@ -0,0 +1,101 @@
+import asyncio, math
+
+import pytest
+
+from ledger import Ledger
+from service import Service, parse_expense
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = Service(str(tmp_path / "expenses.csv"))
+    yield service
+    service.close()
+
+
+def count_storage_calls(service):
+    """Wrap the storage's append_many and sync -> the list of calls made to them."""
+    calls = []
+    storage = service.storage
+    append_many, sync = storage.append_many, storage.sync
+
+    def counted_append(records):
+        calls.append(("append", len(records)))
+        append_many(records)
+
+    def counted_sync():
+        calls.append(("sync",))
+        sync()
+
+    storage.append_many, storage.sync = counted_append, counted_sync
+    return calls
+
+
+def run(service, *batches):
+    """Queue each batch of requests at once, one batch after the other, on one running writer.
+
+    -> for each batch, the results of its requests or the exceptions they raised.
+    """
+    async def main():
+        writer = asyncio.create_task(service._writer())
+        try:
+            return [await asyncio.gather(*(service._write(*request) for request in batch), return_exceptions=True)
+                    for batch in batches]
+        finally:
+            writer.cancel()
+    return asyncio.run(main())
+
+
+# ------------------ Batching ------------------
+def test_queued_writes_share_one_append_and_fsync(service):
+    calls = count_storage_calls(service)
+    results, = run(service, [(service._add, "client", [("01-10-2026", "Food", amount)], [None])
+                             for amount in range(1, 21)])
+    assert [result["ids"] for result in results] == [[rid] for rid in range(20)]
+    assert calls == [("append", 20), ("sync",)]
+    ledger = Ledger(service.ledger.path)
+    assert [record.amount for _, record in ledger.items()] == [float(amount) for amount in range(1, 21)]
+    ledger.close()
+
+
+def test_a_failing_request_only_fails_itself(service):
+    calls = count_storage_calls(service)
+    results, after = run(service, [(service._add, "a", [("01-10-2026", "Food", 1.0)], [None]),
+                                   (service._delete, "b", 99),
+                                   (service._add, "c", [("02-10-2026", "Rent", 2.0)], [None])],
+                         # The writer is still there for the next batch
+                         [(service._delete, "a", 0)])
+    assert results[0]["ids"] == [0] and results[2]["ids"] == [1]
+    assert isinstance(results[1], KeyError)
+    assert after[0]["seq"] == service.seq
+    assert calls[:2] == [("append", 2), ("sync",)]
+    assert service.ledger.ids() == [1]
+
+
+def test_requested_ids_that_clash_get_new_ones(service):
+    results, = run(service, [(service._add, "a", [("01-10-2026", "Food", 1.0)], [0]),
+                             (service._add, "b", [("02-10-2026", "Rent", 2.0)], [0])])
+    assert results[0]["ids"] == [0]
+    assert results[1]["ids"] != [0]
+    assert len(service.ledger) == 2
+
+
+def test_changes_leave_out_the_asking_client(service):
+    run(service, [(service._add, "a", [("01-10-2026", "Food", 1.0)], [None]),
+                  (service._add, "b", [("02-10-2026", "Rent", 2.0)], [None])])
+    changes = service.changes(0, service.run, "a")
+    assert changes["changes"] == [[1, [1, "02-10-2026", "Rent", 2.0]]]
+    assert service.changes(0, "another run", "a")["reload"]
+
+
+# ------------------ Parsing ------------------
+@pytest.mark.parametrize("amount", [math.nan, math.inf, 1e300, "5", True, None])
+def test_amounts_that_cannot_be_stored_are_bad_requests(amount):
+    with pytest.raises(ValueError):
+        parse_expense({"date": "2026-10-01", "category": "Food", "amount": amount})
+
+
+def test_dates_in_either_format():
+    assert parse_expense({"date": "2026-10-01", "category": " Food ", "amount": 5}) == \
+        (("01-10-2026", "Food", 5.0), None)
+    assert parse_expense({"date": "01-10-2026", "category": "Food", "amount": 5.5, "id": 7})[1] == 7
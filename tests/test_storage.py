@@ -0,0 +1,245 @@
+import os, random
+
+import pytest
+
+import storage
+from ledger import Ledger
+from storage import CsvStorage, read_ledger
+
+
+def sync(ledger):
+    """Take in what other writers changed, the way the GUI's file sync does."""
+    changes = ledger.storage.read_tail()
+    if changes is None:
+        compactor = getattr(ledger.storage, "_compactor", None)
+        if compactor is not None:
+            compactor.join()
+        ledger.load()
+        return
+    for rid, record in changes:
+        ledger.forget(rid)
+        if record is not None:
+            ledger.adopt(*record)
+
+
+def contents(ledger):
+    return sorted((rid, tuple(record)) for rid, record in ledger.items())
+
+
+# ------------------ Tail ------------------
+def test_read_tail_returns_what_another_writer_appended(tmp_path):
+    path = str(tmp_path / "expenses.csv")
+    ours, theirs = CsvStorage(path), CsvStorage(path)
+    ours.load()
+    theirs.load()
+    ours.append(0, "01-10-2026", "Food", 10.5)
+    theirs.append(1, "02-10-2026", "Rent", 500.0)
+    theirs.delete(1)
+    assert ours.read_tail() == [(1, (1, "02-10-2026", "Rent", 500.0)), (1, None)]
+    assert ours.read_tail() == []
+    assert theirs.read_tail() == [(0, (0, "01-10-2026", "Food", 10.5))]
+    ours.close()
+    theirs.close()
+
+
+def test_read_tail_waits_for_a_row_being_written(tmp_path):
+    path = str(tmp_path / "expenses.csv")
+    ours = CsvStorage(path)
+    ours.load()
+    with open(path, 'ab') as f:
+        f.write(b"03-10-2026,Food,2.5")
+    assert ours.read_tail() == []
+    with open(path, 'ab') as f:
+        f.write(b",4\r\n")
+    assert ours.read_tail() == [(4, (4, "03-10-2026", "Food", 2.5))]
+    ours.close()
+
+
+def test_read_tail_takes_a_complete_row_without_line_ending(tmp_path):
+    path = str(tmp_path / "expenses.csv")
+    ours = CsvStorage(path)
+    ours.load()
+    with open(path, 'ab') as f:
+        f.write(b"03-10-2026,Food,2.5,4")
+    # Unchanged on the second look, so its writer is done with it
+    assert ours.read_tail() == []
+    assert ours.read_tail() == [(4, (4, "03-10-2026", "Food", 2.5))]
+    ours.append(5, "04-10-2026", "Rent", 1.0)
+    ours.close()
+    assert CsvStorage(path).read() == [(4, "03-10-2026", "Food", 2.5), (5, "04-10-2026", "Rent", 1.0)]
+
+
+# ------------------ Compaction ------------------
+def test_compaction_keeps_rows_another_writer_appended(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "COMPACT_MIN_TOMBSTONES", 4)
+    path = str(tmp_path / "expenses.csv")
+    ours, theirs = Ledger(path), Ledger(path)
+    for day in range(1, 21):
+        ours.add(f"{day:02d}-09-2026", "Food", day)
+    sync(theirs)
+    theirs.add("01-10-2026", "Rent", 500)
+    for rid in range(10):
+        ours.delete(rid)
+    ours.storage.close()  # waits for the compactor
+    assert os.path.getsize(path) < 20 * len("01-09-2026,Food,1.0,0\r\n")
+    for ledger in (ours, theirs):
+        sync(ledger)
+        sync(ledger)
+    fresh = Ledger(path)
+    assert contents(ours) == contents(theirs) == contents(fresh)
+    assert [tuple(record) for _, record in fresh.items()][-1] == ("01-10-2026", "Rent", 500.0)
+    assert len(fresh) == 11
+    for ledger in (ours, theirs, fresh):
+        ledger.close()
+
+
+def test_interleaved_writers_stay_in_step(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "COMPACT_MIN_TOMBSTONES", 4)
+    random.seed(7)
+    path = str(tmp_path / "expenses.csv")
+    ledgers = [Ledger(path), Ledger(path)]
+    for _ in range(300):
+        ledger = random.choice(ledgers)
+        if random.random() < 0.3:
+            sync(ledger)
+        if random.random() < 0.6 or not len(ledger):
+            ledger.add(f"{random.randint(1, 28):02d}-0{random.randint(1, 9)}-2025", random.choice("ABCD"),
+                       random.randint(1, 99999) / 100)
+        else:
+            ledger.delete(random.choice(ledger.ids()))
+    for ledger in ledgers:
+        ledger.storage.close()
+    for ledger in ledgers:
+        sync(ledger)
+        sync(ledger)
+    fresh = Ledger(path)
+    for ledger in ledgers:
+        assert contents(ledger) == contents(fresh)
+        assert ledger.verify()
+    for ledger in ledgers + [fresh]:
+        ledger.close()
+
+
+# ------------------ Recovery ------------------
+def test_an_empty_file_gets_a_header(tmp_path):
+    path = str(tmp_path / "expenses.csv")
+    open(path, 'wb').close()
+    ours = Ledger(path)
+    ours.add("01-10-2026", "Food", 10.5)
+    ours.add("02-10-2026", "Rent", 500)
+    # Emptied behind our back, then appended to again
+    open(path, 'wb').close()
+    ours.add("03-10-2026", "Fuel", 1)
+    ours.close()
+    assert CsvStorage(path).read() == [(2, "03-10-2026", "Fuel", 1.0)]
+    fresh = Ledger(path)
+    assert [tuple(record) for _, record in fresh.items()] == [("03-10-2026", "Fuel", 1.0)]
+    fresh.close()
+
+
+def test_recover_cuts_off_a_torn_row(tmp_path):
+    path = str(tmp_path / "expenses.csv")
+    with open(path, 'wb') as f:
+        f.write(b"Date,Category,Amount,ID\r\n01-10-2026,Food,10.5,0\r\n02-10-2026,Re")
+    ours = CsvStorage(path)
+    assert ours.load() == [(0, "01-10-2026", "Food", 10.5)]
+    ours.append(1, "03-10-2026", "Rent", 500.0)
+    ours.close()
+    assert CsvStorage(path).read() == [(0, "01-10-2026", "Food", 10.5), (1, "03-10-2026", "Rent", 500.0)]
+    with open(path + ".torn", 'rb') as f:
+        assert f.read() == b"02-10-2026,Re\n"
+
+
+def test_recover_keeps_a_complete_row_without_line_ending(tmp_path):
+    path = str(tmp_path / "expenses.csv")
+    with open(path, 'wb') as f:
+        f.write(b"Date,Category,Amount,ID\r\n01-10-2026,Food,10.5,0")
+    ours = CsvStorage(path)
+    assert ours.load() == [(0, "01-10-2026", "Food", 10.5)]
+    ours.append(1, "03-10-2026", "Rent", 500.0)
+    ours.close()
+    assert CsvStorage(path).read() == [(0, "01-10-2026", "Food", 10.5), (1, "03-10-2026", "Rent", 500.0)]
+    assert not os.path.exists(path + ".torn")
+
+
+def test_recover_keeps_a_legacy_row_without_line_ending(tmp_path):
+    path = str(tmp_path / "expenses.csv")
+    with open(path, 'wb') as f:
+        f.write(b"Date,Category,Amount\r\n01-10-2026,Food,10.5\r\n02-10-2026,Rent,500")
+    assert CsvStorage(path).load() == [(0, "01-10-2026", "Food", 10.5), (1, "02-10-2026", "Rent", 500.0)]
+
+
+def test_load_skips_amounts_too_large_to_store(tmp_path):
+    path = str(tmp_path / "expenses.csv")
+    with open(path, 'wb') as f:
+        f.write(b"Date,Category,Amount,ID\r\n01-10-2026,Food,nan,0\r\n02-10-2026,Rent,1e300,1\r\n"
+                b"03-10-2026,Rent,inf,2\r\n04-10-2026,Food,1.5,3\r\n")
+    assert CsvStorage(path).read() == [(3, "04-10-2026", "Food", 1.5)]
+
+
+def test_load_skips_ids_out_of_range(tmp_path):
+    path = str(tmp_path / "expenses.csv")
+    with open(path, 'wb') as f:
+        f.write(b"Date,Category,Amount,ID\r\n01-10-2026,Food,10,0\r\n02-10-2026,Rent,20,1\r\n"
+                b"03-10-2026,Fuel,5,-1\r\n04-10-2026,Fuel,6,%d\r\n#deleted,,,-1\r\n" % (storage.MAX_ID + 1))
+    ours = CsvStorage(path)
+    assert ours.load() == [(0, "01-10-2026", "Food", 10.0), (1, "02-10-2026", "Rent", 20.0)]
+    with open(path, 'ab') as f:
+        f.write(b"05-10-2026,Tax,7,-2\r\n06-10-2026,Tax,8,2\r\n")
+    assert ours.read_tail() == [(2, (2, "06-10-2026", "Tax", 8.0))]
+    ours.close()
+
+
+# ------------------ ID collisions ------------------
+@pytest.mark.parametrize("name", ["expenses.csv", "expenses", "expenses.db"])
+def test_an_id_taken_by_another_instance_moves(tmp_path, name):
+    path = str(tmp_path / name)
+    ours, theirs = Ledger(path), Ledger(path)
+    assert ours.add("01-10-2026", "Food", 10) == 0
+    assert theirs.add("02-10-2026", "Rent", 500) == 0
+    extra = theirs.add("03-10-2026", "Fuel", 1)
+    # The second writer's records went in under new IDs, its next sync reloads
+    assert theirs.storage.read_tail() is None
+    theirs.delete(extra)
+    for ledger in (ours, theirs):
+        sync(ledger)
+        sync(ledger)
+    fresh = Ledger(path)
+    assert [tuple(record) for _, record in fresh.items()] == [("01-10-2026", "Food", 10.0),
+                                                              ("02-10-2026", "Rent", 500.0)]
+    assert contents(ours) == contents(theirs) == contents(fresh)
+    for ledger in (ours, theirs, fresh):
+        ledger.close()
+
+
+# ------------------ Read-only ------------------
+def test_read_ledger_leaves_files_alone(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "COMPACT_MIN_TOMBSTONES", 4)
+    path = str(tmp_path / "expenses.csv")
+    ours = CsvStorage(path)
+    ours.load()
+    ours.append_many([(rid, "01-10-2026", "Food", rid + 0.5) for rid in range(10)])
+    for rid in range(8):
+        ours._write([[storage.TOMBSTONE, "", "", rid]])  # no compaction
+    ours.close()
+    with open(path, 'ab') as f:
+        f.write(b"02-10-2026,Fo")
+    with open(path, 'rb') as f:
+        before = f.read()
+    assert read_ledger(path) == [(8, "01-10-2026", "Food", 8.5), (9, "01-10-2026", "Food", 9.5)]
+    with open(path, 'rb') as f:
+        assert f.read() == before
+    assert sorted(os.listdir(tmp_path)) == ["expenses.csv", "expenses.csv.lock"]
+
+
+# ------------------ Command line ------------------
+def test_migrate_reads_the_ledger_a_name_stands_for(tmp_path):
+    path = str(tmp_path / "expenses")
+    ledger = Ledger(path)  # partitions in expenses/
+    ledger.add_many([(f"01-{month:02d}-2026", "Food", month) for month in range(1, 4)])
+    ledger.close()
+    assert storage.migrate(path, str(tmp_path / "expenses.db")) == 3
+    assert read_ledger(str(tmp_path / "expenses.db")) == read_ledger(path)
+    with pytest.raises(SystemExit):
+        storage.main(["migrate", str(tmp_path / "other"), str(tmp_path / "other.db")])
+    assert not os.path.exists(tmp_path / "other.db")
@@ -0,0 +1,73 @@
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from ledger import Ledger
+from trends import RESOLUTIONS, ledger_columns, series
+
+
+def period_start(day, resolution):
+    if resolution == "Daily":
+        return day
+    if resolution == "Weekly":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def next_period(start, resolution):
+    if resolution == "Daily":
+        return start + timedelta(days=1)
+    if resolution == "Weekly":
+        return start + timedelta(days=7)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def expected(records, resolution):
+    """(period starts, rupees per period, rolling average) summed one record at a time."""
+    spent = {}
+    for day, paise in records:
+        start = period_start(day, resolution)
+        spent[start] = spent.get(start, 0) + paise
+    starts = [min(spent)]
+    while starts[-1] < max(spent):
+        starts.append(next_period(starts[-1], resolution))
+    values = [spent.get(start, 0) / 100 for start in starts]
+    window = RESOLUTIONS[resolution]
+    averages = [sum(values[max(0, i - window + 1):i + 1]) / min(i + 1, window) for i in range(len(values))]
+    return starts, values, averages
+
+
+# ------------------ Series ------------------
+@pytest.mark.parametrize("resolution", list(RESOLUTIONS))
+def test_series_match_a_loop_over_the_records(resolution):
+    random.seed(resolution)
+    records = [(date(2024, 11, 20) + timedelta(days=random.randint(0, 150)), random.randint(1, 99999))
+               for _ in range(400)]
+    ordinals = np.array([day.toordinal() for day, _ in records], dtype=np.int32)
+    paise = np.array([amount for _, amount in records], dtype=np.int64)
+    starts, spent, average = series(ordinals, paise, resolution)
+    want_starts, want_spent, want_average = expected(records, resolution)
+    assert [day.item() for day in starts] == want_starts
+    assert spent.tolist() == pytest.approx(want_spent)
+    assert average.tolist() == pytest.approx(want_average)
+
+
+def test_no_records_give_empty_series():
+    starts, spent, average = series(np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int64), "Weekly")
+    assert len(starts) == len(spent) == len(average) == 0
+
+
+# ------------------ Ledger columns ------------------
+def test_ledger_columns_leave_out_deleted_records(tmp_path):
+    ledger = Ledger(str(tmp_path / "expenses.csv"))
+    ids = ledger.add_many([("01-10-2026", "Food", 1.5), ("02-10-2026", "Rent", 500), ("03-10-2026", "Food", 2)])
+    ledger.delete(ids[1])
+    ordinals, codes, paise = ledger_columns(ledger)
+    assert paise.tolist() == [150, 200]
+    assert ordinals.tolist() == [date(2026, 10, 1).toordinal(), date(2026, 10, 3).toordinal()]
+    assert codes[0] == codes[1]
+    # Copies: the ledger can still grow
+    ledger.add("04-10-2026", "Fuel", 3)
+    ledger.close()